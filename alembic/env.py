@@ -39,12 +39,26 @@ target_metadata = Base.metadata
 
 def get_url():
     """Get the database URL from environment variables."""
+    # Migrate the database the app connects to; MYSQL_* is the older spelling
+    if os.getenv("DATABASE_URL"):
+        return os.getenv("DATABASE_URL")
     user = os.getenv("MYSQL_USER", "root")
     password = os.getenv("MYSQL_PASSWORD", "")
     server = os.getenv("MYSQL_SERVER", "localhost")
     db = os.getenv("MYSQL_DB", "todo_db")
     return f"mysql+pymysql://{user}:{password}@{server}/{db}"
 
+def include_object(object, name, type_, reflected, compare_to):
+    """Leave dialect-specific search objects out of autogenerate."""
+    # The SQLite FTS5 table (and its shadow tables) and the MySQL FULLTEXT index
+    # are created by migration 5f2a9c7d1e38 on their own dialect only, and the
+    # PostgreSQL GIN index by e2a7c4b19f03
+    if type_ == "table" and name.startswith("todos_fts"):
+        return False
+    if type_ == "index" and name in ("ix_todos_fulltext", "ix_todos_search"):
+        return False
+    return True
+
 def run_migrations_offline() -> None:
     """Run migrations in 'offline' mode.
 
@@ -63,6 +77,7 @@ def run_migrations_offline() -> None:
         target_metadata=target_metadata,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
+        include_object=include_object,
     )
 
     with context.begin_transaction():
@@ -90,7 +105,8 @@ def run_migrations_online() -> None:
             connection=connection, 
             target_metadata=target_metadata,
             compare_type=True,
-            compare_server_default=True
+            compare_server_default=True,
+            include_object=include_object
         )
 
         with context.begin_transaction():
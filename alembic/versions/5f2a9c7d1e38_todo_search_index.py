@@ -0,0 +1,49 @@
+"""full-text index over todos.title and todos.description
+
+Revision ID: 5f2a9c7d1e38
+Revises: b81c3f0a92d4
+Create Date: 2026-10-18 15:20:37.604511
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5f2a9c7d1e38'
+down_revision = 'b81c3f0a92d4'
+branch_labels = None
+depends_on = None
+
+# Mirrors app.database.models.TODOS_FTS_DDL at the time of this revision
+SQLITE_FTS_DDL = [
+    "CREATE VIRTUAL TABLE todos_fts USING fts5(title, description, content='todos', content_rowid='id')",
+    "CREATE TRIGGER todos_fts_insert AFTER INSERT ON todos BEGIN "
+    "INSERT INTO todos_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+    "CREATE TRIGGER todos_fts_delete AFTER DELETE ON todos BEGIN "
+    "INSERT INTO todos_fts(todos_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description); END",
+    "CREATE TRIGGER todos_fts_update AFTER UPDATE OF title, description ON todos BEGIN "
+    "INSERT INTO todos_fts(todos_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description); "
+    "INSERT INTO todos_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+]
+
+
+def upgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == 'mysql':
+        op.create_index('ix_todos_fulltext', 'todos', ['title', 'description'], mysql_prefix='FULLTEXT')
+    elif dialect == 'sqlite':
+        for statement in SQLITE_FTS_DDL:
+            op.execute(statement)
+        # Index the rows that already exist
+        op.execute("INSERT INTO todos_fts(todos_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == 'mysql':
+        op.drop_index('ix_todos_fulltext', table_name='todos')
+    elif dialect == 'sqlite':
+        for trigger in ('todos_fts_insert', 'todos_fts_delete', 'todos_fts_update'):
+            op.execute(f"DROP TRIGGER {trigger}")
+        op.execute("DROP TABLE todos_fts")
@@ -0,0 +1,60 @@
+"""todos_archive: cold tier for completed todos
+
+TodoArchiver moves completed todos nobody touched for ARCHIVE_AFTER_SECONDS
+here, out of the indexes every todo list reads. todo_stats.archived_count
+counts them, so totals with and without the archive stay counter reads.
+
+Revision ID: 9d3e7a51c02f
+Revises: f4b19e6d2c85
+Create Date: 2026-10-18 23:05:42.681930
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '9d3e7a51c02f'
+down_revision = 'f4b19e6d2c85'
+branch_labels = None
+depends_on = None
+
+# The todos migration created PostgreSQL's todostatus type already
+TODO_STATUS = sa.Enum('PENDING', 'COMPLETED', name='todostatus').with_variant(
+    postgresql.ENUM('PENDING', 'COMPLETED', name='todostatus', create_type=False), 'postgresql'
+)
+
+COLUMNS = "id, title, description, status, user_id, created_at, version, updated_at, change_seq"
+
+
+def upgrade() -> None:
+    op.create_table(
+        'todos_archive',
+        sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('title', sa.String(length=200), nullable=False),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('status', TODO_STATUS, nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('change_seq', sa.Integer(), nullable=False),
+        sa.Column('archived_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_todos_archive_user_created', 'todos_archive', ['user_id', 'created_at', 'id'])
+    op.create_index('ix_todos_archive_user_title', 'todos_archive', ['user_id', 'title', 'id'])
+    op.create_index('ix_todos_archive_user_change_seq', 'todos_archive', ['user_id', 'change_seq', 'id'])
+    op.add_column('todo_stats', sa.Column('archived_count', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    # Archived todos go back to the hot table rather than being dropped
+    op.execute(f"INSERT INTO todos ({COLUMNS}) SELECT {COLUMNS} FROM todos_archive")
+    op.drop_column('todo_stats', 'archived_count')
+    op.drop_index('ix_todos_archive_user_change_seq', table_name='todos_archive')
+    op.drop_index('ix_todos_archive_user_title', table_name='todos_archive')
+    op.drop_index('ix_todos_archive_user_created', table_name='todos_archive')
+    op.drop_table('todos_archive')
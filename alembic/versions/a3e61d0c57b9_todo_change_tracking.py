@@ -0,0 +1,48 @@
+"""todos.updated_at/change_seq and todo_tombstones for delta sync
+
+GET /todos/changes reads a user's todos and tombstones in change_seq order
+through the (user_id, change_seq) indexes, so a sync costs the number of
+changes rather than the size of the list.
+
+Revision ID: a3e61d0c57b9
+Revises: 5f2a9c7d1e38
+Create Date: 2026-10-18 17:05:44.270193
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3e61d0c57b9'
+down_revision = '5f2a9c7d1e38'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('todos', sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True))
+    # Existing rows predate change tracking: sequence 0, last changed when created
+    op.add_column('todos', sa.Column('change_seq', sa.Integer(), server_default='0', nullable=False))
+    op.execute("UPDATE todos SET updated_at = created_at")
+    op.create_index('ix_todos_user_change_seq', 'todos', ['user_id', 'change_seq', 'id'], unique=False)
+    op.create_table(
+        'todo_tombstones',
+        sa.Column('todo_id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('change_seq', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('deleted_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('todo_id', 'change_seq')
+    )
+    op.create_index('ix_todo_tombstones_user_change_seq', 'todo_tombstones', ['user_id', 'change_seq', 'todo_id'], unique=False)
+    op.create_index(op.f('ix_todo_tombstones_deleted_at'), 'todo_tombstones', ['deleted_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_todo_tombstones_deleted_at'), table_name='todo_tombstones')
+    op.drop_index('ix_todo_tombstones_user_change_seq', table_name='todo_tombstones')
+    op.drop_table('todo_tombstones')
+    op.drop_index('ix_todos_user_change_seq', table_name='todos')
+    op.drop_column('todos', 'change_seq')
+    op.drop_column('todos', 'updated_at')
@@ -0,0 +1,40 @@
+"""users.tokens_valid_after to the microsecond, index on users.is_active
+
+Tokens carry a fractional "iat" now; revocations are kept at the same
+precision so a token minted right after one in the same second is valid.
+RevocationList also loads disabled users, through the is_active index.
+
+Revision ID: b3f8d2e61a47
+Revises: e2a7c4b19f03
+Create Date: 2026-10-19 00:31:07.915248
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+
+# revision identifiers, used by Alembic.
+revision = 'b3f8d2e61a47'
+down_revision = 'e2a7c4b19f03'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # SQLite and PostgreSQL keep microseconds in the existing column already
+    if op.get_bind().dialect.name == 'mysql':
+        op.alter_column(
+            'users', 'tokens_valid_after',
+            existing_type=mysql.DATETIME(), type_=mysql.DATETIME(fsp=6), existing_nullable=True
+        )
+    op.create_index(op.f('ix_users_is_active'), 'users', ['is_active'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_users_is_active'), table_name='users')
+    if op.get_bind().dialect.name == 'mysql':
+        op.alter_column(
+            'users', 'tokens_valid_after',
+            existing_type=mysql.DATETIME(fsp=6), type_=mysql.DATETIME(), existing_nullable=True
+        )
@@ -0,0 +1,26 @@
+"""todos.version and users.todos_version for conditional requests
+
+Revision ID: b81c3f0a92d4
+Revises: e664b6a9b7f7
+Create Date: 2026-10-18 13:42:09.118305
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b81c3f0a92d4'
+down_revision = 'e664b6a9b7f7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('todos', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+    op.add_column('users', sa.Column('todos_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('users', 'todos_version')
+    op.drop_column('todos', 'version')
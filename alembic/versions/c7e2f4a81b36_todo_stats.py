@@ -0,0 +1,47 @@
+"""todo_stats: todos per user, status and creation day
+
+GET /todos/stats and the totals of GET /todos/ read these counters, which
+every todo write keeps current, instead of counting todos rows.
+
+Revision ID: c7e2f4a81b36
+Revises: a3e61d0c57b9
+Create Date: 2026-10-18 19:12:08.531774
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'c7e2f4a81b36'
+down_revision = 'a3e61d0c57b9'
+branch_labels = None
+depends_on = None
+
+# The todos migration created PostgreSQL's todostatus type already
+TODO_STATUS = sa.Enum('PENDING', 'COMPLETED', name='todostatus').with_variant(
+    postgresql.ENUM('PENDING', 'COMPLETED', name='todostatus', create_type=False), 'postgresql'
+)
+
+
+def upgrade() -> None:
+    op.create_table(
+        'todo_stats',
+        sa.Column('user_id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('status', TODO_STATUS, nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('todo_count', sa.Integer(), server_default='0', nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('user_id', 'status', 'day')
+    )
+    # Writes keep it current from here on; stop writers while this runs
+    op.execute(
+        "INSERT INTO todo_stats (user_id, status, day, todo_count) "
+        "SELECT user_id, status, DATE(created_at), COUNT(*) FROM todos "
+        "GROUP BY user_id, status, DATE(created_at)"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('todo_stats')
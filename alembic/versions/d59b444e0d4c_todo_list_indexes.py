@@ -0,0 +1,34 @@
+"""composite indexes for list_todos filters and sorts
+
+Every supported GET /todos combination (status filter or not, created_at
+range, sort by created_at either direction or by title) is served by one of
+these indexes without a filesort.
+
+Revision ID: d59b444e0d4c
+Revises: 23dfd4676709
+Create Date: 2026-10-18 09:40:07.118734
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd59b444e0d4c'
+down_revision = '23dfd4676709'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_todos_user_created', 'todos', ['user_id', 'created_at', 'id'], unique=False)
+    op.create_index('ix_todos_user_status_created', 'todos', ['user_id', 'status', 'created_at', 'id'], unique=False)
+    op.create_index('ix_todos_user_title', 'todos', ['user_id', 'title', 'id'], unique=False)
+    op.create_index('ix_todos_user_status_title', 'todos', ['user_id', 'status', 'title', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_todos_user_status_title', table_name='todos')
+    op.drop_index('ix_todos_user_title', table_name='todos')
+    op.drop_index('ix_todos_user_status_created', table_name='todos')
+    op.drop_index('ix_todos_user_created', table_name='todos')
@@ -0,0 +1,32 @@
+"""full-text index over todos on PostgreSQL
+
+GET /todos/search matches TODO_SEARCH_VECTOR there; a GIN index over the
+same expression keeps it an index lookup. Other backends are unchanged.
+
+Revision ID: e2a7c4b19f03
+Revises: 9d3e7a51c02f
+Create Date: 2026-10-18 23:48:19.264051
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2a7c4b19f03'
+down_revision = '9d3e7a51c02f'
+branch_labels = None
+depends_on = None
+
+# Mirrors app.database.models.TODO_SEARCH_VECTOR at the time of this revision
+TODO_SEARCH_VECTOR = "to_tsvector('simple', coalesce(title, '') || ' ' || coalesce(description, ''))"
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        op.create_index('ix_todos_search', 'todos', [sa.text(TODO_SEARCH_VECTOR)], postgresql_using='gin')
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        op.drop_index('ix_todos_search', table_name='todos')
@@ -0,0 +1,28 @@
+"""users.is_active and users.tokens_valid_after for token revocation
+
+Revision ID: e664b6a9b7f7
+Revises: d59b444e0d4c
+Create Date: 2026-10-18 11:05:52.640193
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e664b6a9b7f7'
+down_revision = 'd59b444e0d4c'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('is_active', sa.Boolean(), server_default=sa.true(), nullable=False))
+    op.add_column('users', sa.Column('tokens_valid_after', sa.DateTime(timezone=True), nullable=True))
+    op.create_index(op.f('ix_users_tokens_valid_after'), 'users', ['tokens_valid_after'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_users_tokens_valid_after'), table_name='users')
+    op.drop_column('users', 'tokens_valid_after')
+    op.drop_column('users', 'is_active')
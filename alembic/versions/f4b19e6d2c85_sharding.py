@@ -0,0 +1,43 @@
+"""sharding: user_shards and id_blocks
+
+Used in the DATABASE_URL database once DATABASE_SHARD_URLS is set:
+user_shards pins users moved by app.services.reshard, and id_blocks hands
+out todo ids that stay unique across shards. Shards get the tables too,
+and leave them empty.
+
+Revision ID: f4b19e6d2c85
+Revises: c7e2f4a81b36
+Create Date: 2026-10-18 21:40:17.204519
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f4b19e6d2c85'
+down_revision = 'c7e2f4a81b36'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'user_shards',
+        sa.Column('user_id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('shard', sa.String(length=64), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('user_id')
+    )
+    op.create_table(
+        'id_blocks',
+        sa.Column('name', sa.String(length=64), nullable=False),
+        sa.Column('next_id', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('id_blocks')
+    op.drop_table('user_shards')
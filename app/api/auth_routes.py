@@ -1,49 +1,60 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
 from typing import Any
 
-from app.database.connection import get_db
+from app.core.password_pool import PasswordPoolFull
+from app.core.security import get_current_user
+from app.database.connection import get_session, recent_writes
 from app.schemas.user_schema import UserCreate, Token
-from app.services.user_service import UserService
+from app.services.user_service import get_user_service
+from app.utils.exceptions import ServiceUnavailableException
 
 router = APIRouter()
 
 @router.post("/signup", response_model=Token, status_code=status.HTTP_201_CREATED)
-def signup(
+async def signup(
     user_data: UserCreate,
-    db: Session = Depends(get_db)
+    db=Depends(get_session)
 ) -> Any:
     """
     Register a new user.
     """
+    service = get_user_service(db)
     try:
         # Create new user
-        user = UserService.create_user(db=db, user=user_data)
+        user = await service.create_user(db=db, user=user_data)
+        # A replica may not have the new account yet
+        recent_writes.mark(user.id)
         
         # Generate access token
-        token_data = UserService.create_access_token_for_user(user)
+        token_data = await service.create_access_token_for_user(user)
         return token_data
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=str(e)
         )
+    except PasswordPoolFull as e:
+        raise ServiceUnavailableException(detail=str(e))
 
 @router.post("/login", response_model=Token)
-def login(
+async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    db=Depends(get_session)
 ) -> Any:
     """
     OAuth2 compatible token login, get an access token for future requests.
     """
+    service = get_user_service(db)
     # Authenticate user
-    user = UserService.authenticate_user(
-        db=db, 
-        email=form_data.username, 
-        password=form_data.password
-    )
+    try:
+        user = await service.authenticate_user(
+            db=db, 
+            email=form_data.username, 
+            password=form_data.password
+        )
+    except PasswordPoolFull as e:
+        raise ServiceUnavailableException(detail=str(e))
     
     if not user:
         raise HTTPException(
@@ -53,5 +64,29 @@ def login(
         )
     
     # Generate access token
-    token_data = UserService.create_access_token_for_user(user)
-    return token_data
\ No newline at end of file
+    token_data = await service.create_access_token_for_user(user)
+    return token_data
+
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(
+    db=Depends(get_session),
+    current_user: dict = Depends(get_current_user)
+) -> None:
+    """
+    Revoke every token issued to the current user so far.
+    """
+    await get_user_service(db).revoke_user_tokens(db=db, user_id=current_user["user_id"])
+    return None
+
+@router.post("/deactivate", status_code=status.HTTP_204_NO_CONTENT)
+async def deactivate(
+    db=Depends(get_session),
+    current_user: dict = Depends(get_current_user)
+) -> None:
+    """
+    Disable the current user's account: every token issued so far is
+    revoked and logging in is refused from now on.
+    """
+    await get_user_service(db).revoke_user_tokens(db=db, user_id=current_user["user_id"], disable=True)
+    return None
@@ -0,0 +1,111 @@
+from collections import Counter
+from typing import Any
+from anyio import to_thread
+from fastapi import APIRouter
+
+from app.core.admission import admission_control
+from app.core.feed import change_feed
+from app.core.password_pool import password_pool
+from app.database.connection import pool_stats, shard_map
+from app.services.todo_archive import todo_archiver
+from app.services.todo_service import todo_cache, write_coalescers
+from app.services.todo_stats import todo_stats_repairer
+
+router = APIRouter()
+
+@router.get("/password-pool")
+def password_pool_stats() -> Any:
+    """
+    Queue depth and hash latency of the bcrypt worker pool, for sizing
+    PASSWORD_HASH_WORKERS against the host's core count.
+    """
+    return password_pool.stats()
+
+@router.get("/cache")
+async def cache_stats() -> Any:
+    """
+    Hit, miss, invalidation and eviction counters of the todo read cache.
+    """
+    if todo_cache is None:
+        return {"backend": "none"}
+    return await todo_cache.stats()
+
+@router.get("/db-pool")
+async def db_pool_stats() -> Any:
+    """
+    Threadpool occupancy and, per engine, connection pool checkout wait,
+    checked-out and overflow counts, for sizing DB_POOL_SIZE,
+    DB_MAX_OVERFLOW and THREADPOOL_SIZE against each other.
+    """
+    # async so the limiter read is the event loop's, not a worker thread's
+    limiter = to_thread.current_default_thread_limiter()
+    return {
+        "threadpool": {
+            "size": limiter.total_tokens,
+            "busy": limiter.borrowed_tokens,
+            "waiting": limiter.statistics().tasks_waiting,
+        },
+        "pools": pool_stats(),
+    }
+
+@router.get("/admission")
+def admission_stats() -> Any:
+    """
+    Per limited route: running and queued requests, and how many were
+    admitted or shed (rate limited, queue full, queue timeout).
+    """
+    return admission_control.stats()
+
+@router.get("/feed")
+def feed_stats() -> Any:
+    """
+    Open change feed streams on this worker, and how many events were
+    published, delivered and dropped for slow consumers.
+    """
+    return change_feed.stats()
+
+@router.get("/write-coalescer")
+def write_coalescer_stats() -> Any:
+    """
+    Batches committed by the write coalescer: their sizes, how long writes
+    waited for one, and commits retried write by write. Null when
+    WRITE_COALESCE_WINDOW_MS is 0; keyed by shard when sharded.
+    """
+    if not write_coalescers:
+        return None
+    if None in write_coalescers:
+        return write_coalescers[None].stats()
+    return {shard: coalescer.stats() for shard, coalescer in write_coalescers.items()}
+
+@router.get("/shards")
+def shard_stats() -> Any:
+    """
+    The shards todos live on, and the users this worker has pinned to one
+    (by app.services.reshard) per shard. Null when DATABASE_SHARD_URLS is
+    unset.
+    """
+    if shard_map is None:
+        return None
+    pinned = Counter(shard_map.pinned().values())
+    return {
+        "shards": {shard: {"pinned_users": pinned[shard]} for shard in shard_map.shards},
+        "pinned_users": sum(pinned.values()),
+    }
+
+@router.get("/todo-stats")
+def todo_stats_report() -> Any:
+    """
+    Outcome of this worker's last todo_stats repair run: users checked, and
+    the counters found out of step with the todos table. Null before the
+    first run.
+    """
+    return todo_stats_repairer.last_report
+
+@router.get("/archiver")
+def archiver_report() -> Any:
+    """
+    Outcome of this worker's last archiver run: todos examined and
+    archived, throughput while busy, and the rows left in todos and
+    todos_archive per shard. Null before the first run.
+    """
+    return todo_archiver.last_report
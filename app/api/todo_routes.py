@@ -1,61 +1,312 @@
+from datetime import date, datetime
 from typing import Any, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Header, HTTPException, status, Query
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from starlette.background import BackgroundTask
 
-from app.database.connection import get_db
+from app.core.config import settings
+from app.core.feed import FeedFull, change_feed
+from app.database.connection import get_session, release_session
 from app.core.security import get_current_user
 from app.schemas.todo_schema import (
     TodoCreate, 
     TodoUpdate, 
     TodoResponse, 
     TodoListResponse,
-    TodoStatus
+    TodoSearchResponse,
+    TodoChangesResponse,
+    TodoStatsResponse,
+    TodoStatus,
+    TodoSort,
+    CountMode,
+    ExportFormat,
+    TodoBulkCreate,
+    TodoBulkUpdate,
+    TodoBulkDelete,
+    TodoBulkResponse
 )
-from app.services.todo_service import TodoService
+from app.services.todo_service import get_todo_service
+from app.utils.etag import etag_matches, list_etag, not_modified, todo_etag
+from app.utils.exceptions import BadRequestException, GoneException, ServiceUnavailableException
+from app.utils.export import MEDIA_TYPES, csv_chunk, csv_header, encode_batches, ndjson_chunk
+from app.utils.pagination import SyncTokenExpired
+from app.utils.serializers import JSONBytesResponse, dump_stats, dump_todo, dump_todo_page
 
-router = APIRouter()
+# Routes returning models are rendered with orjson; the hot ones below return
+# JSONBytesResponse instead, so FastAPI skips re-validating against response_model
+# (which is still declared, for the OpenAPI schema)
+router = APIRouter(default_response_class=ORJSONResponse)
 
 @router.post("/", response_model=TodoResponse, status_code=status.HTTP_201_CREATED)
-def create_todo(
+async def create_todo(
     todo: TodoCreate,
-    db: Session = Depends(get_db),
+    db=Depends(get_session),
     current_user: dict = Depends(get_current_user)
 ) -> Any:
     """
     Create a new todo item for the current user.
     """
-    return TodoService.create_todo(db=db, todo=todo, user_id=current_user["user_id"])
+    db_todo = await get_todo_service(db).create_todo(db=db, todo=todo, user_id=current_user["user_id"])
+    return JSONBytesResponse(
+        dump_todo(db_todo),
+        status_code=status.HTTP_201_CREATED,
+        headers={"ETag": todo_etag(db_todo.id, db_todo.version)}
+    )
 
 @router.get("/", response_model=TodoListResponse)
-def list_todos(
+async def list_todos(
     skip: int = Query(0, ge=0, description="Number of items to skip"),
     limit: int = Query(10, gt=0, le=100, description="Number of items to return"),
     status: Optional[TodoStatus] = None,
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = Query(None, description="Opaque next_cursor from a previous page; takes precedence over skip"),
+    count: CountMode = Query(CountMode.EXACT, description="exact, estimated (capped count) or none (skip COUNT(*))"),
+    sort: TodoSort = Query(TodoSort.CREATED_AT, description="created_at, -created_at or title"),
+    created_after: Optional[datetime] = Query(None, description="Only todos created at or after this time"),
+    created_before: Optional[datetime] = Query(None, description="Only todos created before this time"),
+    include_archived: bool = Query(False, description="Also list completed todos moved to the archive"),
+    if_none_match: Optional[str] = Header(None),
+    db=Depends(get_session),
+    current_user: dict = Depends(get_current_user)
+) -> Any:
+    """
+    Retrieve todos for the current user with optional status and creation
+    time filtering, sorted by creation time or title. Completed todos
+    untouched for ARCHIVE_AFTER_SECONDS are only listed with include_archived.
+
+    Answers If-None-Match with 304 after a single users lookup when
+    none of the user's todos changed.
+    """
+    service = get_todo_service(db)
+    user_id = current_user["user_id"]
+    params = dict(
+        skip=skip,
+        limit=limit,
+        status=status,
+        cursor=cursor,
+        count=count,
+        sort=sort,
+        created_after=created_after,
+        created_before=created_before,
+        include_archived=include_archived
+    )
+    # Read the version before the page, so a racing write can only make the tag stale
+    list_version = await service.get_list_version(db=db, user_id=user_id)
+    etag = list_etag(list_version, {"user_id": user_id, **params})
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+
+    try:
+        result = await service.get_user_todos(db=db, user_id=user_id, **params)
+    except ValueError as e:
+        # "status" is shadowed by the filter parameter here
+        raise BadRequestException(detail=str(e))
+    return JSONBytesResponse(dump_todo_page(result), headers={"ETag": etag})
+
+# Fixed paths are registered before /{todo_id} so "stats"/"search"/"changes"/"export"/"stream"/"bulk" aren't parsed as ids
+@router.get("/stats", response_model=TodoStatsResponse)
+async def todo_stats(
+    created_after: Optional[date] = Query(None, description="Only days on or after this one"),
+    created_before: Optional[date] = Query(None, description="Only days before this one"),
+    if_none_match: Optional[str] = Header(None),
+    db=Depends(get_session),
+    current_user: dict = Depends(get_current_user)
+) -> Any:
+    """
+    Count the current user's todos by status, in total and per creation day
+    (UTC). Days without todos are left out.
+
+    Read from counters every write keeps up to date, so the cost grows
+    with the number of days, not of todos. Answers If-None-Match like
+    GET /todos/.
+    """
+    service = get_todo_service(db)
+    user_id = current_user["user_id"]
+    params = dict(created_after=created_after, created_before=created_before)
+    list_version = await service.get_list_version(db=db, user_id=user_id)
+    etag = list_etag(list_version, {"user_id": user_id, "stats": True, **params})
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+
+    result = await service.get_stats(db=db, user_id=user_id, **params)
+    return JSONBytesResponse(dump_stats(result), headers={"ETag": etag})
+
+@router.get("/search", response_model=TodoSearchResponse)
+async def search_todos(
+    q: str = Query(..., min_length=1, max_length=200, description="Words to look for in title and description"),
+    skip: int = Query(0, ge=0, description="Number of results to skip"),
+    limit: int = Query(10, gt=0, le=100, description="Number of results to return"),
+    db=Depends(get_session),
     current_user: dict = Depends(get_current_user)
 ) -> Any:
     """
-    Retrieve todos for the current user with optional status filtering.
+    Full-text search over the current user's todos, best matches first.
+
+    Backed by a FULLTEXT index on MySQL and an FTS5 table on SQLite.
     """
-    result = TodoService.get_user_todos(
+    result = await get_todo_service(db).search_todos(
         db=db,
         user_id=current_user["user_id"],
+        q=q,
         skip=skip,
-        limit=limit,
-        status=status
+        limit=limit
+    )
+    return JSONBytesResponse(dump_todo_page(result))
+
+@router.get("/changes", response_model=TodoChangesResponse)
+async def list_todo_changes(
+    since: Optional[str] = Query(None, description="next_token from the previous sync; omit for a full sync"),
+    limit: int = Query(100, gt=0, le=1000, description="Most changes to return"),
+    db=Depends(get_session),
+    current_user: dict = Depends(get_current_user)
+) -> Any:
+    """
+    Delta sync: todos created or updated ("todos") and ids deleted
+    ("deleted") since the `since` token, oldest change first.
+
+    Keep calling with next_token while has_more is true, and later to pick
+    up new changes. A token older than SYNC_TOMBSTONE_RETENTION_SECONDS gets
+    410, as deletes it would need may be compacted; sync again without one.
+    """
+    try:
+        result = await get_todo_service(db).get_changes(
+            db=db,
+            user_id=current_user["user_id"],
+            since=since,
+            limit=limit
+        )
+    except SyncTokenExpired as e:
+        raise GoneException(detail=str(e))
+    except ValueError as e:
+        raise BadRequestException(detail=str(e))
+    return JSONBytesResponse(dump_todo_page(result))
+
+@router.get("/export", response_class=StreamingResponse)
+async def export_todos(
+    export_format: ExportFormat = Query(ExportFormat.NDJSON, alias="format", description="ndjson or csv"),
+    db=Depends(get_session),
+    current_user: dict = Depends(get_current_user)
+) -> Any:
+    """
+    Stream every todo of the current user as NDJSON or CSV.
+
+    Rows are read through a server-side cursor EXPORT_BATCH_SIZE at a time,
+    so memory stays flat however many todos the user has. The session and
+    its connection are held until the last chunk is sent.
+    """
+    result = await get_todo_service(db).stream_user_todos(
+        db=db,
+        user_id=current_user["user_id"],
+        batch_size=settings.EXPORT_BATCH_SIZE
+    )
+    if export_format == ExportFormat.CSV:
+        chunks = encode_batches(result.partitions(), csv_chunk, head=csv_header())
+    else:
+        chunks = encode_batches(result.partitions(), ndjson_chunk)
+    return StreamingResponse(
+        chunks,
+        media_type=MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="todos.{export_format.value}"'}
+    )
+
+@router.get("/stream", response_class=StreamingResponse)
+async def stream_todo_changes(
+    db=Depends(get_session),
+    current_user: dict = Depends(get_current_user)
+) -> Any:
+    """
+    Server-Sent Events stream of the current user's todo changes.
+
+    Sends "ready" once subscribed, then "created"/"updated" (the todo) and
+    "deleted" ({"id"}) as writes commit, with keep-alive comments while idle.
+    Ends with "dropped" when the client falls too far behind, or
+    "reconnect" after FEED_MAX_AGE_SECONDS; refetch the list after either.
+    Ends with "revoked" once the token is revoked.
+    """
+    # Authenticated now; the stream never touches the database, so don't hold a connection
+    await release_session(db)
+    try:
+        subscriber = change_feed.subscribe(current_user["user_id"], current_user["issued_at"])
+    except FeedFull as e:
+        raise ServiceUnavailableException(detail=str(e))
+    return StreamingResponse(
+        change_feed.stream(subscriber),
+        media_type="text/event-stream",
+        # no-transform/X-Accel-Buffering keep proxies from buffering the events
+        headers={"Cache-Control": "no-cache, no-transform", "X-Accel-Buffering": "no"},
+        # Frees the slot when the client left before the body was started
+        background=BackgroundTask(change_feed.unsubscribe, subscriber)
+    )
+
+@router.post("/bulk", response_model=TodoBulkResponse, status_code=status.HTTP_201_CREATED)
+async def bulk_create_todos(
+    payload: TodoBulkCreate,
+    db=Depends(get_session),
+    current_user: dict = Depends(get_current_user)
+) -> Any:
+    """
+    Create up to BULK_MAX_ITEMS todos in one transaction.
+    """
+    return await get_todo_service(db).bulk_create_todos(
+        db=db,
+        todos=payload.items,
+        user_id=current_user["user_id"]
+    )
+
+@router.patch("/bulk", response_model=TodoBulkResponse)
+async def bulk_update_todos(
+    payload: TodoBulkUpdate,
+    db=Depends(get_session),
+    current_user: dict = Depends(get_current_user)
+) -> Any:
+    """
+    Update up to BULK_MAX_ITEMS todos in one transaction, with a result per item.
+    """
+    return await get_todo_service(db).bulk_update_todos(
+        db=db,
+        items=payload.items,
+        user_id=current_user["user_id"]
+    )
+
+@router.delete("/bulk", response_model=TodoBulkResponse)
+async def bulk_delete_todos(
+    payload: TodoBulkDelete,
+    db=Depends(get_session),
+    current_user: dict = Depends(get_current_user)
+) -> Any:
+    """
+    Delete up to BULK_MAX_ITEMS todos in one transaction, with a result per item.
+    """
+    return await get_todo_service(db).bulk_delete_todos(
+        db=db,
+        todo_ids=payload.ids,
+        user_id=current_user["user_id"]
     )
-    return result
 
 @router.get("/{todo_id}", response_model=TodoResponse)
-def get_todo(
+async def get_todo(
     todo_id: int,
-    db: Session = Depends(get_db),
+    if_none_match: Optional[str] = Header(None),
+    db=Depends(get_session),
     current_user: dict = Depends(get_current_user)
 ) -> Any:
     """
     Get a specific todo by ID.
+
+    Answers If-None-Match with 304 after a version-only primary key lookup.
     """
-    todo = TodoService.get_todo_by_id(
+    service = get_todo_service(db)
+    if if_none_match:
+        version = await service.get_todo_version(
+            db=db,
+            todo_id=todo_id,
+            user_id=current_user["user_id"]
+        )
+        if version is not None:
+            etag = todo_etag(todo_id, version)
+            if etag_matches(if_none_match, etag):
+                return not_modified(etag)
+
+    todo = await service.get_todo_by_id(
         db=db, 
         todo_id=todo_id, 
         user_id=current_user["user_id"]
@@ -65,19 +316,19 @@ def get_todo(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Todo not found"
         )
-    return todo
+    return JSONBytesResponse(dump_todo(todo), headers={"ETag": todo_etag(todo.id, todo.version)})
 
 @router.put("/{todo_id}", response_model=TodoResponse)
-def update_todo(
+async def update_todo(
     todo_id: int,
     todo_update: TodoUpdate,
-    db: Session = Depends(get_db),
+    db=Depends(get_session),
     current_user: dict = Depends(get_current_user)
 ) -> Any:
     """
     Update a todo item.
     """
-    todo = TodoService.update_todo(
+    todo = await get_todo_service(db).update_todo(
         db=db,
         todo_id=todo_id,
         todo_update=todo_update,
@@ -88,18 +339,18 @@ def update_todo(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Todo not found"
         )
-    return todo
+    return JSONBytesResponse(dump_todo(todo), headers={"ETag": todo_etag(todo.id, todo.version)})
 
 @router.delete("/{todo_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_todo(
+async def delete_todo(
     todo_id: int,
-    db: Session = Depends(get_db),
+    db=Depends(get_session),
     current_user: dict = Depends(get_current_user)
 ) -> None:
     """
     Delete a todo item.
     """
-    success = TodoService.delete_todo(
+    success = await get_todo_service(db).delete_todo(
         db=db,
         todo_id=todo_id,
         user_id=current_user["user_id"]
@@ -109,4 +360,4 @@ def delete_todo(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Todo not found"
         )
-    return None
\ No newline at end of file
+    return None
@@ -0,0 +1,337 @@
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, NamedTuple, Optional, Tuple
+
+from starlette.responses import JSONResponse
+
+from app.core.config import settings
+from app.core.metrics import ADMISSION_QUEUED, ADMISSION_REJECTED, route_template
+from app.core.security import decode_access_token
+
+class RateRule(NamedTuple):
+    """`burst` requests per `period` seconds for each client (`scope` "ip") or user ("user")."""
+
+    scope: str
+    burst: int
+    period: float
+
+    @property
+    def rate(self) -> float:
+        return self.burst / self.period
+
+class ConcurrencyRule(NamedTuple):
+    """At most `limit` requests of a route running, and `queue_limit` more waiting."""
+
+    limit: int
+    queue_limit: int
+
+def _parse_rules(spec: str, name: str) -> Dict[Tuple[str, str], str]:
+    # "METHOD /route/template=value,..." -> {(METHOD, template): value}
+    rules = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        route, sep, value = item.partition("=")
+        method, _, path = route.strip().partition(" ")
+        if not sep or not path:
+            raise ValueError(f"{name}: expected 'METHOD /path=...', got {item!r}")
+        rules[(method.upper(), path.strip())] = value.strip()
+    return rules
+
+def parse_concurrency_limits(spec: str) -> Dict[Tuple[str, str], ConcurrencyRule]:
+    """Parse ADMISSION_LIMITS, e.g. "POST /auth/login=4/64" (4 running, 64 queued)."""
+    limits = {}
+    for key, value in _parse_rules(spec, "ADMISSION_LIMITS").items():
+        limit, _, queue_limit = value.partition("/")
+        limits[key] = ConcurrencyRule(int(limit), int(queue_limit or 0))
+    return limits
+
+def parse_rate_limits(spec: str) -> Dict[Tuple[str, str], RateRule]:
+    """Parse RATE_LIMITS, e.g. "POST /auth/login=ip:20/60" (20 per minute per client IP)."""
+    limits = {}
+    for key, value in _parse_rules(spec, "RATE_LIMITS").items():
+        scope, _, allowance = value.partition(":")
+        burst, _, period = allowance.partition("/")
+        if scope not in ("ip", "user"):
+            raise ValueError(f"RATE_LIMITS: scope must be 'ip' or 'user', got {scope!r}")
+        limits[key] = RateRule(scope, int(burst), float(period or 1))
+    return limits
+
+class Overloaded(Exception):
+    """Raised when a request cannot get a concurrency slot; carries the reason."""
+
+class ConcurrencyLimiter:
+    """
+    FIFO admission to one route: `limit` requests run, up to `queue_limit`
+    wait at most `timeout` seconds for a slot, anything beyond is refused
+    at once. A released slot is handed straight to the oldest waiter.
+    """
+
+    def __init__(self, key: Tuple[str, str], rule: ConcurrencyRule, timeout: float):
+        self.key = key
+        self.limit = rule.limit
+        self.queue_limit = rule.queue_limit
+        self.timeout = timeout
+        self.active = 0
+        self.admitted = 0
+        self.rejected: Dict[str, int] = {"queue_full": 0, "queue_timeout": 0}
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    async def acquire(self) -> None:
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            self.admitted += 1
+            return
+        if len(self._waiters) >= self.queue_limit:
+            self.rejected["queue_full"] += 1
+            raise Overloaded("queue_full")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        ADMISSION_QUEUED.labels(*self.key).inc()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.timeout)
+        except asyncio.TimeoutError:
+            # Unless a slot was handed over just as the wait ran out
+            if not waiter.done():
+                self._abandon(waiter)
+                self.rejected["queue_timeout"] += 1
+                raise Overloaded("queue_timeout")
+        except asyncio.CancelledError:
+            if waiter.done():
+                self.release()
+            else:
+                self._abandon(waiter)
+            raise
+        finally:
+            ADMISSION_QUEUED.labels(*self.key).dec()
+        self.admitted += 1
+
+    def _abandon(self, waiter: asyncio.Future) -> None:
+        waiter.cancel()
+        self._waiters.remove(waiter)
+
+    def release(self) -> None:
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                # The slot passes to the waiter; `active` stays the same
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "limit": self.limit,
+            "queue_limit": self.queue_limit,
+            "active": self.active,
+            "queued": len(self._waiters),
+            "admitted": self.admitted,
+            "rejected": dict(self.rejected),
+        }
+
+class RateLimitBackend:
+    """Token buckets keyed by client or user; each request takes one token."""
+
+    async def take(self, key: str, rule: RateRule) -> float:
+        """Take a token from `key`'s bucket: 0 when granted, else seconds until one is due."""
+        raise NotImplementedError
+
+class MemoryRateLimiter(RateLimitBackend):
+    """
+    Buckets in process memory, the least recently used dropped beyond
+    `max_keys` (a dropped bucket starts over full). Each worker limits on
+    its own, so N workers allow up to N times the configured rate.
+    """
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    async def take(self, key, rule):
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(key, (rule.burst, now))
+        tokens = min(rule.burst, tokens + (now - updated) * rule.rate)
+        wait = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / rule.rate
+        self._buckets[key] = (tokens, now)
+        self._buckets.move_to_end(key)
+        if len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return wait
+
+class RedisRateLimiter(RateLimitBackend):
+    """
+    Buckets shared by every worker, one hash per key in a server speaking
+    the Redis protocol, updated in a WATCH/MULTI transaction (retried when
+    another worker touched the same bucket). No Lua, so stand-ins without
+    scripting such as fakeredis.aioredis.FakeRedis work too.
+    """
+
+    def __init__(self, url: str, prefix: str = "rate-limit:", client: Any = None):
+        if client is None:
+            try:
+                import redis.asyncio as redis
+            except ImportError as e:
+                raise RuntimeError("RATE_LIMIT_BACKEND=redis requires the 'redis' package") from e
+            client = redis.from_url(url)
+        self.client = client
+        self.prefix = prefix
+
+    async def take(self, key, rule):
+        name = self.prefix + key
+
+        async def update(pipe) -> float:
+            tokens, updated = await pipe.hmget(name, "tokens", "updated")
+            # Wall clock, as the buckets are shared between hosts
+            now = time.time()
+            if tokens is None:
+                tokens = rule.burst
+            else:
+                tokens = min(rule.burst, float(tokens) + max(0.0, now - float(updated)) * rule.rate)
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / rule.rate
+            pipe.multi()
+            pipe.hset(name, mapping={"tokens": tokens, "updated": now})
+            # Gone once it would have refilled anyway
+            pipe.expire(name, math.ceil(rule.period) + 1)
+            return wait
+
+        return await self.client.transaction(update, name, value_from_callable=True)
+
+def build_rate_limiter() -> Optional[RateLimitBackend]:
+    """Create the backend selected by RATE_LIMIT_BACKEND, or None when rate limiting is off."""
+    if settings.RATE_LIMIT_BACKEND == "memory":
+        return MemoryRateLimiter(max_keys=settings.RATE_LIMIT_MAX_KEYS)
+    if settings.RATE_LIMIT_BACKEND == "redis":
+        return RedisRateLimiter(url=settings.REDIS_URL)
+    return None
+
+def _client_ip(scope) -> str:
+    # uvicorn --proxy-headers puts the X-Forwarded-For address here
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+def _bearer_user(scope) -> Optional[str]:
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            kind, _, token = value.decode("latin-1").partition(" ")
+            if kind.lower() == "bearer":
+                payload = decode_access_token(token)
+                return payload and payload["sub"]
+    return None
+
+class AdmissionControl:
+    """
+    Rate limits and concurrency limits per route template.
+
+    Routes listed in RATE_LIMITS take a token from the caller's bucket (per
+    client IP, or per user for "user" rules, falling back to the IP without
+    a valid token). Routes listed in ADMISSION_LIMITS then wait for one of
+    their concurrency slots. Other routes are untouched, so a flood on one
+    route cannot use up the database connections and threads the rest need.
+    """
+
+    def __init__(
+        self,
+        concurrency_limits: str,
+        rate_limits: str,
+        queue_timeout: float,
+        rate_limiter: Optional[RateLimitBackend],
+    ):
+        self.limiters = {
+            key: ConcurrencyLimiter(key, rule, queue_timeout)
+            for key, rule in parse_concurrency_limits(concurrency_limits).items()
+        }
+        self.rate_limiter = rate_limiter
+        self.rate_rules = parse_rate_limits(rate_limits) if rate_limiter is not None else {}
+        self.rate_limited: Dict[Tuple[str, str], int] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.limiters or self.rate_rules)
+
+    async def take_token(self, key: Tuple[str, str], scope) -> float:
+        """0 when the route has no rate limit or the caller's bucket had a token, else seconds to wait."""
+        rule = self.rate_rules.get(key)
+        if rule is None:
+            return 0.0
+        subject = _bearer_user(scope) if rule.scope == "user" else None
+        bucket = f"{key[0]} {key[1]}:" + (f"user:{subject}" if subject else f"ip:{_client_ip(scope)}")
+        wait = await self.rate_limiter.take(bucket, rule)
+        if wait > 0:
+            self.rate_limited[key] = self.rate_limited.get(key, 0) + 1
+        return wait
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "rate_limit_backend": settings.RATE_LIMIT_BACKEND if self.rate_rules else "none",
+            "rate_limits": {
+                f"{key[0]} {key[1]}": {**rule._asdict(), "rejected": self.rate_limited.get(key, 0)}
+                for key, rule in self.rate_rules.items()
+            },
+            "concurrency_limits": {
+                f"{key[0]} {key[1]}": limiter.stats() for key, limiter in self.limiters.items()
+            },
+        }
+
+class AdmissionMiddleware:
+    """
+    Pure ASGI middleware applying AdmissionControl before routing: 429 when
+    the caller's bucket is empty, 503 when the route's queue is full or the
+    wait for a slot exceeds ADMISSION_QUEUE_TIMEOUT_SECONDS, both with
+    Retry-After.
+    """
+
+    def __init__(self, app, control: Optional[AdmissionControl] = None):
+        self.app = app
+        self.control = admission_control if control is None else control
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.control.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        key = (scope["method"], route_template(scope))
+        wait = await self.control.take_token(key, scope)
+        if wait > 0:
+            await self._reject(scope, receive, send, key, "rate_limited", 429, wait)
+            return
+
+        limiter = self.control.limiters.get(key)
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+        try:
+            await limiter.acquire()
+        except Overloaded as e:
+            await self._reject(scope, receive, send, key, str(e), 503, limiter.timeout)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release()
+
+    @staticmethod
+    async def _reject(scope, receive, send, key, reason: str, status_code: int, retry_after: float):
+        ADMISSION_REJECTED.labels(*key, reason).inc()
+        detail = "Too many requests" if status_code == 429 else "Server busy, try again later"
+        response = JSONResponse(
+            {"detail": detail},
+            status_code=status_code,
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        )
+        await response(scope, receive, send)
+
+admission_control = AdmissionControl(
+    concurrency_limits=settings.ADMISSION_LIMITS,
+    rate_limits=settings.RATE_LIMITS,
+    queue_timeout=settings.ADMISSION_QUEUE_TIMEOUT_SECONDS,
+    rate_limiter=build_rate_limiter(),
+)
@@ -0,0 +1,138 @@
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Set, Tuple, Type
+
+from pydantic import BaseModel
+
+from app.core.config import settings
+
+class CacheBackend:
+    """
+    Namespaced cache of pydantic models.
+
+    Entries live under a namespace (one per user) so every entry of a user
+    can be dropped with a single delete_namespace call after a write.
+    """
+
+    async def get(self, namespace: str, field: str, model: Type[BaseModel]) -> Optional[BaseModel]:
+        raise NotImplementedError
+
+    async def set(self, namespace: str, field: str, value: BaseModel, ttl: int) -> None:
+        raise NotImplementedError
+
+    async def delete_namespace(self, namespace: str) -> None:
+        raise NotImplementedError
+
+    async def stats(self) -> Dict[str, Any]:
+        return {}
+
+class MemoryCache(CacheBackend):
+    """In-process LRU cache with per-entry TTL; values are stored as objects."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, BaseModel]]" = OrderedDict()
+        self._fields: Dict[str, Set[str]] = {}
+        self.evictions = 0
+        self.expirations = 0
+
+    def _discard(self, key: Tuple[str, str]) -> None:
+        del self._entries[key]
+        fields = self._fields.get(key[0])
+        if fields is not None:
+            fields.discard(key[1])
+            if not fields:
+                del self._fields[key[0]]
+
+    async def get(self, namespace, field, model):
+        key = (namespace, field)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            self._discard(key)
+            self.expirations += 1
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, namespace, field, value, ttl):
+        key = (namespace, field)
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        self._fields.setdefault(namespace, set()).add(field)
+        while len(self._entries) > self.max_entries:
+            self._discard(next(iter(self._entries)))
+            self.evictions += 1
+
+    async def delete_namespace(self, namespace):
+        for field in self._fields.pop(namespace, ()):
+            self._entries.pop((namespace, field), None)
+
+    async def stats(self):
+        return {
+            "backend": "memory",
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+class RedisCache(CacheBackend):
+    """
+    Cache stored in any server speaking the Redis protocol.
+
+    Each namespace is one hash, so a read is a single HGET and invalidation
+    a single DEL. The hash expires ttl seconds after it was created, not
+    after its last write, so a busy user's entries still age out (EXPIRE NX
+    needs Redis 7). Pass `client` to use a stand-in such as
+    fakeredis.aioredis.FakeRedis in local runs.
+    """
+
+    def __init__(self, url: str, prefix: str = "todo-cache:", client: Any = None):
+        if client is None:
+            try:
+                import redis.asyncio as redis
+            except ImportError as e:
+                raise RuntimeError("CACHE_BACKEND=redis requires the 'redis' package") from e
+            client = redis.from_url(url)
+        self.client = client
+        self.prefix = prefix
+
+    async def get(self, namespace, field, model):
+        raw = await self.client.hget(self.prefix + namespace, field)
+        if raw is None:
+            return None
+        return model.parse_raw(raw)
+
+    async def set(self, namespace, field, value, ttl):
+        key = self.prefix + namespace
+        async with self.client.pipeline(transaction=False) as pipe:
+            pipe.hset(key, field, value.json())
+            pipe.expire(key, ttl, nx=True)
+            await pipe.execute()
+
+    async def delete_namespace(self, namespace):
+        await self.client.delete(self.prefix + namespace)
+
+    async def stats(self):
+        try:
+            info = await self.client.info("stats")
+        except Exception:
+            # Some managed deployments disable INFO; the figures are optional
+            info = {}
+        return {
+            "backend": "redis",
+            # Server-wide figure: Redis evicts whole namespaces, not entries
+            "evictions": info.get("evicted_keys"),
+            "expirations": info.get("expired_keys"),
+        }
+
+def build_cache() -> Optional[CacheBackend]:
+    """Create the backend selected by CACHE_BACKEND, or None when caching is off."""
+    if settings.CACHE_BACKEND == "memory":
+        return MemoryCache(max_entries=settings.CACHE_MAX_ENTRIES)
+    if settings.CACHE_BACKEND == "redis":
+        return RedisCache(url=settings.REDIS_URL)
+    return None
@@ -0,0 +1,111 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from app.core.metrics import WRITE_BATCH_FALLBACKS, WRITE_BATCH_SIZE, WRITE_COALESCE_WAIT
+
+logger = logging.getLogger(__name__)
+
+class WriteCoalescer:
+    """
+    Group commit for single-item writes.
+
+    Writes submitted within `window` seconds of the first one (or until
+    `max_batch` are waiting) are handed to `commit` as one batch, which
+    commits them in one transaction and returns one result per write; each
+    goes back to the request that submitted it. One batch runs at a time:
+    writes arriving meanwhile form the next, so batches grow with the
+    commit latency.
+
+    When `commit` raises (a write failed, or the COMMIT did, so nothing was
+    written), every write is retried in a batch of its own, and a failure
+    then only reaches the request it belongs to.
+    """
+
+    def __init__(self, commit: Callable[[List[Any]], Awaitable[List[Any]]], window: float, max_batch: int):
+        self.commit = commit
+        self.window = window
+        self.max_batch = max_batch
+        self._pending: List[Tuple[Any, asyncio.Future, float]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        # The running batch; the event loop only holds tasks weakly
+        self._task: Optional[asyncio.Task] = None
+        self.batches = 0
+        self.writes = 0
+        self.fallbacks = 0
+        self.wait_seconds_sum = 0.0
+        self.largest_batch = 0
+
+    async def submit(self, write: Any) -> Any:
+        """Queue a write and wait for its batch to commit; returns or raises the write's own outcome."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((write, future, time.perf_counter()))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        # The running batch picks these up when it finishes
+        if self._task is not None or not self._pending:
+            return
+        batch, self._pending = self._pending[:self.max_batch], self._pending[self.max_batch:]
+        self._task = asyncio.create_task(self._run(batch))
+
+    async def _run(self, batch: List[Tuple[Any, asyncio.Future, float]]) -> None:
+        started = time.perf_counter()
+        for _, _, submitted in batch:
+            WRITE_COALESCE_WAIT.observe(started - submitted)
+            self.wait_seconds_sum += started - submitted
+        WRITE_BATCH_SIZE.observe(len(batch))
+        self.batches += 1
+        self.writes += len(batch)
+        self.largest_batch = max(self.largest_batch, len(batch))
+        writes = [write for write, _, _ in batch]
+        try:
+            results = await self.commit(writes)
+        except Exception as e:
+            if len(writes) == 1:
+                results = [e]
+            else:
+                WRITE_BATCH_FALLBACKS.inc()
+                self.fallbacks += 1
+                logger.info("Coalesced batch failed, retrying its writes one by one", exc_info=True)
+                results = [await self._commit_alone(write) for write in writes]
+        finally:
+            self._task = None
+            if self._pending:
+                self._flush()
+        for (_, future, _), result in zip(batch, results):
+            # A request that went away still had its write committed
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    async def _commit_alone(self, write: Any) -> Any:
+        try:
+            return (await self.commit([write]))[0]
+        except Exception as e:
+            return e
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "window_ms": self.window * 1000,
+            "max_batch": self.max_batch,
+            "pending": len(self._pending),
+            "batches": self.batches,
+            "writes": self.writes,
+            "mean_batch_size": round(self.writes / self.batches, 2) if self.batches else None,
+            "largest_batch": self.largest_batch,
+            "mean_wait_ms": round(self.wait_seconds_sum / self.writes * 1000, 3) if self.writes else None,
+            "fallbacks": self.fallbacks,
+        }
@@ -0,0 +1,299 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Iterable, Optional, Set, Tuple
+
+import orjson
+
+from app.core.config import settings
+from app.core.token_cache import revocation_list
+
+logger = logging.getLogger(__name__)
+
+# Comment line sent on idle streams so proxies don't time them out
+HEARTBEAT = b": keep-alive\n\n"
+
+def sse_frame(event: str, data: Any) -> bytes:
+    """One Server-Sent Events message with a JSON payload."""
+    return b"event: " + event.encode() + b"\ndata: " + orjson.dumps(data) + b"\n\n"
+
+class FeedFull(Exception):
+    """Raised when this worker already holds FEED_MAX_SUBSCRIBERS streams."""
+
+class Subscriber:
+    """
+    One open stream: a bounded buffer of encoded chunks for one user, and
+    the "iat" of the token it was opened with.
+
+    Kept small (no task, queue or timer of its own) since a worker holds
+    tens of thousands of them; the feed wakes it through a single future.
+    """
+
+    __slots__ = ("user_id", "buffer_size", "issued_at", "opened_at", "closed", "_chunks", "_wakeup")
+
+    def __init__(self, user_id: int, buffer_size: int, issued_at: Optional[float] = None):
+        self.user_id = user_id
+        self.buffer_size = buffer_size
+        self.issued_at = issued_at
+        self.opened_at = time.monotonic()
+        self.closed = False
+        self._chunks: Deque[bytes] = deque()
+        self._wakeup: Optional[asyncio.Future] = None
+
+    @property
+    def idle(self) -> bool:
+        return not self._chunks
+
+    def push(self, chunk: bytes) -> bool:
+        """Buffer a chunk; False when the buffer is full."""
+        if self.closed:
+            return True
+        if len(self._chunks) >= self.buffer_size:
+            return False
+        self._chunks.append(chunk)
+        self._wake()
+        return True
+
+    def close(self, last_chunk: Optional[bytes] = None) -> None:
+        """Discard what is buffered and end the stream after `last_chunk`."""
+        self._chunks.clear()
+        if last_chunk is not None:
+            self._chunks.append(last_chunk)
+        self.closed = True
+        self._wake()
+
+    def _wake(self) -> None:
+        if self._wakeup is not None and not self._wakeup.done():
+            self._wakeup.set_result(None)
+
+    async def next_chunk(self) -> Optional[bytes]:
+        """Everything buffered so far as one chunk, waiting for some; None once closed."""
+        while not self._chunks:
+            if self.closed:
+                return None
+            self._wakeup = asyncio.get_running_loop().create_future()
+            await self._wakeup
+        chunk = b"".join(self._chunks)
+        self._chunks.clear()
+        return chunk
+
+class FeedBackend:
+    """
+    Carries published chunks to the ChangeFeed of every worker; `deliver`
+    is the receiving feed's fan-out to its local subscribers.
+    """
+
+    async def start(self, deliver: Callable[[int, bytes], None]) -> None:
+        self.deliver = deliver
+
+    async def publish(self, user_id: int, chunk: bytes) -> None:
+        raise NotImplementedError
+
+    async def stop(self) -> None:
+        pass
+
+class MemoryFeed(FeedBackend):
+    """In-process only: a stream sees the writes served by its own worker."""
+
+    async def publish(self, user_id, chunk):
+        self.deliver(user_id, chunk)
+
+class RedisFeed(FeedBackend):
+    """
+    Chunks relayed through Redis pub/sub, so a stream sees writes served by
+    any worker. Every worker subscribes to one channel and keeps only the
+    users it has streams for. Pass `client` to use a stand-in such as
+    fakeredis.aioredis.FakeRedis in local runs.
+    """
+
+    def __init__(self, url: str, channel: str = "todo-feed", client: Any = None):
+        if client is None:
+            try:
+                import redis.asyncio as redis
+            except ImportError as e:
+                raise RuntimeError("FEED_BACKEND=redis requires the 'redis' package") from e
+            client = redis.from_url(url)
+        self.client = client
+        self.channel = channel
+        self._listener: Optional[asyncio.Task] = None
+
+    async def start(self, deliver):
+        await super().start(deliver)
+        self._listener = asyncio.create_task(self._listen())
+
+    async def publish(self, user_id, chunk):
+        await self.client.publish(self.channel, b"%d:" % user_id + chunk)
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                async with self.client.pubsub() as pubsub:
+                    await pubsub.subscribe(self.channel)
+                    async for message in pubsub.listen():
+                        if message["type"] != "message":
+                            continue
+                        user_id, _, chunk = message["data"].partition(b":")
+                        self.deliver(int(user_id), chunk)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # Streams stay open; events published until the resubscribe are lost
+                logger.exception("Change feed subscription failed, retrying")
+                await asyncio.sleep(1)
+
+    async def stop(self):
+        if self._listener is not None:
+            self._listener.cancel()
+
+class ChangeFeed:
+    """
+    Fan-out of todo change events to each user's open streams.
+
+    A publish is encoded once and shared by every subscriber. A subscriber
+    whose buffer is full (a client not reading) is dropped: its buffer is
+    freed and it gets a final "dropped" event, after which the client
+    should reconnect and refetch. Streams older than max_age are ended with
+    a "reconnect" event, so connections rebalance across workers. Streams
+    whose token was revoked since (logout, deactivation) are ended with a
+    "revoked" event at the next heartbeat.
+    """
+
+    def __init__(self, backend: FeedBackend, buffer_size: int, max_subscribers: int, heartbeat: float, max_age: float):
+        self.backend = backend
+        self.buffer_size = buffer_size
+        self.max_subscribers = max_subscribers
+        self.heartbeat = heartbeat
+        self.max_age = max_age
+        self._subscribers: Dict[int, Set[Subscriber]] = {}
+        self._count = 0
+        self._heartbeat_task: Optional[asyncio.Task] = None
+        self.published = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.expired = 0
+        self.revoked = 0
+        self.refused = 0
+
+    async def start(self) -> None:
+        await self.backend.start(self.deliver)
+        self._heartbeat_task = asyncio.create_task(self._beat())
+
+    async def stop(self) -> None:
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+        await self.backend.stop()
+        for subscriber in self._all():
+            subscriber.close()
+
+    def check_capacity(self) -> None:
+        if self._count >= self.max_subscribers:
+            self.refused += 1
+            raise FeedFull("Too many open change feeds on this worker")
+
+    def subscribe(self, user_id: int, issued_at: Optional[float] = None) -> Subscriber:
+        """
+        Take one of the worker's stream slots, before the response starts.
+
+        Raises:
+            FeedFull: If all FEED_MAX_SUBSCRIBERS slots are taken
+        """
+        self.check_capacity()
+        subscriber = Subscriber(user_id, self.buffer_size, issued_at)
+        self._subscribers.setdefault(user_id, set()).add(subscriber)
+        self._count += 1
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        subscribers = self._subscribers.get(subscriber.user_id)
+        if subscribers is None or subscriber not in subscribers:
+            return
+        subscribers.discard(subscriber)
+        if not subscribers:
+            del self._subscribers[subscriber.user_id]
+        self._count -= 1
+
+    async def publish(self, user_id: int, events: Iterable[Tuple[str, Any]]) -> None:
+        """Send (event, data) pairs to the user's streams, as one chunk so they arrive together."""
+        chunk = b"".join(sse_frame(event, data) for event, data in events)
+        if not chunk:
+            return
+        self.published += 1
+        try:
+            await self.backend.publish(user_id, chunk)
+        except Exception:
+            # The write it describes is committed; a lost event must not fail the request
+            logger.exception("Publishing a change event failed", extra={"user_id": user_id})
+
+    def deliver(self, user_id: int, chunk: bytes) -> None:
+        for subscriber in list(self._subscribers.get(user_id, ())):
+            if subscriber.push(chunk):
+                self.delivered += 1
+            else:
+                self.dropped += 1
+                self.unsubscribe(subscriber)
+                subscriber.close(sse_frame("dropped", {"reason": "slow consumer"}))
+
+    async def stream(self, subscriber: Subscriber):
+        """
+        Body of a text/event-stream response for a subscriber from
+        subscribe(). Unsubscribes when it ends or the client goes away.
+        """
+        try:
+            yield sse_frame("ready", {"heartbeat_seconds": self.heartbeat})
+            while True:
+                chunk = await subscriber.next_chunk()
+                if chunk is None:
+                    return
+                yield chunk
+        finally:
+            self.unsubscribe(subscriber)
+
+    def _all(self):
+        return [subscriber for subscribers in self._subscribers.values() for subscriber in subscribers]
+
+    async def _beat(self) -> None:
+        # One timer for the whole worker instead of one per stream
+        while True:
+            await asyncio.sleep(self.heartbeat)
+            now = time.monotonic()
+            for subscriber in self._all():
+                if revocation_list.is_revoked(subscriber.user_id, subscriber.issued_at):
+                    self.revoked += 1
+                    self.unsubscribe(subscriber)
+                    subscriber.close(sse_frame("revoked", {"reason": "token revoked"}))
+                elif now - subscriber.opened_at >= self.max_age:
+                    self.expired += 1
+                    self.unsubscribe(subscriber)
+                    subscriber.close(sse_frame("reconnect", {"reason": "max age"}))
+                elif subscriber.idle:
+                    subscriber.push(HEARTBEAT)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": type(self.backend).__name__,
+            "subscribers": self._count,
+            "users": len(self._subscribers),
+            "max_subscribers": self.max_subscribers,
+            "buffer_size": self.buffer_size,
+            "published": self.published,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+            "expired": self.expired,
+            "revoked": self.revoked,
+            "refused": self.refused,
+        }
+
+def build_feed_backend() -> FeedBackend:
+    """Create the backend selected by FEED_BACKEND."""
+    if settings.FEED_BACKEND == "redis":
+        return RedisFeed(url=settings.REDIS_URL)
+    return MemoryFeed()
+
+change_feed = ChangeFeed(
+    backend=build_feed_backend(),
+    buffer_size=settings.FEED_BUFFER_SIZE,
+    max_subscribers=settings.FEED_MAX_SUBSCRIBERS,
+    heartbeat=settings.FEED_HEARTBEAT_SECONDS,
+    max_age=settings.FEED_MAX_AGE_SECONDS,
+)
@@ -0,0 +1,107 @@
+import atexit
+import copy
+import json
+import logging
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+from app.core.config import settings
+
+# Attributes every LogRecord has; anything else was passed through extra=
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+_configured = False
+_listener: Optional[QueueListener] = None
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message and any extra= fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+class DebugSampler(logging.Filter):
+    """Keep only a fraction of DEBUG records; INFO and above always pass."""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno > logging.DEBUG or random.random() < self.rate
+
+class _RecordQueueHandler(QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Resolve the message now, while its args are still current, but keep
+        # the traceback in exc_text so JSON output can carry it as its own field
+        record = copy.copy(record)
+        record.msg, record.args = record.getMessage(), None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+def configure_logging() -> None:
+    """
+    Route all logging through a queue: request threads and the event loop
+    only enqueue records, and a QueueListener thread formats them and does
+    the blocking write to stdout. Called by app.main's first startup hook;
+    safe to call more than once.
+    """
+    global _configured, _listener
+    if _configured:
+        return
+    _configured = True
+
+    output = logging.StreamHandler(sys.stdout)
+    if settings.LOG_FORMAT == "json":
+        output.setFormatter(JsonFormatter())
+    else:
+        output.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+
+    if settings.LOG_QUEUE:
+        handler = _RecordQueueHandler(queue.SimpleQueue())
+        _listener = QueueListener(handler.queue, output)
+        _listener.start()
+        # Flush whatever is still queued when the worker exits
+        atexit.register(stop_logging)
+    else:
+        # Write in the calling thread, as print() and echo=True used to
+        handler = output
+    handler.addFilter(DebugSampler(settings.LOG_DEBUG_SAMPLE_RATE))
+
+    level = logging.getLevelName(settings.LOG_LEVEL.upper())
+    root = logging.getLogger()
+    root.handlers = [handler]
+    # LOG_LEVEL=DEBUG is meant for this app's per-request lines, not every library's
+    root.setLevel(max(level, logging.INFO))
+    logging.getLogger("app").setLevel(level)
+    # SQLAlchemy names pool loggers after the pool class, and the timed pools live here
+    logging.getLogger("app.core.metrics").setLevel(max(level, logging.INFO))
+    # The startup schema check goes through Alembic, which narrates at INFO
+    logging.getLogger("alembic").setLevel(max(level, logging.WARNING))
+    # SQLAlchemy logs each statement at INFO once its logger is enabled
+    logging.getLogger("sqlalchemy.engine").setLevel(logging.INFO if settings.SQL_ECHO else logging.WARNING)
+
+def stop_logging() -> None:
+    """Drain the queue and stop the writer thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
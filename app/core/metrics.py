@@ -0,0 +1,278 @@
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Any, Dict, Tuple
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from starlette.routing import Match
+
+# With PROMETHEUS_MULTIPROC_DIR pointing at an empty writable directory,
+# prometheus_client keeps values in per-process mmap files and /metrics
+# aggregates every worker's files, so `uvicorn --workers N` reports one view
+MULTIPROCESS = bool(os.environ.get("PROMETHEUS_MULTIPROC_DIR"))
+
+# Route template of the request being served; SQL run outside a request
+# (startup, background refreshes) is attributed to "<background>"
+current_route: ContextVar[str] = ContextVar("current_route", default="<background>")
+
+HTTP_REQUESTS = Counter(
+    "http_requests_total",
+    "HTTP requests served",
+    ["method", "route", "status"],
+)
+HTTP_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Time from receiving a request to sending the last byte of its response",
+    ["method", "route"],
+)
+HTTP_IN_FLIGHT = Gauge(
+    "http_requests_in_progress",
+    "Requests currently being served",
+    ["method", "route"],
+    multiprocess_mode="livesum",
+)
+DB_QUERIES = Counter(
+    "db_queries_total",
+    "SQL statements executed",
+    ["route"],
+)
+DB_QUERY_LATENCY = Histogram(
+    "db_query_duration_seconds",
+    "Time spent executing SQL statements",
+    ["route"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+POOL_WAIT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+DB_POOL_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a pooled connection (including opening a new one)",
+    ["pool"],
+    buckets=POOL_WAIT_BUCKETS,
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out_connections",
+    "Connections currently checked out of the pool",
+    ["pool"],
+    multiprocess_mode="livesum",
+)
+DB_POOL_OVERFLOW = Gauge(
+    "db_pool_overflow_connections",
+    "Connections open beyond pool_size",
+    ["pool"],
+    multiprocess_mode="livesum",
+)
+DB_POOL_TIMEOUTS = Counter(
+    "db_pool_checkout_timeouts_total",
+    "Checkouts that gave up after pool_timeout",
+    ["pool"],
+)
+
+ADMISSION_REJECTED = Counter(
+    "admission_rejected_total",
+    "Requests shed before reaching their route (rate_limited, queue_full, queue_timeout)",
+    ["method", "route", "reason"],
+)
+ADMISSION_QUEUED = Gauge(
+    "admission_queued_requests",
+    "Requests waiting for a concurrency slot of their route",
+    ["method", "route"],
+    multiprocess_mode="livesum",
+)
+
+WRITE_BATCH_SIZE = Histogram(
+    "write_coalescer_batch_size",
+    "Todo writes committed together in one transaction by the write coalescer",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256),
+)
+WRITE_COALESCE_WAIT = Histogram(
+    "write_coalescer_wait_seconds",
+    "Time a coalesced write waited for its batch to start (the latency coalescing adds)",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+WRITE_BATCH_FALLBACKS = Counter(
+    "write_coalescer_fallbacks_total",
+    "Coalesced batches whose commit failed and were retried one write at a time",
+)
+TODO_STATS_DRIFT = Counter(
+    "todo_stats_drift_total",
+    "todo_stats counters the repair job found differing from the todos they count",
+)
+TODOS_ARCHIVED = Counter(
+    "todos_archived_total",
+    "Completed todos the archiver moved from todos to todos_archive",
+)
+TODO_TABLE_ROWS = Gauge(
+    "todo_table_rows",
+    "Rows in todos (hot) and todos_archive (archive) per shard, as of the archiver's last run",
+    ["shard", "table"],
+    multiprocess_mode="max",
+)
+
+class _TimedCheckout:
+    """
+    Pool mixin observing how long each checkout waits in _do_get and how
+    many connections are out, labelled by the engine's pool_logging_name.
+    Totals are also kept in-process for /debug/db-pool.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics_label = self._orig_logging_name or type(self).__name__
+        self._stats_lock = threading.Lock()
+        self._checkouts = 0
+        self._timeouts = 0
+        self._max_overflow_used = 0
+        self._wait_seconds_sum = 0.0
+        self._wait_seconds_max = 0.0
+        self._wait_seconds_buckets = [0] * (len(POOL_WAIT_BUCKETS) + 1)
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            DB_POOL_TIMEOUTS.labels(self.metrics_label).inc()
+            with self._stats_lock:
+                self._timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - start
+            DB_POOL_WAIT.labels(self.metrics_label).observe(waited)
+            with self._stats_lock:
+                self._checkouts += 1
+                self._wait_seconds_sum += waited
+                self._wait_seconds_max = max(self._wait_seconds_max, waited)
+                self._wait_seconds_buckets[bisect_left(POOL_WAIT_BUCKETS, waited)] += 1
+                self._max_overflow_used = max(self._max_overflow_used, self.overflow())
+            self._publish()
+
+    def _do_return_conn(self, record):
+        try:
+            super()._do_return_conn(record)
+        finally:
+            self._publish()
+
+    def _publish(self):
+        DB_POOL_CHECKED_OUT.labels(self.metrics_label).set(self.checkedout())
+        DB_POOL_OVERFLOW.labels(self.metrics_label).set(max(0, self.overflow()))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            checkouts = self._checkouts
+            buckets = {
+                str(bound): count
+                for bound, count in zip(POOL_WAIT_BUCKETS + ("+Inf",), self._wait_seconds_buckets)
+            }
+            return {
+                "pool_size": self.size(),
+                "max_overflow": self._max_overflow,
+                "timeout": self._timeout,
+                "checked_out": self.checkedout(),
+                "checked_in": self.checkedin(),
+                "overflow": max(0, self.overflow()),
+                "overflow_high_water": max(0, self._max_overflow_used),
+                "checkouts": checkouts,
+                "timeouts": self._timeouts,
+                "wait_seconds_avg": self._wait_seconds_sum / checkouts if checkouts else 0.0,
+                "wait_seconds_max": self._wait_seconds_max,
+                "wait_seconds_buckets": buckets,
+            }
+
+class TimedQueuePool(_TimedCheckout, QueuePool):
+    pass
+
+class TimedAsyncQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    pass
+
+def instrument_engine(engine: Engine):
+    """Count and time every statement run on a (sync) engine, per route."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def start_timer(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def stop_timer(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        route = current_route.get()
+        DB_QUERIES.labels(route).inc()
+        DB_QUERY_LATENCY.labels(route).observe(elapsed)
+
+def route_template(scope) -> str:
+    # Label by path template, not raw path, so ids don't explode cardinality;
+    # kept in the scope for the middlewares further in
+    if "route_template" in scope:
+        return scope["route_template"]
+    template = "<unmatched>"
+    for route in scope["app"].router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            template = route.path
+            break
+    scope["route_template"] = template
+    return template
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware recording request count, latency and in-flight
+    requests by method and route template.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        route = route_template(scope)
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        token = current_route.set(route)
+        in_flight = HTTP_IN_FLIGHT.labels(method, route)
+        in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_LATENCY.labels(method, route).observe(time.perf_counter() - start)
+            HTTP_REQUESTS.labels(method, route, str(status_code)).inc()
+            in_flight.dec()
+            current_route.reset(token)
+
+def render_metrics() -> Tuple[bytes, str]:
+    """Serialize all metrics in the Prometheus text format."""
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+def mark_process_dead():
+    """Drop this worker's live gauges from the multiprocess files on shutdown."""
+    if MULTIPROCESS:
+        multiprocess.mark_process_dead(os.getpid())
@@ -0,0 +1,133 @@
+import asyncio
+import os
+import threading
+import time
+from bisect import bisect_left
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+from app.core.config import settings
+from app.core.security import get_password_hash, load_password_backend, verify_password
+
+# Upper bounds (seconds) of the hash latency histogram buckets
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+class PasswordPoolFull(Exception):
+    """Raised when the password hashing queue is at its limit."""
+
+def _timed(func: Callable[..., Any], *args: Any):
+    # Runs inside the worker so the measured time excludes queueing
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+class PasswordHashPool:
+    """
+    Dedicated executor for bcrypt work, separate from Starlette's threadpool.
+
+    At most `workers` hashes run at once and at most `queue_limit` more may
+    wait; anything beyond that is rejected with PasswordPoolFull instead of
+    piling up behind the CPU.
+    """
+
+    def __init__(self, kind: str, workers: int, queue_limit: int):
+        self.kind = kind
+        self.workers = workers or os.cpu_count() or 1
+        self.queue_limit = queue_limit
+        if kind == "process":
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        else:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.workers, thread_name_prefix="password-hash"
+            )
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._hash_seconds_sum = 0.0
+        self._wait_seconds_sum = 0.0
+        self._hash_seconds_buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+
+    def _submit(self, func: Callable[..., Any], *args: Any) -> Future:
+        with self._lock:
+            if self._pending >= self.workers + self.queue_limit:
+                self._rejected += 1
+                raise PasswordPoolFull("Password hashing queue is full")
+            self._pending += 1
+        submitted = time.perf_counter()
+        future = self._executor.submit(_timed, func, *args)
+        future.add_done_callback(lambda f: self._record(f, submitted))
+        return future
+
+    def _record(self, future: Future, submitted: float) -> None:
+        total = time.perf_counter() - submitted
+        with self._lock:
+            self._pending -= 1
+            if future.cancelled() or future.exception() is not None:
+                self._failed += 1
+                return
+            _, elapsed = future.result()
+            self._completed += 1
+            self._hash_seconds_sum += elapsed
+            self._wait_seconds_sum += max(0.0, total - elapsed)
+            self._hash_seconds_buckets[bisect_left(LATENCY_BUCKETS, elapsed)] += 1
+
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        result, _ = await asyncio.wrap_future(self._submit(func, *args))
+        return result
+
+    def run_sync(self, func: Callable[..., Any], *args: Any) -> Any:
+        result, _ = self._submit(func, *args).result()
+        return result
+
+    async def warm(self) -> None:
+        """
+        Load the bcrypt backend ahead of the first login; in process mode
+        this also starts the worker processes and imports the app in them.
+        Not counted in stats().
+        """
+        warmups = self.workers if self.kind == "process" else 1
+        await asyncio.gather(
+            *(asyncio.wrap_future(self._executor.submit(load_password_backend)) for _ in range(warmups))
+        )
+
+    async def hash(self, password: str) -> str:
+        return await self.run(get_password_hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self.run(verify_password, plain_password, hashed_password)
+
+    def hash_sync(self, password: str) -> str:
+        return self.run_sync(get_password_hash, password)
+
+    def verify_sync(self, plain_password: str, hashed_password: str) -> bool:
+        return self.run_sync(verify_password, plain_password, hashed_password)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            completed = self._completed
+            buckets = {
+                str(bound): count
+                for bound, count in zip(LATENCY_BUCKETS + ("+Inf",), self._hash_seconds_buckets)
+            }
+            return {
+                "kind": self.kind,
+                "workers": self.workers,
+                "queue_limit": self.queue_limit,
+                "in_flight": self._pending,
+                "queue_depth": max(0, self._pending - self.workers),
+                "completed": completed,
+                "failed": self._failed,
+                "rejected": self._rejected,
+                "hash_seconds_sum": self._hash_seconds_sum,
+                "hash_seconds_avg": self._hash_seconds_sum / completed if completed else 0.0,
+                "wait_seconds_avg": self._wait_seconds_sum / completed if completed else 0.0,
+                "hash_seconds_buckets": buckets,
+            }
+
+password_pool = PasswordHashPool(
+    kind=settings.PASSWORD_HASH_POOL,
+    workers=settings.PASSWORD_HASH_WORKERS,
+    queue_limit=settings.PASSWORD_HASH_QUEUE_LIMIT
+)
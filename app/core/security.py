@@ -1,11 +1,16 @@
-from datetime import datetime, timedelta
+import logging
+from datetime import datetime, timedelta, timezone
 from typing import Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import HTTPException, status, Depends
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
-from app.database.connection import get_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+from app.core.config import settings
+from app.core.token_cache import revocation_list, token_cache
+from app.database.connection import get_session, recent_writes, route_shard
 from app.database.models import User
 from dotenv import load_dotenv
 import os
@@ -13,6 +18,8 @@ import os
 # Load environment variables
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 # Configure password context with bcrypt settings
 pwd_context = CryptContext(
     schemes=["bcrypt"],
@@ -29,21 +36,25 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
         # First try bcrypt verification
         return pwd_context.verify(plain_password, hashed_password)
     except Exception as e:
-        print(f"Password verification error: {e}")
+        logger.warning("bcrypt verification failed, trying fallback hash", extra={"error": str(e)})
         # If bcrypt fails, try SHA256 verification (fallback hash)
         try:
             import hashlib
             expected_hash = hashlib.sha256(plain_password.encode()).hexdigest()
             if expected_hash == hashed_password:
-                print(f"SHA256 password verification successful")
+                logger.debug("SHA256 password verification successful")
                 return True
             else:
-                print(f"SHA256 password verification failed")
+                logger.debug("SHA256 password verification failed")
                 return False
         except Exception as sha_error:
-            print(f"SHA256 verification error: {sha_error}")
+            logger.error("SHA256 verification failed", extra={"error": str(sha_error)})
             return False
 
+def load_password_backend() -> None:
+    """Select and self-test passlib's bcrypt backend now instead of on the first hash."""
+    pwd_context.handler("bcrypt").get_backend()
+
 def get_password_hash(password: str) -> str:
     """Hash a password."""
     try:
@@ -52,7 +63,7 @@ def get_password_hash(password: str) -> str:
             password = password[:72]  # Truncate if too long
         return pwd_context.hash(password)
     except Exception as e:
-        print(f"Password hashing error: {e}")
+        logger.error("Password hashing failed, using fallback hash", extra={"error": str(e)})
         # Fallback to simple hash if bcrypt fails
         import hashlib
         return hashlib.sha256(password.encode()).hexdigest()
@@ -60,37 +71,87 @@ def get_password_hash(password: str) -> str:
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Create a JWT access token."""
     to_encode = data.copy()
+    issued_at = datetime.utcnow()
     if expires_delta:
-        expire = datetime.utcnow() + expires_delta
+        expire = issued_at + expires_delta
     else:
-        expire = datetime.utcnow() + timedelta(minutes=30)
+        # RevocationList keeps revocations for this long, so no revoked token outlives it
+        expire = issued_at + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
 
     # Use secret key from environment variable
     secret_key = os.getenv("SECRET_KEY", "fallback-secret-key")
-    to_encode.update({"exp": expire})
+    # Fractional "iat", so a token minted right after a revocation in the same second is still valid
+    to_encode.update({"exp": expire, "iat": issued_at.replace(tzinfo=timezone.utc).timestamp()})
     encoded_jwt = jwt.encode(to_encode, secret_key, algorithm="HS256")
     return encoded_jwt
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    """Get the current user from JWT token."""
+def warm_jwt() -> None:
+    """One sign/verify round trip, so jose sets up its HMAC backend before the first request."""
+    secret_key = os.getenv("SECRET_KEY", "fallback-secret-key")
+    jwt.decode(create_access_token({"sub": "0"}), secret_key, algorithms=["HS256"])
+
+def decode_access_token(token: str) -> Optional[dict]:
+    """
+    Verified payload of a token with an integer "sub" claim, or None.
+
+    Payloads are cached by token hash, so only the first use of a token
+    pays for the HMAC check. Revocation is not checked here.
+    """
+    payload = token_cache.get(token)
+    if payload is None:
+        try:
+            # Use secret key from environment variable
+            secret_key = os.getenv("SECRET_KEY", "fallback-secret-key")
+            payload = jwt.decode(token, secret_key, algorithms=["HS256"])
+            int(payload["sub"])
+        except (JWTError, KeyError, TypeError, ValueError):
+            return None
+        token_cache.put(token, payload)
+    return payload
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db=Depends(get_session)):
+    """
+    Get the current user from JWT token.
+
+    Verified payloads are cached by token hash, and with
+    AUTH_TRUST_TOKEN_CLAIMS the user is built from the signed claims, so the
+    common path does neither an HMAC check nor a database query.
+
+    When sharded, the request session is routed to the user's shard on the
+    way out (see route_shard).
+    """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
 
-    try:
-        # Use secret key from environment variable
-        secret_key = os.getenv("SECRET_KEY", "fallback-secret-key")
-        payload = jwt.decode(token, secret_key, algorithms=["HS256"])
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise credentials_exception
-    except JWTError:
+    payload = decode_access_token(token)
+    if payload is None:
         raise credentials_exception
 
-    user = db.query(User).filter(User.id == int(user_id)).first()
-
-    if user is None:
+    user_id = int(payload["sub"])
+    # Also covers disabled accounts, which the trusted-claims path below never looks up
+    if revocation_list.is_revoked(user_id, payload.get("iat")):
         raise credentials_exception
-    return {"user_id": user.id, "email": user.email}
\ No newline at end of file
+
+    # Writes pin this user's reads to the primary until replicas catch up
+    recent_writes.route_session(db, user_id)
+
+    # Tokens minted before the email claim was added still take the DB path
+    if settings.AUTH_TRUST_TOKEN_CLAIMS and "email" in payload:
+        current_user = {"user_id": user_id, "email": payload["email"], "issued_at": payload.get("iat")}
+    else:
+        query = select(User).where(User.id == user_id)
+        if isinstance(db, AsyncSession):
+            user = await db.scalar(query)
+        else:
+            user = await run_in_threadpool(db.scalar, query)
+
+        if user is None or not user.is_active:
+            raise credentials_exception
+        current_user = {"user_id": user.id, "email": user.email, "issued_at": payload.get("iat")}
+
+    # Done with the accounts; the rest of the request works on the user's shard
+    route_shard(db, user_id)
+    return current_user
\ No newline at end of file
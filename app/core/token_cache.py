@@ -0,0 +1,138 @@
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional, Set
+
+from sqlalchemy import false, or_, select
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.database.connection import AsyncSessionLocal, SessionLocal
+from app.database.models import User
+
+logger = logging.getLogger(__name__)
+
+class TokenCache:
+    """
+    Bounded LRU cache of verified JWT payloads.
+
+    Entries are keyed by the SHA-256 of the token so raw bearer tokens are
+    never kept in memory, and expire after ttl seconds or at the token's own
+    "exp", whichever comes first.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[bytes, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> Optional[dict]:
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, payload = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return payload
+
+    def put(self, token: str, payload: dict) -> None:
+        if self.maxsize <= 0:
+            return
+        expires_at = time.time() + self.ttl
+        if "exp" in payload:
+            expires_at = min(expires_at, float(payload["exp"]))
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = (expires_at, payload)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+class RevocationList:
+    """
+    In-memory map of user id -> epoch seconds before which that user's tokens
+    are no longer accepted, plus the disabled users, none of whose tokens are.
+
+    It is refreshed from users.tokens_valid_after in the background, so
+    request handling never needs a SELECT to honour a revocation. Revocations
+    made by this worker apply immediately; other workers pick them up on
+    their next refresh.
+    """
+
+    def __init__(self):
+        self._valid_after: Dict[int, float] = {}
+        self._disabled: Set[int] = set()
+
+    def is_revoked(self, user_id: int, issued_at: Optional[float]) -> bool:
+        if user_id in self._disabled:
+            return True
+        valid_after = self._valid_after.get(user_id)
+        if valid_after is None:
+            return False
+        return issued_at is None or issued_at < valid_after
+
+    def revoke(self, user_id: int, valid_after: datetime, disable: bool = False) -> None:
+        self._valid_after[user_id] = _epoch(valid_after)
+        if disable:
+            self._disabled.add(user_id)
+
+    @staticmethod
+    def _statement():
+        # Revocations older than the token lifetime can't match a live token;
+        # disabled users are few, and found through ix_users_is_active
+        horizon = datetime.utcnow() - timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+        return select(User.id, User.tokens_valid_after, User.is_active).where(
+            or_(User.tokens_valid_after >= horizon, User.is_active == false())
+        )
+
+    async def refresh(self) -> None:
+        statement = self._statement()
+        if settings.DB_ASYNC_MODE:
+            async with AsyncSessionLocal() as db:
+                rows = (await db.execute(statement)).all()
+        else:
+            def load():
+                with SessionLocal() as db:
+                    return db.execute(statement).all()
+            rows = await run_in_threadpool(load)
+        self._valid_after = {
+            user_id: _epoch(valid_after) for user_id, valid_after, _ in rows if valid_after is not None
+        }
+        self._disabled = {user_id for user_id, _, is_active in rows if not is_active}
+
+    async def poll(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.refresh()
+            except Exception:
+                logger.exception("Refreshing token revocations failed")
+
+def _epoch(value: datetime) -> float:
+    # tokens_valid_after is stored as naive UTC, matching the JWT "iat" claim
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+token_cache = TokenCache(
+    maxsize=settings.AUTH_TOKEN_CACHE_SIZE,
+    ttl=settings.AUTH_TOKEN_CACHE_TTL_SECONDS
+)
+revocation_list = RevocationList()
@@ -1,10 +1,19 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Enum
-from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy import DDL, Boolean, Column, Date, Integer, String, Text, DateTime, ForeignKey, Enum, Index, event, text, true
+from sqlalchemy.dialects import mysql, sqlite
 from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func
+from sqlalchemy.sql import column, func, table
 from enum import Enum as PyEnum
+from app.database.connection import Base
 
-Base = declarative_base()
+# SQLite's CURRENT_TIMESTAMP has no fractional part; bind datetimes in the same
+# format so keyset comparisons on server-generated timestamps line up
+Timestamp = DateTime(timezone=True).with_variant(
+    sqlite.DATETIME(truncate_microseconds=True), "sqlite"
+)
+
+# What PostgreSQL searches for GET /todos/search. The query must repeat the
+# expression exactly for the planner to use the GIN index over it
+TODO_SEARCH_VECTOR = "to_tsvector('simple', coalesce(title, '') || ' ' || coalesce(description, ''))"
 
 class TodoStatus(str, PyEnum):
     PENDING = "pending"
@@ -17,7 +26,15 @@ class User(Base):
     name = Column(String(100), nullable=False)
     email = Column(String(100), unique=True, index=True, nullable=False)
     password_hash = Column(String(255), nullable=False)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(Timestamp, server_default=func.now())
+    is_active = Column(Boolean, nullable=False, server_default=true(), index=True)
+    # Tokens issued before this (UTC) instant are rejected; see RevocationList.
+    # Kept to the microsecond, like the "iat" claim it is compared with
+    tokens_valid_after = Column(
+        DateTime(timezone=True).with_variant(mysql.DATETIME(fsp=6), "mysql"), nullable=True, index=True
+    )
+    # Bumped by every write to the user's todos; versions the list ETag
+    todos_version = Column(Integer, nullable=False, server_default="0")
 
     # Relationship
     todos = relationship("Todo", back_populates="owner")
@@ -30,7 +47,132 @@ class Todo(Base):
     description = Column(Text, nullable=True)
     status = Column(Enum(TodoStatus), default=TodoStatus.PENDING, nullable=False)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(Timestamp, server_default=func.now())
+    # Bumped by every update; versions the todo's ETag
+    version = Column(Integer, nullable=False, server_default="1")
+    # Set in the INSERT/UPDATE itself (no non-constant server default, which
+    # SQLite can't add to an existing table), so Core bulk writes keep it too
+    updated_at = Column(Timestamp, nullable=True, default=func.now(), onupdate=func.now())
+    # users.todos_version as of the write that last touched this row; orders
+    # GET /todos/changes (see TodoService.get_changes)
+    change_seq = Column(Integer, nullable=False, server_default="0")
 
     # Relationship
     owner = relationship("User", back_populates="todos")
+
+    # One index per list_todos filter/sort combination (see TodoService.get_user_todos)
+    __table_args__ = (
+        Index("ix_todos_user_created", "user_id", "created_at", "id"),
+        Index("ix_todos_user_status_created", "user_id", "status", "created_at", "id"),
+        Index("ix_todos_user_title", "user_id", "title", "id"),
+        Index("ix_todos_user_status_title", "user_id", "status", "title", "id"),
+        Index("ix_todos_user_change_seq", "user_id", "change_seq", "id"),
+        # GET /todos/search; InnoDB keeps FULLTEXT indexes current on every write
+        Index("ix_todos_fulltext", "title", "description", mysql_prefix="FULLTEXT").ddl_if(dialect="mysql"),
+        Index("ix_todos_search", text(TODO_SEARCH_VECTOR), postgresql_using="gin").ddl_if(dialect="postgresql"),
+    )
+
+class TodoArchive(Base):
+    """
+    The cold tier: completed todos TodoArchiver moved out of todos once
+    untouched for ARCHIVE_AFTER_SECONDS, keeping their ids. GET /todos/
+    reads it with include_archived; a write to an archived todo moves it back.
+    """
+
+    __tablename__ = "todos_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    title = Column(String(200), nullable=False)
+    description = Column(Text, nullable=True)
+    status = Column(Enum(TodoStatus), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    created_at = Column(Timestamp, nullable=True)
+    version = Column(Integer, nullable=False)
+    updated_at = Column(Timestamp, nullable=True)
+    # users.todos_version when the todo was archived (or restored from here)
+    change_seq = Column(Integer, nullable=False)
+    archived_at = Column(Timestamp, server_default=func.now())
+
+    # Only completed todos get here, so the status indexes of todos have no counterpart
+    __table_args__ = (
+        Index("ix_todos_archive_user_created", "user_id", "created_at", "id"),
+        Index("ix_todos_archive_user_title", "user_id", "title", "id"),
+        Index("ix_todos_archive_user_change_seq", "user_id", "change_seq", "id"),
+    )
+
+class TodoTombstone(Base):
+    """A deleted todo, kept so delta sync can report the delete; compacted after a retention period."""
+
+    __tablename__ = "todo_tombstones"
+
+    # SQLite may reuse the id of a deleted todo, so one id can have several tombstones
+    todo_id = Column(Integer, primary_key=True, autoincrement=False)
+    change_seq = Column(Integer, primary_key=True, autoincrement=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    deleted_at = Column(Timestamp, server_default=func.now(), nullable=False, index=True)
+
+    __table_args__ = (
+        Index("ix_todo_tombstones_user_change_seq", "user_id", "change_seq", "todo_id"),
+    )
+
+class TodoStat(Base):
+    """
+    How many todos a user has per status and creation day (DATE(created_at)).
+
+    Kept in step by every TodoService write, in the write's own transaction;
+    TodoStatsRepairer rebuilds it from todos and todos_archive. Rows can
+    drop to 0 and stay.
+    """
+
+    __tablename__ = "todo_stats"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True, autoincrement=False)
+    status = Column(Enum(TodoStatus), primary_key=True)
+    day = Column(Date, primary_key=True)
+    todo_count = Column(Integer, nullable=False, server_default="0")
+    # Of todo_count, how many are in todos_archive
+    archived_count = Column(Integer, nullable=False, server_default="0")
+
+class UserShard(Base):
+    """
+    A user pinned to a shard by app.services.reshard, in the DATABASE_URL
+    database. Users without a row live where the shard ring puts them.
+    """
+
+    __tablename__ = "user_shards"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True, autoincrement=False)
+    shard = Column(String(64), nullable=False)
+    updated_at = Column(Timestamp, server_default=func.now(), onupdate=func.now())
+
+class IdBlock(Base):
+    """
+    Next id to lease per sequence, in the DATABASE_URL database. When
+    sharded, todo ids come from here instead of each shard's AUTO_INCREMENT
+    (see app.database.sharding.IdBlocks).
+    """
+
+    __tablename__ = "id_blocks"
+
+    name = Column(String(64), primary_key=True)
+    next_id = Column(Integer, nullable=False)
+
+# SQLite has no FULLTEXT: an external-content FTS5 table mirrors title and
+# description, kept in step with todos by triggers so Core bulk statements
+# are covered as well as ORM writes
+todos_fts = table("todos_fts", column("rowid"), column("title"), column("description"))
+
+TODOS_FTS_DDL = [
+    "CREATE VIRTUAL TABLE todos_fts USING fts5(title, description, content='todos', content_rowid='id')",
+    "CREATE TRIGGER todos_fts_insert AFTER INSERT ON todos BEGIN "
+    "INSERT INTO todos_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+    "CREATE TRIGGER todos_fts_delete AFTER DELETE ON todos BEGIN "
+    "INSERT INTO todos_fts(todos_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description); END",
+    "CREATE TRIGGER todos_fts_update AFTER UPDATE OF title, description ON todos BEGIN "
+    "INSERT INTO todos_fts(todos_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description); "
+    "INSERT INTO todos_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+]
+
+for statement in TODOS_FTS_DDL:
+    event.listen(Todo.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+event.listen(Todo.__table__, "before_drop", DDL("DROP TABLE IF EXISTS todos_fts").execute_if(dialect="sqlite"))
@@ -0,0 +1,89 @@
+import random
+import time
+from collections import OrderedDict
+from typing import Dict, List
+
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Select
+from sqlalchemy.sql.base import Executable
+
+# Requests whose session may read from a replica; anything else writes
+READ_ONLY_METHODS = frozenset({"GET", "HEAD"})
+
+class RoutingSession(Session):
+    """
+    Session that sends plain SELECTs to a read replica when it was opened
+    with info["read_only"] set, and everything else to its own bind (the
+    primary).
+
+    Inserts, updates, deletes, flushes, SELECT ... FOR UPDATE and raw SQL
+    always go to the primary. One replica is picked per session so all of
+    a request's reads come from the same copy of the data.
+
+    Once info["shard"] names one of `shards` (see route_shard), every
+    statement goes there instead, replicas or not, except those marked
+    execution_options(directory=True).
+    """
+
+    replicas: List[Engine] = []
+    shards: Dict[str, Engine] = {}
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        shard = self.info.get("shard")
+        if (
+            shard is not None
+            and kw.get("bind") is None
+            and not (isinstance(clause, Executable) and clause.get_execution_options().get("directory"))
+        ):
+            return self.shards[shard]
+        if (
+            self.replicas
+            and self.info.get("read_only")
+            and isinstance(clause, Select)
+            and clause._for_update_arg is None
+        ):
+            if "replica" not in self.info:
+                self.info["replica"] = random.choice(self.replicas)
+            return self.info["replica"]
+        return super().get_bind(mapper=mapper, clause=clause, **kw)
+
+class RecentWrites:
+    """
+    Users who wrote within the last `window` seconds, so their reads can be
+    kept on the primary until the replicas have caught up.
+
+    Kept in process memory: with several workers, a write served by one
+    worker does not pin the user's reads on the others.
+    """
+
+    def __init__(self, window: float):
+        self.window = window
+        # Every entry gets the same window, so expiry order is insertion order
+        self._until: "OrderedDict[int, float]" = OrderedDict()
+
+    def mark(self, user_id: int) -> None:
+        if self.window <= 0:
+            return
+        now = time.monotonic()
+        self._until[user_id] = now + self.window
+        self._until.move_to_end(user_id)
+        while self._until:
+            oldest, until = next(iter(self._until.items()))
+            if until > now:
+                break
+            del self._until[oldest]
+
+    def is_recent(self, user_id: int) -> bool:
+        until = self._until.get(user_id)
+        return until is not None and until > time.monotonic()
+
+    def route_session(self, db, user_id: int) -> None:
+        """
+        Apply read-your-writes to a request session once its user is known:
+        writes start the user's window, and reads inside it use the primary.
+        """
+        if not db.info.get("read_only"):
+            self.mark(user_id)
+        elif self.is_recent(user_id):
+            db.info["read_only"] = False
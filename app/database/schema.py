@@ -0,0 +1,88 @@
+import logging
+from pathlib import Path
+from typing import Set
+
+from alembic.config import Config
+from alembic.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy.engine import Engine
+
+from app.database.models import Base  # importing models registers their tables
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+
+# Databases app.services.todo_service has a todo_stats upsert for
+SUPPORTED_DIALECTS = ("mysql", "postgresql", "sqlite")
+
+class SchemaOutOfDate(RuntimeError):
+    """Raised at startup when the database is not at the Alembic head revision."""
+
+class UnsupportedDatabase(RuntimeError):
+    """Raised at startup when the database is not one of SUPPORTED_DIALECTS."""
+
+def alembic_config() -> Config:
+    # Resolved from the package, so the check works whatever the working directory
+    config = Config(str(PROJECT_ROOT / "alembic.ini"))
+    config.set_main_option("script_location", str(PROJECT_ROOT / "alembic"))
+    return config
+
+def head_revisions() -> Set[str]:
+    """Revisions the migration scripts in this checkout end at."""
+    return set(ScriptDirectory.from_config(alembic_config()).get_heads())
+
+def current_revisions(engine: Engine) -> Set[str]:
+    """Revisions stamped in the database's alembic_version table (empty when missing)."""
+    with engine.connect() as connection:
+        return set(MigrationContext.configure(connection).get_current_heads())
+
+def check_dialect(engine: Engine) -> None:
+    """
+    Refuse a database every todo write would fail on, whatever DB_SCHEMA_CHECK
+    says. Reads the engine's dialect only; no connection is made.
+
+    Raises:
+        UnsupportedDatabase: If the dialect is not in SUPPORTED_DIALECTS
+    """
+    dialect = engine.dialect.name
+    if dialect not in SUPPORTED_DIALECTS:
+        raise UnsupportedDatabase(
+            f"{dialect} is not supported; point DATABASE_URL at one of {', '.join(SUPPORTED_DIALECTS)}"
+        )
+
+def check_schema(engine: Engine, mode: str) -> Set[str]:
+    """
+    Compare the database revision with the migration head: one SELECT on
+    alembic_version instead of create_all's reflection of every table.
+
+    Args:
+        engine: Primary engine; replicas follow it
+        mode: "strict" raises SchemaOutOfDate on a mismatch, "warn" logs it,
+            "off" skips the check
+
+    Returns:
+        The database's current revisions
+    """
+    if mode == "off":
+        return set()
+    current, heads = current_revisions(engine), head_revisions()
+    if current != heads:
+        message = (
+            f"Database schema is at {sorted(current) or 'no revision'}, this code expects "
+            f"{sorted(heads)}; run `alembic upgrade head`"
+        )
+        if mode == "strict":
+            raise SchemaOutOfDate(message)
+        logger.warning(message)
+    return current
+
+def create_schema(engine: Engine) -> None:
+    """
+    Create every table on an empty database and stamp it at the head
+    revision, for throwaway databases (benchmarks, local SQLite files).
+    Real deployments run `alembic upgrade head` instead.
+    """
+    Base.metadata.create_all(engine)
+    with engine.begin() as connection:
+        MigrationContext.configure(connection).stamp(ScriptDirectory.from_config(alembic_config()), "heads")
@@ -0,0 +1,159 @@
+import asyncio
+import bisect
+import hashlib
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.sql import column, table
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Lightweight handles on tables of app.database.models, which imports this package
+user_shards = table("user_shards", column("user_id"), column("shard"))
+id_blocks = table("id_blocks", column("name"), column("next_id"))
+todos = table("todos", column("id"))
+todos_archive = table("todos_archive", column("id"))
+
+class UserMoved(RuntimeError):
+    """
+    Raised by a write that found no row for its user on the shard its
+    session was routed to: app.services.reshard moved the user since.
+    Nothing was written; the client should retry.
+    """
+
+    def __init__(self, user_id: int):
+        super().__init__(f"User {user_id} moved to another shard")
+        self.user_id = user_id
+
+def _point(key: str) -> int:
+    return int.from_bytes(hashlib.md5(key.encode()).digest()[:8], "big")
+
+class ShardMap:
+    """
+    user id -> shard name: the shard user_shards pins the user to, else the
+    first of the ring's points at or after the hash of the user id.
+
+    Each shard owns `vnodes` points, so adding a shard takes about 1/N of
+    the users from every other one instead of reshuffling them all. The
+    pins are loaded from the DATABASE_URL database and refreshed in the
+    background; pins made by this process apply at once.
+    """
+
+    def __init__(self, shards: List[str], vnodes: int, engine, async_engine):
+        self.shards = shards
+        self.engine = engine
+        self.async_engine = async_engine
+        ring = sorted((_point(f"{shard}#{i}"), shard) for shard in shards for i in range(vnodes))
+        self._points = [point for point, _ in ring]
+        self._owners = [shard for _, shard in ring]
+        self._pinned: Dict[int, str] = {}
+
+    def ring_shard(self, user_id: int) -> str:
+        """Where the ring alone places the user."""
+        index = bisect.bisect_left(self._points, _point(str(user_id)))
+        return self._owners[index % len(self._owners)]
+
+    def shard_for(self, user_id: int) -> str:
+        return self._pinned.get(user_id) or self.ring_shard(user_id)
+
+    def pinned(self) -> Dict[int, str]:
+        return dict(self._pinned)
+
+    def pin(self, user_id: int, shard: Optional[str]) -> None:
+        """Apply a pin (None: drop it) in this process without waiting for a refresh."""
+        if shard is None:
+            self._pinned.pop(user_id, None)
+        else:
+            self._pinned[user_id] = shard
+
+    def load(self) -> None:
+        with self.engine.connect() as connection:
+            rows = connection.execute(select(user_shards.c.user_id, user_shards.c.shard)).all()
+        self._pinned = dict(rows)
+
+    async def refresh(self) -> None:
+        if settings.DB_ASYNC_MODE:
+            async with self.async_engine.connect() as connection:
+                rows = (await connection.execute(select(user_shards.c.user_id, user_shards.c.shard))).all()
+            self._pinned = dict(rows)
+        else:
+            await run_in_threadpool(self.load)
+
+    async def poll(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.refresh()
+            except Exception:
+                logger.exception("Refreshing shard pins failed")
+
+class IdBlocks:
+    """
+    Hands out todo ids when sharded. reshard moves rows with their ids, so
+    ids must be unique across shards, which no shard's AUTO_INCREMENT can
+    promise; instead each worker leases block_size ids at a time from the
+    id_blocks row in the DATABASE_URL database. Ids of a lease a worker did
+    not use up before exiting are skipped.
+    """
+
+    def __init__(self, name: str, block_size: int, engine, async_engine, shard_engines: list):
+        self.name = name
+        self.block_size = block_size
+        self.engine = engine
+        self.async_engine = async_engine
+        self.shard_engines = shard_engines
+        self._next = self._end = 0
+        self._lock = threading.Lock()
+
+    def _first_id(self) -> int:
+        # Blocking reads of every shard, once per deployment
+        highest = 0
+        for shard_engine in self.shard_engines:
+            with shard_engine.connect() as connection:
+                for ids in (todos, todos_archive):
+                    highest = max(highest, connection.scalar(select(func.max(ids.c.id))) or 0)
+        return highest + 1
+
+    def _lease(self, connection, count: int) -> Tuple[int, int]:
+        size = max(count, self.block_size)
+        bump = (
+            update(id_blocks)
+            .where(id_blocks.c.name == self.name)
+            .values(next_id=id_blocks.c.next_id + size)
+        )
+        if not connection.execute(bump).rowcount:
+            # First lease: start above every id the shards already hold
+            try:
+                with connection.begin_nested():
+                    connection.execute(insert(id_blocks).values(name=self.name, next_id=self._first_id()))
+            except IntegrityError:
+                pass  # another worker got there first
+            connection.execute(bump)
+        end = connection.scalar(select(id_blocks.c.next_id).where(id_blocks.c.name == self.name))
+        return end - size, end
+
+    def _take(self, count: int) -> List[int]:
+        ids = list(range(self._next, self._next + count))
+        self._next += count
+        return ids
+
+    def take(self, count: int) -> List[int]:
+        with self._lock:
+            if self._end - self._next < count:
+                with self.engine.begin() as connection:
+                    self._next, self._end = self._lease(connection, count)
+            return self._take(count)
+
+    async def take_async(self, count: int) -> List[int]:
+        if self._end - self._next < count:
+            async with self.async_engine.begin() as connection:
+                # Coroutines that ran out together each lease; the loser's
+                # leftover ids are skipped
+                self._next, self._end = await connection.run_sync(self._lease, count)
+        return self._take(count)
@@ -1,6 +1,27 @@
-from fastapi import FastAPI
-from app.database.connection import engine, Base
-from app.api import auth_routes, todo_routes
+import asyncio
+import logging
+import time
+from anyio import to_thread
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
+from app.core.admission import AdmissionMiddleware
+from app.core.config import settings
+from app.core.feed import change_feed
+from app.core.log import configure_logging
+from app.core.metrics import MetricsMiddleware, mark_process_dead, render_metrics
+from app.core.password_pool import password_pool
+from app.core.security import warm_jwt
+from app.core.token_cache import revocation_list
+from app.database.connection import engine, pool_sizing_warnings, prewarm_pools, shard_engines, shard_map
+from app.database.schema import check_dialect, check_schema
+from app.database.sharding import UserMoved
+from app.services.todo_archive import todo_archiver
+from app.services.todo_stats import todo_stats_repairer
+from app.services.todo_sync import tombstone_compactor
+from app.api import auth_routes, debug_routes, todo_routes
+
+logger = logging.getLogger(__name__)
 
 app = FastAPI(
     title="Todo Management API",
@@ -8,23 +29,155 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# Added first so it sits inside MetricsMiddleware, which then counts the 429/503s
+app.add_middleware(AdmissionMiddleware)
+app.add_middleware(MetricsMiddleware)
+# Flipped by the last startup hook, and back on shutdown
+app.state.ready = False
+
 # Include API routers
 app.include_router(auth_routes.router, prefix="/auth", tags=["auth"])
 app.include_router(todo_routes.router, prefix="/todos", tags=["todos"])
+if settings.DEBUG_ENDPOINTS:
+    app.include_router(debug_routes.router, prefix="/debug", tags=["debug"], include_in_schema=False)
 
 @app.get("/")
 def root():
     return {"message": "Welcome to the Todo Management API"}
 
-# Create database tables on startup
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    body, content_type = render_metrics()
+    return Response(content=body, headers={"Content-Type": content_type})
+
+@app.get("/health/ready", include_in_schema=False)
+def readiness():
+    """
+    200 once startup has checked the schema revision and warmed the pools
+    and auth; 503 before that and while shutting down.
+    """
+    if not app.state.ready:
+        return JSONResponse({"ready": False}, status_code=503)
+    return {"ready": True, **app.state.startup}
+
+# reshard moved the user after get_current_user routed the request; nothing was
+# written. Reload the pins so the client's retry reaches the user's new shard
+@app.exception_handler(UserMoved)
+async def user_moved(request: Request, exc: UserMoved):
+    try:
+        await shard_map.refresh()
+    except Exception:
+        logger.exception("Refreshing shard pins failed")
+    return JSONResponse(
+        {"detail": "User is being moved to another shard, retry"},
+        status_code=503,
+        headers={"Retry-After": "1"}
+    )
+
+# Logging is set up by the serving worker, not on import: alembic, the
+# benchmarks and the tests import this module and keep their own handlers
+@app.on_event("startup")
+def start_logging():
+    configure_logging()
+
+# Size Starlette's threadpool and check it against the connection pool
+@app.on_event("startup")
+async def configure_threadpool():
+    app.state.started_at = time.perf_counter()
+    to_thread.current_default_thread_limiter().total_tokens = settings.THREADPOOL_SIZE
+    for warning in pool_sizing_warnings():
+        logger.warning(warning)
+
+# Schema changes go through Alembic; a worker only checks it is at the head
+# revision (failing startup when it isn't) and warms what the first requests need
+@app.on_event("startup")
+async def prepare():
+    for shard_engine in [engine, *shard_engines.values()]:
+        check_dialect(shard_engine)
+    revisions = await run_in_threadpool(check_schema, engine, settings.DB_SCHEMA_CHECK)
+    # Each shard is migrated on its own, and has to be at the same head
+    for shard_engine in shard_engines.values():
+        if shard_engine is not engine:
+            await run_in_threadpool(check_schema, shard_engine, settings.DB_SCHEMA_CHECK)
+    prewarm = settings.DB_POOL_SIZE if settings.DB_POOL_PREWARM is None else settings.DB_POOL_PREWARM
+    prewarmed = await prewarm_pools(prewarm)
+    await password_pool.warm()
+    warm_jwt()
+    app.state.startup = {
+        "schema_revision": ",".join(sorted(revisions)) or None,
+        "prewarmed_connections": prewarmed,
+    }
+
+# Keep the in-memory token revocation list in sync with the users table
 @app.on_event("startup")
-def startup():
+async def start_revocation_refresh():
     try:
-        Base.metadata.create_all(bind=engine)
-        print("✅ Database tables created successfully")
-    except Exception as e:
-        print(f"❌ Error creating database tables: {e}")
+        await revocation_list.refresh()
+    except Exception:
+        logger.exception("Loading token revocations failed")
+    app.state.revocation_task = asyncio.create_task(
+        revocation_list.poll(settings.AUTH_REVOCATION_REFRESH_SECONDS)
+    )
+
+# Keep the shard pins made by app.services.reshard in sync, when sharded
+@app.on_event("startup")
+async def start_shard_map_refresh():
+    app.state.shard_map_task = None
+    if shard_map:
+        # A worker that can't tell where users live must not serve them
+        await shard_map.refresh()
+        app.state.shard_map_task = asyncio.create_task(
+            shard_map.poll(settings.SHARD_MAP_REFRESH_SECONDS)
+        )
+
+# Delete todo tombstones no sync token can need any more
+@app.on_event("startup")
+async def start_tombstone_compaction():
+    app.state.compaction_task = asyncio.create_task(
+        tombstone_compactor.poll(settings.SYNC_COMPACT_INTERVAL_SECONDS)
+    )
+
+# Rebuild todo_stats where it drifted from todos, when an interval is set
+@app.on_event("startup")
+async def start_stats_repair():
+    app.state.stats_repair_task = None
+    if settings.TODO_STATS_REPAIR_INTERVAL_SECONDS > 0:
+        app.state.stats_repair_task = asyncio.create_task(
+            todo_stats_repairer.poll(settings.TODO_STATS_REPAIR_INTERVAL_SECONDS)
+        )
+
+# Move old completed todos to todos_archive, when an interval is set
+@app.on_event("startup")
+async def start_archiver():
+    app.state.archiver_task = None
+    if settings.ARCHIVE_INTERVAL_SECONDS > 0:
+        app.state.archiver_task = asyncio.create_task(
+            todo_archiver.poll(settings.ARCHIVE_INTERVAL_SECONDS)
+        )
+
+# Heartbeats for open change feeds, and the cross-worker subscription
+@app.on_event("startup")
+async def start_change_feed():
+    await change_feed.start()
+
+# Registered last, so it runs after every other startup hook succeeded
+@app.on_event("startup")
+def mark_ready():
+    app.state.startup["startup_seconds"] = round(time.perf_counter() - app.state.started_at, 3)
+    app.state.ready = True
+    logger.info("Ready to serve", extra=app.state.startup)
 
 @app.on_event("shutdown")
-def shutdown():
-    print("🛑 Application shutting down")
\ No newline at end of file
+async def shutdown():
+    app.state.ready = False
+    app.state.revocation_task.cancel()
+    app.state.compaction_task.cancel()
+    if app.state.shard_map_task:
+        app.state.shard_map_task.cancel()
+    if app.state.stats_repair_task:
+        app.state.stats_repair_task.cancel()
+    if app.state.archiver_task:
+        app.state.archiver_task.cancel()
+    await change_feed.stop()
+    mark_process_dead()
+    logger.info("Application shutting down")
\ No newline at end of file
@@ -1,11 +1,27 @@
-from typing import List, Optional
-from pydantic import BaseModel
+from datetime import date, datetime
+from typing import Dict, List, Optional
+from pydantic import BaseModel, conlist, validator
 from enum import Enum
+from app.core.config import settings
 
 class TodoStatus(str, Enum):
     PENDING = "pending"
     COMPLETED = "completed"
 
+class TodoSort(str, Enum):
+    CREATED_AT = "created_at"
+    CREATED_AT_DESC = "-created_at"
+    TITLE = "title"
+
+class CountMode(str, Enum):
+    EXACT = "exact"
+    ESTIMATED = "estimated"
+    NONE = "none"
+
+class ExportFormat(str, Enum):
+    NDJSON = "ndjson"
+    CSV = "csv"
+
 class TodoBase(BaseModel):
     title: str
     description: Optional[str] = None
@@ -23,12 +39,71 @@ class TodoResponse(TodoBase):
     status: TodoStatus
     user_id: int
     created_at: str
+    version: int
+    updated_at: Optional[str] = None
 
     class Config:
         from_attributes = True
+        orm_mode = True
+
+    @validator("created_at", "updated_at", pre=True)
+    def serialize_created_at(cls, value):
+        if isinstance(value, datetime):
+            return value.isoformat()
+        return value
 
 class TodoListResponse(BaseModel):
     todos: List[TodoResponse]
-    total: int
+    total: Optional[int] = None
+    skip: int
+    limit: int
+    next_cursor: Optional[str] = None
+
+class TodoSearchResponse(BaseModel):
+    todos: List[TodoResponse]
     skip: int
     limit: int
+    has_more: bool
+
+class TodoChangesResponse(BaseModel):
+    todos: List[TodoResponse]
+    deleted: List[int]
+    next_token: str
+    has_more: bool
+
+class TodoStatsDay(BaseModel):
+    day: date
+    total: int
+    by_status: Dict[TodoStatus, int]
+
+class TodoStatsResponse(BaseModel):
+    total: int
+    by_status: Dict[TodoStatus, int]
+    days: List[TodoStatsDay]
+
+class TodoBulkCreate(BaseModel):
+    items: conlist(TodoCreate, min_items=1, max_items=settings.BULK_MAX_ITEMS)
+
+class TodoBulkUpdateItem(TodoUpdate):
+    id: int
+
+class TodoBulkUpdate(BaseModel):
+    items: conlist(TodoBulkUpdateItem, min_items=1, max_items=settings.BULK_MAX_ITEMS)
+
+class TodoBulkDelete(BaseModel):
+    ids: conlist(int, min_items=1, max_items=settings.BULK_MAX_ITEMS)
+
+class BulkItemStatus(str, Enum):
+    CREATED = "created"
+    UPDATED = "updated"
+    DELETED = "deleted"
+    NOT_FOUND = "not_found"
+    DUPLICATE = "duplicate"
+
+class TodoBulkItemResult(BaseModel):
+    id: Optional[int] = None
+    status: BulkItemStatus
+    todo: Optional[TodoResponse] = None
+
+class TodoBulkResponse(BaseModel):
+    results: List[TodoBulkItemResult]
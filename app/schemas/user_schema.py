@@ -1,5 +1,6 @@
+from datetime import datetime
 from typing import List, Optional
-from pydantic import BaseModel
+from pydantic import BaseModel, validator
 from enum import Enum
 
 class UserBase(BaseModel):
@@ -15,6 +16,13 @@ class UserResponse(UserBase):
 
     class Config:
         from_attributes = True
+        orm_mode = True
+
+    @validator("created_at", pre=True)
+    def serialize_created_at(cls, value):
+        if isinstance(value, datetime):
+            return value.isoformat()
+        return value
 
 class Token(BaseModel):
     access_token: str
@@ -0,0 +1,301 @@
+import argparse
+import json
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, insert, select, tuple_, update
+from sqlalchemy.engine import Connection
+
+from app.core.config import settings
+from app.database.connection import engine, shard_engines, shard_map
+from app.database.models import Todo, TodoArchive, TodoStat, TodoTombstone, User, UserShard
+from app.services.todo_service import _lock_users
+
+logger = logging.getLogger(__name__)
+
+# Rows per SELECT/INSERT while copying a user's todos, archived todos and tombstones
+COPY_BATCH_SIZE = 1000
+
+todos = Todo.__table__
+archive = TodoArchive.__table__
+tombstones = TodoTombstone.__table__
+stats = TodoStat.__table__
+users = User.__table__
+# Copied in keyset batches, each with its key columns
+BATCHED = (
+    (todos, (todos.c.id,)),
+    (archive, (archive.c.id,)),
+    (tombstones, (tombstones.c.change_seq, tombstones.c.todo_id)),
+)
+
+def _copy_batch(
+    src: Connection,
+    dst: Connection,
+    table,
+    keys: tuple,
+    user_id: int,
+    since: Optional[int],
+    after: Optional[tuple]
+) -> Tuple[int, Optional[tuple]]:
+    """
+    Copy the next batch of the user's rows after key `after`, only those
+    written after change_seq `since` when set, replacing copies dst has.
+
+    Returns:
+        Rows copied (0 when done), and the key to continue after
+    """
+    query = select(table).where(table.c.user_id == user_id)
+    if since is not None:
+        query = query.where(table.c.change_seq > since)
+    if after is not None:
+        query = query.where(tuple_(*keys) > tuple_(*after))
+    rows = [dict(row) for row in src.execute(query.order_by(*keys).limit(COPY_BATCH_SIZE)).mappings()]
+    if not rows:
+        return 0, None
+    if since is not None:
+        dst.execute(delete(table).where(tuple_(*keys).in_([tuple(row[key.name] for key in keys) for row in rows])))
+    dst.execute(insert(table), rows)
+    return len(rows), tuple(rows[-1][key.name] for key in keys)
+
+def _clear(connection: Connection, user_id: int, keep_user: bool) -> None:
+    """
+    Delete the user's todos and bookkeeping, and unless it is the account
+    itself their row and the fence of a move that didn't finish.
+    """
+    for table in (stats, tombstones, archive, todos):
+        connection.execute(delete(table).where(table.c.user_id == user_id))
+    if not keep_user:
+        connection.execute(delete(UserShard).where(UserShard.user_id == user_id))
+        connection.execute(delete(users).where(users.c.id == user_id))
+
+def _pin(connection: Connection, user_id: int, shard: str) -> None:
+    connection.execute(delete(UserShard).where(UserShard.user_id == user_id))
+    connection.execute(insert(UserShard).values(user_id=user_id, shard=shard))
+
+def move_user(user_id: int, target: str) -> Dict[str, Any]:
+    """
+    Move a user's todos, archived todos, tombstones and todo_stats to
+    `target` while they keep using the API.
+
+    Everything is copied first without stopping anyone; meanwhile a pin to
+    the source in the target's own user_shards fences off the copy from
+    workers whose shard map sends the user there already. Then the user's
+    row on the source is locked, the lock every todo write takes first,
+    and what changed since the copy (change_seq above the version copied)
+    is copied again. The pin to `target` is written, and the source rows
+    are deleted in the transaction holding the lock: writes that queued on
+    it, or reach the source later through a stale shard map, find the user
+    gone (or pinned elsewhere) and fail with UserMoved, which the API turns
+    into a 503 to retry.
+
+    Reads from a worker that hasn't reloaded the pins yet see an empty
+    list for up to SHARD_MAP_REFRESH_SECONDS.
+
+    Returns:
+        What was moved and for how long the user's writes were held
+    """
+    source = shard_map.shard_for(user_id)
+    if target not in shard_engines:
+        raise ValueError(f"Unknown shard {target!r}; shards are {', '.join(shard_engines)}")
+    if source == target:
+        return {"user_id": user_id, "shard": target, "moved": False}
+    src_engine, dst_engine = shard_engines[source], shard_engines[target]
+
+    started = time.perf_counter()
+    with src_engine.connect() as src:
+        user = src.execute(select(users).where(users.c.id == user_id)).mappings().one_or_none()
+    if user is None:
+        raise ValueError(f"User {user_id} has no row on {source}")
+    since = user["todos_version"]
+    with dst_engine.begin() as dst:
+        # Leftovers of an interrupted move; the shard holding DATABASE_URL keeps the account
+        _clear(dst, user_id, keep_user=dst_engine is engine)
+        if dst_engine is not engine:
+            dst.execute(insert(users).values(**user))
+            # The fence; on the DATABASE_URL database the real pin to the source does this
+            _pin(dst, user_id, source)
+    copied = dict.fromkeys((table.name for table, _ in BATCHED), 0)
+    for table, keys in BATCHED:
+        after = None
+        while True:
+            # A transaction per batch, so SQLite writers aren't held off for the whole copy
+            with src_engine.connect() as src, dst_engine.begin() as dst:
+                count, after = _copy_batch(src, dst, table, keys, user_id, None, after)
+            if not count:
+                break
+            copied[table.name] += count
+
+    frozen = time.perf_counter()
+    changed = dict.fromkeys(copied, 0)
+    with src_engine.begin() as src:
+        src.execute(_lock_users([user_id]))
+        version = src.scalar(select(users.c.todos_version).where(users.c.id == user_id))
+        with dst_engine.begin() as dst:
+            for table, keys in BATCHED:
+                after = None
+                while True:
+                    count, after = _copy_batch(src, dst, table, keys, user_id, since, after)
+                    if not count:
+                        break
+                    changed[table.name] += count
+            # A todo is in one tier: one archived or restored since the copy
+            # leaves a stale copy in the other
+            for table, other in ((todos, archive), (archive, todos)):
+                moved = select(table.c.id).where(table.c.user_id == user_id, table.c.change_seq > since)
+                dst.execute(
+                    delete(other).where(other.c.user_id == user_id, other.c.id.in_(src.scalars(moved).all()))
+                )
+            # Todos deleted since the copy
+            deleted = select(tombstones.c.todo_id).where(
+                tombstones.c.user_id == user_id, tombstones.c.change_seq > since
+            )
+            deleted_ids = src.scalars(deleted).all()
+            for table in (todos, archive):
+                dst.execute(delete(table).where(table.c.user_id == user_id, table.c.id.in_(deleted_ids)))
+            dst.execute(delete(stats).where(stats.c.user_id == user_id))
+            counters = [dict(row) for row in src.execute(select(stats).where(stats.c.user_id == user_id)).mappings()]
+            if counters:
+                dst.execute(insert(stats), counters)
+            dst.execute(update(users).where(users.c.id == user_id).values(todos_version=version))
+            if dst_engine is not engine:
+                dst.execute(delete(UserShard).where(UserShard.user_id == user_id))
+        # On SQLite, a second connection to the source's file would wait for this one
+        if src_engine is engine:
+            _pin(src, user_id, target)
+        else:
+            with engine.begin() as directory:
+                _pin(directory, user_id, target)
+        _clear(src, user_id, keep_user=src_engine is engine)
+    shard_map.pin(user_id, target)
+
+    report = {
+        "user_id": user_id,
+        "from": source,
+        "to": target,
+        "moved": True,
+        "copied": copied,
+        "changed_while_copying": changed,
+        "seconds": round(time.perf_counter() - started, 3),
+        "writes_held_seconds": round(time.perf_counter() - frozen, 3),
+    }
+    logger.info("Moved user to another shard", extra=report)
+    return report
+
+def _user_batches(batch_size: int = 1000):
+    after = 0
+    while True:
+        with engine.connect() as connection:
+            user_ids = connection.scalars(
+                select(User.id).where(User.id > after).order_by(User.id).limit(batch_size)
+            ).all()
+        if not user_ids:
+            return
+        yield user_ids
+        after = user_ids[-1]
+
+def _placed(user_ids: List[int]) -> Dict[int, str]:
+    """
+    The shard holding each user's row: a shard other than the DATABASE_URL
+    database with a copy not fenced off by a move in progress, else the
+    DATABASE_URL database if it is a shard. Users found nowhere are left out.
+    """
+    placed = {}
+    for name, shard_engine in shard_engines.items():
+        if shard_engine is engine:
+            continue
+        fenced = select(UserShard.user_id).where(UserShard.user_id == users.c.id).exists()
+        with shard_engine.connect() as connection:
+            found = connection.scalars(select(users.c.id).where(users.c.id.in_(user_ids), ~fenced)).all()
+        placed.update(dict.fromkeys(found, name))
+    home = next((name for name, shard_engine in shard_engines.items() if shard_engine is engine), None)
+    if home is not None:
+        for user_id in user_ids:
+            placed.setdefault(user_id, home)
+    return placed
+
+def pin_all(shard: Optional[str] = None) -> int:
+    """
+    Pin every user without a pin to `shard`, or to the shard holding their
+    row, so they stay where their todos are whatever DATABASE_SHARD_URLS
+    says until rebalance moves them. Returns how many.
+    """
+    if shard is not None and shard not in shard_engines:
+        raise ValueError(f"Unknown shard {shard!r}; shards are {', '.join(shard_engines)}")
+    pinned = shard_map.pinned()
+    added = 0
+    for user_ids in _user_batches():
+        unpinned = [user_id for user_id in user_ids if user_id not in pinned]
+        placed = dict.fromkeys(unpinned, shard) if shard else _placed(unpinned)
+        rows = [{"user_id": user_id, "shard": name} for user_id, name in placed.items()]
+        if rows:
+            with engine.begin() as connection:
+                connection.execute(insert(UserShard), rows)
+            added += len(rows)
+    shard_map.load()
+    return added
+
+def rebalance(dry_run: bool = False) -> List[Dict[str, Any]]:
+    """Move every pinned user the ring places elsewhere to the ring's shard."""
+    moves = []
+    for user_id, shard in sorted(shard_map.pinned().items()):
+        target = shard_map.ring_shard(user_id)
+        if target == shard:
+            continue
+        if dry_run:
+            moves.append({"user_id": user_id, "from": shard, "to": target, "moved": False})
+        else:
+            moves.append(move_user(user_id, target))
+    return moves
+
+def unpin() -> int:
+    """
+    Drop the pins the ring agrees with. Pins written within two shard map
+    refreshes are kept: a worker still routing by an older pin to a source
+    that is the DATABASE_URL database is only turned away by the new one.
+    Returns how many were dropped.
+    """
+    recent = datetime.utcnow() - timedelta(seconds=2 * settings.SHARD_MAP_REFRESH_SECONDS)
+    with engine.begin() as connection:
+        rows = connection.execute(
+            select(UserShard.user_id, UserShard.shard).where(UserShard.updated_at < recent)
+        ).all()
+        agreed = [user_id for user_id, shard in rows if shard_map.ring_shard(user_id) == shard]
+        for start in range(0, len(agreed), COPY_BATCH_SIZE):
+            connection.execute(delete(UserShard).where(UserShard.user_id.in_(agreed[start:start + COPY_BATCH_SIZE])))
+    shard_map.load()
+    return len(agreed)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Move users' todos between shards while they are in use")
+    commands = parser.add_subparsers(dest="command", required=True)
+    move = commands.add_parser("move", help="Move one user to a shard")
+    move.add_argument("user_id", type=int)
+    move.add_argument("shard")
+    pin = commands.add_parser("pin", help="Pin every unpinned user where their todos are now")
+    pin.add_argument("--to", default=None, help="Shard holding every unpinned user's todos (default: where their row is)")
+    moves = commands.add_parser("rebalance", help="Move pinned users to the shard the ring places them on")
+    moves.add_argument("--dry-run", action="store_true", help="Only list the moves")
+    commands.add_parser("unpin", help="Drop pins the ring agrees with")
+    args = parser.parse_args(argv)
+    if shard_map is None:
+        parser.error("DATABASE_SHARD_URLS is not set")
+
+    shard_map.load()
+    try:
+        if args.command == "move":
+            result = move_user(args.user_id, args.shard)
+        elif args.command == "pin":
+            result = {"pinned": pin_all(args.to)}
+        elif args.command == "rebalance":
+            result = rebalance(args.dry_run)
+        else:
+            result = {"unpinned": unpin()}
+    except ValueError as e:
+        parser.error(str(e))
+    print(json.dumps(result, indent=2))
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
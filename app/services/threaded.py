@@ -0,0 +1,21 @@
+from typing import Any, Callable
+from starlette.concurrency import run_in_threadpool
+
+class ThreadedService:
+    """
+    Wrap a sync service class so its static methods can be awaited.
+
+    Each call runs in Starlette's threadpool, which lets the async routes
+    keep a single code path while DB_ASYNC_MODE is switched off.
+    """
+
+    def __init__(self, service: type):
+        self._service = service
+
+    def __getattr__(self, name: str) -> Callable[..., Any]:
+        method = getattr(self._service, name)
+
+        async def call(*args: Any, **kwargs: Any) -> Any:
+            return await run_in_threadpool(method, *args, **kwargs)
+
+        return call
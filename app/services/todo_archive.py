@@ -0,0 +1,134 @@
+import argparse
+import asyncio
+import json
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import func, select
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.metrics import TODO_TABLE_ROWS, TODOS_ARCHIVED
+from app.database.connection import SHARDS, async_shard_session, shard_session
+from app.database.models import TodoArchive
+from app.services.todo_service import AsyncTodoService, TodoService, todo_cache
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_ROWS = select(func.count()).select_from(TodoArchive)
+
+class TodoArchiver:
+    """
+    Moves completed todos nobody touched for `after` seconds from todos to
+    todos_archive, so the hot table and the indexes every list reads only
+    hold the todos people still work on.
+
+    Walks todos by id, batch_size rows at a time, each batch in a transaction
+    holding the row locks of the users whose todos it archives. After every
+    batch it sleeps sleep_factor times as long as the batch took, which caps
+    its share of the database's time at 1 / (1 + sleep_factor).
+    """
+
+    def __init__(self, after: float, batch_size: int, sleep_factor: float):
+        self.after = after
+        self.batch_size = batch_size
+        self.sleep_factor = sleep_factor
+        self.last_report: Optional[Dict[str, Any]] = None
+
+    def _archive_batch_sync(self, shard: Optional[str], after_id: int, before: datetime):
+        with shard_session(shard) as db:
+            return TodoService.archive_todos(db, after_id, self.batch_size, before)
+
+    def _archive_rows_sync(self, shard: Optional[str]) -> int:
+        with shard_session(shard) as db:
+            return db.scalar(ARCHIVE_ROWS)
+
+    async def _archive_batch(self, shard: Optional[str], after_id: int, before: datetime):
+        if settings.DB_ASYNC_MODE:
+            async with async_shard_session(shard) as db:
+                return await AsyncTodoService.archive_todos(db, after_id, self.batch_size, before)
+        return await run_in_threadpool(self._archive_batch_sync, shard, after_id, before)
+
+    async def _archive_rows(self, shard: Optional[str]) -> int:
+        if settings.DB_ASYNC_MODE:
+            async with async_shard_session(shard) as db:
+                return await db.scalar(ARCHIVE_ROWS)
+        return await run_in_threadpool(self._archive_rows_sync, shard)
+
+    async def run(self) -> Dict[str, Any]:
+        before = datetime.utcnow() - timedelta(seconds=self.after)
+        started = time.perf_counter()
+        busy = 0.0
+        examined = archived = batches = 0
+        tables = {}
+        # Each shard archives the todos it holds
+        for shard in SHARDS:
+            after_id, hot = 0, 0
+            while True:
+                batch_started = time.perf_counter()
+                after_id, scanned, todo_ids, user_ids = await self._archive_batch(shard, after_id, before)
+                took = time.perf_counter() - batch_started
+                busy += took
+                batches += 1
+                examined += scanned
+                archived += len(todo_ids)
+                # What the walk leaves behind is the hot table's size, at no extra cost
+                hot += scanned - len(todo_ids)
+                TODOS_ARCHIVED.inc(len(todo_ids))
+                if todo_ids and todo_cache:
+                    for user_id in user_ids:
+                        await todo_cache.invalidate(user_id)
+                if scanned < self.batch_size:
+                    break
+                await asyncio.sleep(took * self.sleep_factor)
+            label = shard or "default"
+            tables[label] = {"hot": hot, "archive": await self._archive_rows(shard)}
+            for table, rows in tables[label].items():
+                TODO_TABLE_ROWS.labels(label, table).set(rows)
+
+        elapsed = time.perf_counter() - started
+        self.last_report = {
+            "finished_at": datetime.utcnow().isoformat(),
+            "archived_before": before.isoformat(),
+            "examined": examined,
+            "archived": archived,
+            "batches": batches,
+            "busy_seconds": round(busy, 3),
+            "elapsed_seconds": round(elapsed, 3),
+            "examined_per_second": round(examined / busy, 1) if busy else None,
+            "archived_per_second": round(archived / busy, 1) if busy else None,
+            "tables": tables,
+        }
+        logger.info("Archived completed todos", extra=self.last_report)
+        return self.last_report
+
+    async def poll(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.run()
+            except Exception:
+                logger.exception("Archiving todos failed")
+
+todo_archiver = TodoArchiver(
+    after=settings.ARCHIVE_AFTER_SECONDS,
+    batch_size=settings.ARCHIVE_BATCH_SIZE,
+    sleep_factor=settings.ARCHIVE_SLEEP_FACTOR
+)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Move completed todos nobody touched lately to todos_archive")
+    parser.add_argument("--after", type=float, default=None, help="Age in seconds (default: ARCHIVE_AFTER_SECONDS)")
+    parser.add_argument("--sleep-factor", type=float, default=None, help="Throttle (default: ARCHIVE_SLEEP_FACTOR)")
+    args = parser.parse_args(argv)
+    if args.after is not None:
+        todo_archiver.after = args.after
+    if args.sleep_factor is not None:
+        todo_archiver.sleep_factor = args.sleep_factor
+    print(json.dumps(asyncio.run(todo_archiver.run()), indent=2, default=str))
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,173 @@
+import json
+from typing import Any, Awaitable, Callable, Dict, Optional, Type
+
+from pydantic import BaseModel
+
+from app.core.cache import CacheBackend
+from app.schemas.todo_schema import TodoListResponse, TodoResponse, TodoSearchResponse, TodoStatsResponse
+from app.utils.serializers import todo_dict
+
+# Per-user write counters are kept in a fixed number of slots; a collision only
+# means a cache fill is skipped, never that a stale value is stored
+EPOCH_SLOTS = 4096
+
+class TodoCache:
+    """
+    Read-through cache for todo reads with write-driven invalidation.
+
+    All entries of a user share one namespace that every write drops. Fills
+    are skipped when a write on this node happened while the value was being
+    loaded, so a read following a write here never sees the old data.
+    """
+
+    def __init__(self, backend: CacheBackend, ttl: int):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._epochs = [0] * EPOCH_SLOTS
+
+    @staticmethod
+    def _namespace(user_id: int) -> str:
+        return f"user:{user_id}"
+
+    def _epoch(self, user_id: int) -> int:
+        return self._epochs[user_id % EPOCH_SLOTS]
+
+    async def read(
+        self,
+        user_id: int,
+        field: str,
+        model: Type[BaseModel],
+        load: Callable[[], Awaitable[Any]]
+    ) -> Optional[BaseModel]:
+        namespace = self._namespace(user_id)
+        cached = await self.backend.get(namespace, field, model)
+        if cached is not None:
+            self.hits += 1
+            return cached
+
+        self.misses += 1
+        epoch = self._epoch(user_id)
+        value = await load()
+        if value is None:
+            return None
+        if not isinstance(value, model):
+            value = model.from_orm(value)
+
+        if self._epoch(user_id) == epoch:
+            await self.backend.set(namespace, field, value, self.ttl)
+            # A write may have landed while the set was in flight
+            if self._epoch(user_id) != epoch:
+                await self.backend.delete_namespace(namespace)
+        return value
+
+    async def invalidate(self, user_id: int) -> None:
+        self._epochs[user_id % EPOCH_SLOTS] += 1
+        self.invalidations += 1
+        await self.backend.delete_namespace(self._namespace(user_id))
+
+    async def stats(self) -> Dict[str, Any]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "ttl_seconds": self.ttl,
+            **await self.backend.stats(),
+        }
+
+async def _detached(load: Awaitable[BaseModel]) -> BaseModel:
+    # Pages come from the services built with construct() around ORM rows;
+    # cache plain TodoResponse models instead (trusted values, so no validation)
+    page = await load
+    return page.copy(update={"todos": [TodoResponse.construct(**todo_dict(todo)) for todo in page.todos]})
+
+class CachedTodoService:
+    """
+    Wrap an awaitable todo service (AsyncTodoService or its threaded twin)
+    with a TodoCache. Reads go through the cache and writes invalidate the
+    user's entries; any other method is passed straight through, so new
+    write methods must be added here to keep the cache coherent.
+    """
+
+    def __init__(self, service: Any, cache: TodoCache):
+        self._service = service
+        self._cache = cache
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._service, name)
+
+    async def get_list_version(self, db, user_id: int):
+        # Remembered for the rest of the request: every entry is keyed by it,
+        # so a worker whose local cache missed another worker's invalidation
+        # (or a shared cache racing one) never serves what a write replaced
+        list_version = await self._service.get_list_version(db=db, user_id=user_id)
+        db.info[("list_version", user_id)] = list_version
+        return list_version
+
+    async def _versioned(self, db, user_id: int, kind: str, params: Dict[str, Any]) -> str:
+        list_version = db.info.get(("list_version", user_id))
+        if list_version is None:
+            list_version = await self.get_list_version(db, user_id)
+        return f"{kind}:v{list_version}:" + json.dumps(params, sort_keys=True, default=str)
+
+    async def get_todo_by_id(self, db, todo_id: int, user_id: int):
+        field = await self._versioned(db, user_id, "todo", {"todo_id": todo_id})
+        return await self._cache.read(
+            user_id,
+            field,
+            TodoResponse,
+            lambda: self._service.get_todo_by_id(db=db, todo_id=todo_id, user_id=user_id)
+        )
+
+    async def get_user_todos(self, db, user_id: int, **params: Any):
+        field = await self._versioned(db, user_id, "list", params)
+        return await self._cache.read(
+            user_id,
+            field,
+            TodoListResponse,
+            lambda: _detached(self._service.get_user_todos(db=db, user_id=user_id, **params))
+        )
+
+    async def search_todos(self, db, user_id: int, **params: Any):
+        field = await self._versioned(db, user_id, "search", params)
+        return await self._cache.read(
+            user_id,
+            field,
+            TodoSearchResponse,
+            lambda: _detached(self._service.search_todos(db=db, user_id=user_id, **params))
+        )
+
+    async def get_stats(self, db, user_id: int, **params: Any):
+        field = await self._versioned(db, user_id, "stats", params)
+        return await self._cache.read(
+            user_id,
+            field,
+            TodoStatsResponse,
+            lambda: self._service.get_stats(db=db, user_id=user_id, **params)
+        )
+
+    async def _write(self, method: str, user_id: int, **kwargs: Any):
+        try:
+            return await getattr(self._service, method)(user_id=user_id, **kwargs)
+        finally:
+            await self._cache.invalidate(user_id)
+
+    async def create_todo(self, user_id: int, **kwargs: Any):
+        return await self._write("create_todo", user_id, **kwargs)
+
+    async def update_todo(self, user_id: int, **kwargs: Any):
+        return await self._write("update_todo", user_id, **kwargs)
+
+    async def delete_todo(self, user_id: int, **kwargs: Any):
+        return await self._write("delete_todo", user_id, **kwargs)
+
+    async def bulk_create_todos(self, user_id: int, **kwargs: Any):
+        return await self._write("bulk_create_todos", user_id, **kwargs)
+
+    async def bulk_update_todos(self, user_id: int, **kwargs: Any):
+        return await self._write("bulk_update_todos", user_id, **kwargs)
+
+    async def bulk_delete_todos(self, user_id: int, **kwargs: Any):
+        return await self._write("bulk_delete_todos", user_id, **kwargs)
@@ -0,0 +1,32 @@
+from typing import Any, Dict, Optional
+
+from app.core.coalesce import WriteCoalescer
+from app.database.connection import shard_of
+from app.schemas.todo_schema import TodoCreate, TodoUpdate
+
+class CoalescingTodoService:
+    """
+    Wrap an awaitable todo service so create_todo and update_todo go
+    through a WriteCoalescer: they are committed in a session of the
+    coalescer's, in one transaction with other requests' writes, and the
+    request's own session is left unused. Everything else passes through.
+
+    `coalescers` has one per entry of SHARDS; a write goes to its user's.
+    """
+
+    def __init__(self, service: Any, coalescers: Dict[Optional[str], WriteCoalescer]):
+        self._service = service
+        self._coalescers = coalescers
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._service, name)
+
+    async def create_todo(self, db: Any, todo: TodoCreate, user_id: int):
+        return await self._coalescers[shard_of(user_id)].submit(
+            ("create_todo", {"todo": todo, "user_id": user_id})
+        )
+
+    async def update_todo(self, db: Any, todo_id: int, todo_update: TodoUpdate, user_id: int):
+        return await self._coalescers[shard_of(user_id)].submit(
+            ("update_todo", {"todo_id": todo_id, "todo_update": todo_update, "user_id": user_id})
+        )
@@ -0,0 +1,68 @@
+from typing import Any, List, Optional, Set, Tuple
+
+from app.core.feed import ChangeFeed
+from app.schemas.todo_schema import BulkItemStatus, TodoBulkResponse, TodoUpdate
+from app.utils.serializers import todo_dict
+
+def _changes(todo_update: TodoUpdate) -> bool:
+    # The services write nothing for an update that sets no field
+    return bool(todo_update.dict(exclude_unset=True, exclude={"id"}))
+
+def _bulk_events(
+    response: TodoBulkResponse, status: BulkItemStatus, ids: Optional[Set[int]] = None
+) -> List[Tuple[str, Any]]:
+    events = []
+    for result in response.results:
+        if result.status != status or (ids is not None and result.id not in ids):
+            continue
+        data = {"id": result.id} if result.todo is None else todo_dict(result.todo)
+        events.append((status.value, data))
+    return events
+
+class PublishingTodoService:
+    """
+    Wrap an awaitable todo service (possibly behind CachedTodoService) so
+    every committed write is published to the user's change feed as
+    "created", "updated" or "deleted" events. Like CachedTodoService, new
+    write methods must be added here or streams will miss them.
+    """
+
+    def __init__(self, service: Any, feed: ChangeFeed):
+        self._service = service
+        self._feed = feed
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._service, name)
+
+    async def create_todo(self, user_id: int, **kwargs: Any):
+        todo = await self._service.create_todo(user_id=user_id, **kwargs)
+        await self._feed.publish(user_id, [("created", todo_dict(todo))])
+        return todo
+
+    async def update_todo(self, user_id: int, **kwargs: Any):
+        todo = await self._service.update_todo(user_id=user_id, **kwargs)
+        if todo and _changes(kwargs["todo_update"]):
+            await self._feed.publish(user_id, [("updated", todo_dict(todo))])
+        return todo
+
+    async def delete_todo(self, user_id: int, todo_id: int, **kwargs: Any):
+        deleted = await self._service.delete_todo(user_id=user_id, todo_id=todo_id, **kwargs)
+        if deleted:
+            await self._feed.publish(user_id, [("deleted", {"id": todo_id})])
+        return deleted
+
+    async def bulk_create_todos(self, user_id: int, **kwargs: Any):
+        response = await self._service.bulk_create_todos(user_id=user_id, **kwargs)
+        await self._feed.publish(user_id, _bulk_events(response, BulkItemStatus.CREATED))
+        return response
+
+    async def bulk_update_todos(self, user_id: int, **kwargs: Any):
+        response = await self._service.bulk_update_todos(user_id=user_id, **kwargs)
+        changed = {item.id for item in kwargs["items"] if _changes(item)}
+        await self._feed.publish(user_id, _bulk_events(response, BulkItemStatus.UPDATED, changed))
+        return response
+
+    async def bulk_delete_todos(self, user_id: int, **kwargs: Any):
+        response = await self._service.bulk_delete_todos(user_id=user_id, **kwargs)
+        await self._feed.publish(user_id, _bulk_events(response, BulkItemStatus.DELETED))
+        return response
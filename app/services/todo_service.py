@@ -1,21 +1,666 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
-from typing import List, Optional
-from app.database.models import Todo, TodoStatus
-from app.schemas.todo_schema import TodoCreate, TodoUpdate, TodoResponse, TodoListResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import (
+    Integer, and_, cast, delete, false, func, insert, literal, literal_column, or_, select, text, true, tuple_,
+    union_all, update
+)
+from sqlalchemy.dialects.mysql import insert as mysql_insert, match
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+import re
+import time
+from starlette.concurrency import run_in_threadpool
+from collections import Counter
+from functools import partial
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Set, Tuple, Union
+from app.core.config import settings
+from app.database.models import (
+    TODO_SEARCH_VECTOR, Todo, TodoArchive, TodoStat, TodoStatus, TodoTombstone, User, UserShard, todos_fts
+)
+from app.schemas.todo_schema import (
+    BulkItemStatus,
+    CountMode,
+    TodoChangesResponse,
+    TodoBulkItemResult,
+    TodoBulkResponse,
+    TodoBulkUpdateItem,
+    TodoCreate,
+    TodoUpdate,
+    TodoResponse,
+    TodoListResponse,
+    TodoSearchResponse,
+    TodoSort,
+    TodoStatsDay,
+    TodoStatsResponse
+)
+from app.core.cache import build_cache
+from app.core.coalesce import WriteCoalescer
+from app.core.feed import change_feed
+from app.database.connection import SHARDS, async_shard_session, shard_session, todo_ids as todo_id_blocks
+from app.database.sharding import UserMoved
+from app.services.threaded import ThreadedService
+from app.services.todo_cache import CachedTodoService, TodoCache
+from app.services.todo_coalesce import CoalescingTodoService
+from app.services.todo_feed import PublishingTodoService
+from app.utils.pagination import SyncTokenExpired, decode_cursor, decode_sync_token, encode_cursor, encode_sync_token
+
+# sort -> (column, descending); id breaks ties so the order is total
+SORT_KEYS = {
+    TodoSort.CREATED_AT: (Todo.created_at, False),
+    TodoSort.CREATED_AT_DESC: (Todo.created_at, True),
+    TodoSort.TITLE: (Todo.title, False),
+}
+
+def _filtered_query(
+    user_id: int,
+    status: Optional[TodoStatus],
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    model=Todo
+):
+    # Equality filters first, then the range, matching the ix_todos_user_* indexes
+    query = select(model).where(model.user_id == user_id)
+    if status:
+        query = query.where(model.status == status)
+    if created_after:
+        query = query.where(model.created_at >= created_after)
+    if created_before:
+        query = query.where(model.created_at < created_before)
+    return query
+
+def _tiers(status: Optional[TodoStatus], include_archived: bool) -> tuple:
+    # Only completed todos are ever archived
+    if include_archived and status != TodoStatus.PENDING:
+        return (Todo, TodoArchive)
+    return (Todo,)
+
+def _tier_columns(model) -> list:
+    # todos_archive's columns in the order of todos', so the tiers UNION and read back as Todo
+    return [model.__table__.c[column.name] for column in Todo.__table__.c]
+
+def _count_statement(queries: list, count: CountMode, user_id: int, status: Optional[TodoStatus], ranged: bool):
+    # Without a created_at range the total is a sum over the user's todo_stats
+    # rows (a few per day) rather than a scan of their todos, in either mode
+    if not ranged:
+        return _stats_total_statement(user_id, status, include_archived=len(queries) > 1)
+    if len(queries) == 1:
+        query = queries[0]
+    else:
+        query = union_all(*(query.with_only_columns(query.selected_columns.id) for query in queries))
+    # "estimated" bounds the work: rows past the cap are never visited
+    if count == CountMode.ESTIMATED:
+        query = query.limit(settings.ESTIMATED_COUNT_CAP)
+    return select(func.count()).select_from(query.subquery())
+
+def _page_statement(query, skip: int, limit: int, cursor: Optional[str], sort: TodoSort, model=Todo):
+    column, descending = SORT_KEYS[sort]
+    column = getattr(model, column.key)
+    if cursor:
+        key, todo_id = decode_cursor(cursor, sort.value)
+        if column.key == "created_at":
+            key = datetime.fromisoformat(str(key))
+        if descending:
+            after = or_(column < key, and_(column == key, model.id < todo_id))
+        else:
+            after = or_(column > key, and_(column == key, model.id > todo_id))
+        query = query.where(after)
+    elif skip:
+        query = query.offset(skip)
+    order = (column.desc(), model.id.desc()) if descending else (column, model.id)
+    # One extra row tells us whether there is a next page
+    return query.order_by(*order).limit(limit + 1)
+
+def _tiered_page_statement(queries: list, skip: int, limit: int, cursor: Optional[str], sort: TodoSort):
+    # Each tier's first skip + limit + 1 rows in page order, an index range
+    # scan apiece; the page is cut from their merge. Ordered by the UNION's
+    # own columns and read back as Todo through from_statement, which costs
+    # about half the statement building of an aliased(Todo, ...) subquery
+    depth = limit if cursor else skip + limit
+    tiers = [
+        _page_statement(query, 0, depth, cursor, sort, model).with_only_columns(*_tier_columns(model)).subquery()
+        for model, query in zip((Todo, TodoArchive), queries)
+    ]
+    merged = union_all(*(select(*tier.c) for tier in tiers))
+    page = _page_statement(merged, 0 if cursor else skip, limit, None, sort, merged.selected_columns)
+    return select(Todo).from_statement(page)
+
+def _page_response(todos: List[Todo], total: Optional[int], skip: int, limit: int, sort: TodoSort):
+    next_cursor = None
+    if len(todos) > limit:
+        todos = todos[:limit]
+        column, _ = SORT_KEYS[sort]
+        next_cursor = encode_cursor(sort.value, getattr(todos[-1], column.key), todos[-1].id)
+    # construct() skips validating every row; the routes serialize them directly
+    return TodoListResponse.construct(
+        todos=todos,
+        total=total,
+        skip=skip,
+        limit=limit,
+        next_cursor=next_cursor
+    )
+
+def _bump_list_version(user_id: int, shard: Optional[str]):
+    # Any change to a user's todos invalidates every list page ETag
+    statement = (
+        update(User)
+        .where(User.id == user_id)
+        .values(todos_version=User.todos_version + 1)
+        .execution_options(synchronize_session=False)
+    )
+    if shard:
+        statement = statement.where(_not_moved(user_id, shard))
+    return statement
+
+def _not_moved(user_id: int, shard: str):
+    # A user moved off a shard that is also the DATABASE_URL database keeps their
+    # account row there; the pin reshard wrote in its place is what turns them
+    # away. Other shards' user_shards only hold the fence of a move in progress
+    return ~select(UserShard.user_id).where(UserShard.user_id == user_id, UserShard.shard != shard).exists()
+
+def _check_bumped(result, user_id: int) -> None:
+    # The bump finds the user's row on whichever shard holds their todos; not
+    # finding it means reshard moved them after this session was routed
+    if not result.rowcount:
+        raise UserMoved(user_id)
+
+def _user_row(user_id: int, shard: str):
+    # Sharded only: tells a todo that isn't there from a user that isn't
+    return select(User.id).where(User.id == user_id, _not_moved(user_id, shard))
+
+def _bump_if_owned(user_id: int, todo_id: int, shard: Optional[str]):
+    # _bump_list_version, applied only when the user owns the todo: its rowcount
+    # decides the 404, and nothing else runs for a todo that isn't there. Every
+    # write bumps first, so from here on the todo can't be deleted under us
+    return _bump_list_version(user_id, shard).where(
+        select(Todo.id).where(Todo.id == todo_id, Todo.user_id == user_id).exists()
+    )
+
+def _update_statement(todo_id: int, user_id: int, values: dict):
+    return (
+        update(Todo)
+        .where(Todo.id == todo_id, Todo.user_id == user_id)
+        .values(version=Todo.version + 1, change_seq=_current_change_seq(user_id), **values)
+        .execution_options(synchronize_session=False)
+    )
+
+def _delete_statement(todo_id: int, user_id: int):
+    return (
+        delete(Todo)
+        .where(Todo.id == todo_id, Todo.user_id == user_id)
+        .execution_options(synchronize_session=False)
+    )
+
+def _current_change_seq(user_id: int):
+    # Evaluated after _bump_list_version in the same transaction. The bump holds
+    # the user's row lock (SQLite: the database write lock) until commit, so a
+    # user's writes commit in change_seq order and a sync never skips one
+    return select(User.todos_version).where(User.id == user_id).scalar_subquery()
+
+def _stats_delta(dialect: str, user_id: int, todo_ids: List[int], sign: int):
+    # Adds (sign 1) or takes back (sign -1) these todos in todo_stats. Status and
+    # day are read from the rows themselves, so run it after they are written
+    # and before they are changed or deleted
+    return _stats_upsert(dialect, "todo_count", Todo, Todo.user_id == user_id, todo_ids, sign)
+
+def _archived_delta(dialect: str, model, condition, todo_ids: List[int], sign: int):
+    # _stats_delta for archived_count: todos about to be archived (sign 1, read
+    # from todos) or restored (sign -1, read from todos_archive)
+    return _stats_upsert(dialect, "archived_count", model, condition, todo_ids, sign)
+
+def _stats_upsert(dialect: str, counter: str, model, condition, todo_ids: List[int], sign: int):
+    day = func.date(model.created_at)
+    rows = (
+        select(model.user_id, model.status, day, func.count() * sign)
+        .where(condition, model.id.in_(todo_ids))
+        .group_by(model.user_id, model.status, day)
+    )
+    columns = ["user_id", "status", "day", counter]
+    if dialect == "mysql":
+        statement = mysql_insert(TodoStat).from_select(columns, rows)
+        return statement.on_duplicate_key_update(
+            {counter: getattr(TodoStat, counter) + getattr(statement.inserted, counter)}
+        )
+    # SQLite or PostgreSQL; check_dialect refuses anything else at startup
+    insert_into = postgresql_insert if dialect == "postgresql" else sqlite_insert
+    statement = insert_into(TodoStat).from_select(columns, rows)
+    return statement.on_conflict_do_update(
+        index_elements=["user_id", "status", "day"],
+        set_={counter: getattr(TodoStat, counter) + getattr(statement.excluded, counter)}
+    )
+
+def _stats_total_statement(user_id: int, status: Optional[TodoStatus], include_archived: bool = False):
+    # todo_count covers both tiers; archived_count is the part in todos_archive
+    counted = TodoStat.todo_count if include_archived else TodoStat.todo_count - TodoStat.archived_count
+    query = select(cast(func.coalesce(func.sum(counted), 0), Integer)).where(TodoStat.user_id == user_id)
+    if status:
+        query = query.where(TodoStat.status == status)
+    return query
+
+def _stats_statement(user_id: int, created_after: Optional[date], created_before: Optional[date]):
+    query = select(TodoStat.day, TodoStat.status, TodoStat.todo_count).where(
+        TodoStat.user_id == user_id,
+        TodoStat.todo_count != 0
+    )
+    if created_after:
+        query = query.where(TodoStat.day >= created_after)
+    if created_before:
+        query = query.where(TodoStat.day < created_before)
+    return query.order_by(TodoStat.day)
+
+def _stats_response(rows: list) -> TodoStatsResponse:
+    by_status = dict.fromkeys((status.value for status in TodoStatus), 0)
+    days: Dict[date, Dict[str, int]] = {}
+    for day, status, todo_count in rows:
+        by_status[status.value] += todo_count
+        days.setdefault(day, dict.fromkeys(by_status, 0))[status.value] += todo_count
+    return TodoStatsResponse(
+        total=sum(by_status.values()),
+        by_status=by_status,
+        days=[TodoStatsDay(day=day, total=sum(counts.values()), by_status=counts) for day, counts in days.items()]
+    )
+
+def _repair_batch_statement(after_user_id: int, batch_size: int):
+    return select(User.id).where(User.id > after_user_id).order_by(User.id).limit(batch_size)
+
+def _lock_users(user_ids: List[int]):
+    # A no-op UPDATE takes the row locks _bump_list_version takes (on SQLite, the
+    # write lock), so none of these users' todos change while their stats are
+    # compared and rewritten
+    return (
+        update(User)
+        .where(User.id.in_(user_ids))
+        .values(todos_version=User.todos_version)
+        .execution_options(synchronize_session=False)
+    )
+
+def _counted_stats(user_ids: List[int]):
+    # Both tiers, each row flagged with the tier it is in
+    rows = union_all(*(
+        select(model.user_id, model.status, func.date(model.created_at).label("day"), literal(archived).label("archived"))
+        .where(model.user_id.in_(user_ids))
+        for model, archived in ((Todo, 0), (TodoArchive, 1))
+    )).subquery()
+    archived_count = cast(func.sum(rows.c.archived), Integer)
+    return (
+        select(rows.c.user_id, rows.c.status, rows.c.day, func.count(), archived_count)
+        .group_by(rows.c.user_id, rows.c.status, rows.c.day)
+    )
+
+def _recorded_stats(user_ids: List[int]):
+    return select(
+        TodoStat.user_id, TodoStat.status, TodoStat.day, TodoStat.todo_count, TodoStat.archived_count
+    ).where(
+        TodoStat.user_id.in_(user_ids),
+        or_(TodoStat.todo_count != 0, TodoStat.archived_count != 0)
+    )
+
+def _stats_drift(counted: list, recorded: list) -> List[Dict[str, Any]]:
+    # DATE() comes back as a string on SQLite and a date on MySQL
+    counted_by_key = {(user_id, status, str(day)): tuple(counts) for user_id, status, day, *counts in counted}
+    recorded_by_key = {(user_id, status, str(day)): tuple(counts) for user_id, status, day, *counts in recorded}
+    drift = []
+    for key in sorted(counted_by_key.keys() | recorded_by_key.keys()):
+        recorded_counts, counted_counts = recorded_by_key.get(key, (0, 0)), counted_by_key.get(key, (0, 0))
+        if recorded_counts != counted_counts:
+            user_id, status, day = key
+            drift.append({
+                "user_id": user_id,
+                "status": status.value,
+                "day": day,
+                "recorded": recorded_counts[0],
+                "counted": counted_counts[0],
+                "recorded_archived": recorded_counts[1],
+                "counted_archived": counted_counts[1]
+            })
+    return drift
+
+def _rebuild_stats_statements(user_ids: List[int]):
+    return [
+        delete(TodoStat).where(TodoStat.user_id.in_(user_ids)),
+        insert(TodoStat).from_select(
+            ["user_id", "status", "day", "todo_count", "archived_count"], _counted_stats(user_ids)
+        ),
+    ]
+
+def _tombstone_statement(user_id: int, todo_ids: List[int]):
+    return insert(TodoTombstone).values([
+        {"todo_id": todo_id, "user_id": user_id, "change_seq": _current_change_seq(user_id)}
+        for todo_id in todo_ids
+    ])
+
+def _sync_position(since: Optional[str]) -> Tuple[int, int, float, Optional[int]]:
+    # No token: everything, including rows written before change tracking
+    # (seq 0); get_changes fills in the users.todos_version it starts from
+    if since is None:
+        return -1, 0, time.time(), None
+    change_seq, todo_id, issued_at, deleted_after = decode_sync_token(since)
+    if time.time() - issued_at > settings.SYNC_TOMBSTONE_RETENTION_SECONDS:
+        raise SyncTokenExpired("Sync token expired; sync again without a token")
+    return change_seq, todo_id, issued_at, deleted_after
+
+def _sync_start(user_id: int):
+    # Read before the first page of a full sync: todos deleted up to here
+    # were never in the client's copy, so their tombstones are skipped
+    return select(User.todos_version).where(User.id == user_id)
+
+def _changes_statements(user_id: int, position: Tuple[int, int, float, Optional[int]], limit: int):
+    change_seq, todo_id, _, deleted_after = position
+    # Keyset scans of ix_todos_user_change_seq and ix_todo_tombstones_user_change_seq
+    todos = (
+        select(Todo)
+        .where(
+            Todo.user_id == user_id,
+            or_(Todo.change_seq > change_seq, and_(Todo.change_seq == change_seq, Todo.id > todo_id))
+        )
+        .order_by(Todo.change_seq, Todo.id)
+        .limit(limit + 1)
+    )
+    tombstones = (
+        select(TodoTombstone.change_seq, TodoTombstone.todo_id)
+        .where(
+            TodoTombstone.user_id == user_id,
+            or_(
+                TodoTombstone.change_seq > change_seq,
+                and_(TodoTombstone.change_seq == change_seq, TodoTombstone.todo_id > todo_id)
+            )
+        )
+        .order_by(TodoTombstone.change_seq, TodoTombstone.todo_id)
+        .limit(limit + 1)
+    )
+    if deleted_after is not None:
+        tombstones = tombstones.where(TodoTombstone.change_seq > deleted_after)
+    return todos, tombstones
+
+def _changes_response(
+    todos: List[Todo], tombstones: list, position: Tuple[int, int, float, Optional[int]], limit: int
+):
+    # Both lists hold the next limit + 1 changes of their kind; merged, the
+    # first `limit` are the next changes overall
+    changes = sorted(
+        [(todo.change_seq, todo.id, todo) for todo in todos]
+        + [(change_seq, todo_id, None) for change_seq, todo_id in tombstones],
+        key=lambda change: change[:2]
+    )
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+    change_seq, todo_id, issued_at, deleted_after = position
+    if changes:
+        change_seq, todo_id, _ = changes[-1]
+    if not has_more:
+        # Caught up: only tombstones written from now on matter to this token
+        issued_at = time.time()
+    if deleted_after is not None and change_seq > deleted_after:
+        # Past the start of the full sync: the position alone skips older deletes
+        deleted_after = None
+    page = [todo for _, _, todo in changes if todo is not None]
+    # A live row outranks an older tombstone for a reused id (SQLite reuses the highest)
+    live = {todo.id for todo in page}
+    deleted = [todo_id for _, todo_id, todo in changes if todo is None and todo_id not in live]
+    return TodoChangesResponse.construct(
+        todos=page,
+        deleted=list(dict.fromkeys(deleted)),
+        next_token=encode_sync_token(change_seq, todo_id, issued_at, deleted_after),
+        has_more=has_more
+    )
+
+def _expired_tombstones(before: datetime, batch_size: int):
+    return (
+        select(TodoTombstone.todo_id, TodoTombstone.change_seq)
+        .where(TodoTombstone.deleted_at < before)
+        .limit(batch_size)
+    )
+
+def _delete_tombstones(keys: list):
+    # MySQL allows no LIMIT in an IN subquery, hence the SELECT first
+    return delete(TodoTombstone).where(
+        tuple_(TodoTombstone.todo_id, TodoTombstone.change_seq).in_([tuple(key) for key in keys])
+    )
+
+def _next_todo_id(offset: int = 0):
+    # SQLite hands out MAX(rowid) + 1, which is an archived todo's id once the
+    # newest todos were archived or deleted; start above both tiers instead.
+    # Uncorrelated, so evaluated once per INSERT however many rows it has
+    highest = union_all(select(func.max(Todo.id).label("id")), select(func.max(TodoArchive.id))).subquery()
+    return select(func.coalesce(func.max(highest.c.id), 0) + 1 + offset).scalar_subquery()
+
+def _restore_statements(dialect: str, user_id: int, todo_ids: List[int]):
+    # Archived todos back into todos, under the current change_seq
+    archived = and_(TodoArchive.user_id == user_id, TodoArchive.id.in_(todo_ids))
+    rows = select(*(
+        _current_change_seq(user_id) if column.name == "change_seq" else column
+        for column in _tier_columns(TodoArchive)
+    )).where(archived)
+    return [
+        _archived_delta(dialect, TodoArchive, TodoArchive.user_id == user_id, todo_ids, -1),
+        insert(Todo).from_select([column.name for column in Todo.__table__.c], rows),
+        delete(TodoArchive).where(archived),
+    ]
+
+def _archive_scan(after_id: int, batch_size: int):
+    # The next batch_size todos of any user, by primary key
+    return (
+        select(Todo.id, Todo.user_id, Todo.status, func.coalesce(Todo.updated_at, Todo.created_at))
+        .where(Todo.id > after_id)
+        .order_by(Todo.id)
+        .limit(batch_size)
+    )
+
+def _fenced(user_id, shard: Optional[str]):
+    # _not_moved for a column of user ids
+    if not shard:
+        return false()
+    return select(UserShard.user_id).where(UserShard.user_id == user_id, UserShard.shard != shard).exists()
+
+def _bump_users(user_ids: List[int], shard: Optional[str]):
+    # _bump_list_version for several users at once
+    return (
+        update(User)
+        .where(User.id.in_(user_ids), ~_fenced(User.id, shard))
+        .values(todos_version=User.todos_version + 1)
+        .execution_options(synchronize_session=False)
+    )
+
+def _archivable(todo_ids: List[int], before: datetime, shard: Optional[str]):
+    # Checked again under the users' locks: the scan ran without them
+    return select(Todo.id).where(
+        Todo.id.in_(todo_ids),
+        Todo.status == TodoStatus.COMPLETED,
+        func.coalesce(Todo.updated_at, Todo.created_at) < before,
+        ~_fenced(Todo.user_id, shard)
+    )
+
+def _archive_statements(dialect: str, todo_ids: List[int]):
+    # change_seq moves on with the bump that locked each user, like any write
+    owner_version = select(User.todos_version).where(User.id == Todo.user_id).scalar_subquery()
+    rows = select(*(
+        owner_version if column.name == "change_seq" else column for column in Todo.__table__.c
+    )).where(Todo.id.in_(todo_ids))
+    return [
+        _archived_delta(dialect, Todo, true(), todo_ids, 1),
+        insert(TodoArchive).from_select([column.name for column in Todo.__table__.c], rows),
+        delete(Todo).where(Todo.id.in_(todo_ids)).execution_options(synchronize_session=False),
+    ]
+
+def _archive_batch(scanned: list, before: datetime) -> Tuple[List[int], List[int]]:
+    # Candidates of a scanned batch, and their owners
+    candidates = [
+        (todo_id, user_id) for todo_id, user_id, status, touched_at in scanned
+        if status == TodoStatus.COMPLETED and touched_at is not None and touched_at < before
+    ]
+    return [todo_id for todo_id, _ in candidates], sorted({user_id for _, user_id in candidates})
+
+def _creates(writes: List[Tuple[str, dict]]) -> int:
+    return sum(method == "create_todo" for method, _ in writes)
+
+def _with_todo_ids(writes: List[Tuple[str, dict]], todo_ids: List[int]) -> List[Tuple[str, dict]]:
+    # Taken for the whole batch up front: leasing a block writes to the
+    # DATABASE_URL database, which on SQLite the batch's transaction may have
+    # locked by the time a later create runs
+    ids = iter(todo_ids)
+    return [
+        (method, {**kwargs, "todo_id": next(ids)} if method == "create_todo" and todo_ids else kwargs)
+        for method, kwargs in writes
+    ]
+
+def _written(results: List[Any]) -> List[Todo]:
+    # Each instance once: writes to the same todo share it
+    return list({id(result): result for result in results if isinstance(result, Todo)}.values())
+
+def _reload_written(db: Session, todo_ids: List[int]) -> None:
+    # One SELECT for the server-set columns of every todo written in a batch,
+    # instead of a refresh per todo. Before the commit: once it releases the
+    # users row, reshard may move the rows to another shard
+    if todo_ids:
+        db.scalars(select(Todo).where(Todo.id.in_(todo_ids)).execution_options(populate_existing=True)).all()
+
+def _search_statement(dialect: str, user_id: int, q: str, skip: int, limit: int):
+    # Natural-language semantics on every indexed backend: any term matches,
+    # and rows matching more (and rarer) terms rank first. None when q has no terms.
+    terms = re.findall(r"\w+", q)
+    if not terms:
+        return None
+    query = select(Todo).where(Todo.user_id == user_id)
+    if dialect == "mysql":
+        score = match(Todo.title, Todo.description, against=" ".join(terms)).in_natural_language_mode()
+        # A bare MATCH in WHERE is what lets the optimizer pick the FULLTEXT index
+        query = query.where(score).order_by(score.desc(), Todo.id)
+    elif dialect == "sqlite":
+        # Quoting every term keeps FTS5 query syntax out of user input
+        fts_query = " OR ".join('"%s"' % term for term in terms)
+        query = (
+            query.join(todos_fts, todos_fts.c.rowid == Todo.id)
+            .where(text("todos_fts MATCH :fts_query").bindparams(fts_query=fts_query))
+            .order_by(func.bm25(literal_column("todos_fts")), Todo.id)
+        )
+    elif dialect == "postgresql":
+        # \w+ terms need no quoting in a tsquery; 'simple' neither stems nor
+        # drops stopwords, like FTS5's default tokenizer
+        vector = literal_column(TODO_SEARCH_VECTOR)
+        ts_query = func.to_tsquery(literal_column("'simple'"), " | ".join(terms))
+        query = query.where(vector.op("@@")(ts_query)).order_by(func.ts_rank(vector, ts_query).desc(), Todo.id)
+    else:
+        # No full-text index to use: a scan of the user's todos for any term
+        query = query.where(or_(*(
+            or_(Todo.title.contains(term, autoescape=True), Todo.description.contains(term, autoescape=True))
+            for term in terms
+        ))).order_by(Todo.id)
+    return query.offset(skip).limit(limit + 1)
+
+def _search_response(todos: List[Todo], skip: int, limit: int):
+    return TodoSearchResponse.construct(
+        todos=todos[:limit],
+        skip=skip,
+        limit=limit,
+        has_more=len(todos) > limit
+    )
+
+def _export_statement(user_id: int, batch_size: int):
+    # Plain rows rather than entities keep the identity map out of the loop;
+    # yield_per turns on stream_results (a server-side cursor where supported)
+    return (
+        select(Todo.__table__)
+        .where(Todo.user_id == user_id)
+        .order_by(Todo.created_at, Todo.id)
+        .execution_options(yield_per=batch_size)
+    )
+
+def _owned(user_id: int, todo_ids: List[int], model=Todo):
+    return select(model).where(model.user_id == user_id, model.id.in_(todo_ids))
+
+def _archived_ids(user_id: int, todo_ids: List[int]):
+    return select(TodoArchive.id).where(TodoArchive.user_id == user_id, TodoArchive.id.in_(todo_ids))
+
+def _duplicates(todo_ids: List[int]) -> Set[int]:
+    # An id listed twice in one batch is ambiguous, so none of its entries are applied
+    return {todo_id for todo_id, seen in Counter(todo_ids).items() if seen > 1}
+
+def _new_todo_values(todos: List[TodoCreate], user_id: int, ids: Optional[List[int]], dialect: str) -> List[dict]:
+    values = [
+        {
+            "title": todo.title,
+            "description": todo.description,
+            "status": TodoStatus.PENDING,
+            "user_id": user_id,
+            "change_seq": _current_change_seq(user_id)
+        }
+        for todo in todos
+    ]
+    # Sharded: ids come from todo_id_blocks, unique across shards
+    if ids is None and dialect == "sqlite":
+        ids = [_next_todo_id(offset) for offset in range(len(values))]
+    for row, todo_id in zip(values, ids or []):
+        row["id"] = todo_id
+    return values
+
+def _bulk_update_statements(items: List[TodoBulkUpdateItem], user_id: int, duplicates: Set[int]):
+    # Items setting identical values share one UPDATE ... WHERE id IN (...)
+    groups: Dict[tuple, List[int]] = {}
+    for item in items:
+        values = item.dict(exclude_unset=True, exclude={"id"})
+        if values and item.id not in duplicates:
+            groups.setdefault(tuple(sorted(values.items())), []).append(item.id)
+    return [
+        update(Todo)
+        .where(Todo.user_id == user_id, Todo.id.in_(todo_ids))
+        .values(version=Todo.version + 1, change_seq=_current_change_seq(user_id), **dict(values))
+        .execution_options(synchronize_session=False)
+        for values, todo_ids in groups.items()
+    ]
+
+def _status_updates(items: List[TodoBulkUpdateItem], duplicates: Set[int]) -> List[int]:
+    # Todos whose status an update sets, and so may move between stats counters
+    return [item.id for item in items if "status" in item.__fields_set__ and item.id not in duplicates]
+
+def _bulk_result(todo_id: int, found: Dict[int, Todo], duplicates: Set[int], status: BulkItemStatus):
+    if todo_id in duplicates:
+        return TodoBulkItemResult(id=todo_id, status=BulkItemStatus.DUPLICATE)
+    if todo_id not in found:
+        return TodoBulkItemResult(id=todo_id, status=BulkItemStatus.NOT_FOUND)
+    todo = found[todo_id]
+    return TodoBulkItemResult(
+        id=todo_id,
+        status=status,
+        todo=TodoResponse.from_orm(todo) if todo is not None else None
+    )
+
+def _bulk_response(todo_ids: List[int], found: Dict[int, Todo], duplicates: Set[int], status: BulkItemStatus):
+    return TodoBulkResponse(
+        results=[_bulk_result(todo_id, found, duplicates, status) for todo_id in todo_ids]
+    )
 
 class TodoService:
     @staticmethod
     def create_todo(db: Session, todo: TodoCreate, user_id: int):
+        db_todo = TodoService.stage_create_todo(db, todo, user_id)
+        db.flush()
+        # Read back before the commit, which frees reshard to move the row;
+        # detached, so the commit doesn't expire what was read
+        db.refresh(db_todo)
+        db.expunge(db_todo)
+        db.commit()
+        return db_todo
+
+    @staticmethod
+    def stage_create_todo(db: Session, todo: TodoCreate, user_id: int, todo_id: Optional[int] = None):
+        """create_todo without the commit; todo_id is one taken from todo_id_blocks already."""
+        if todo_id is None and todo_id_blocks:
+            todo_id = todo_id_blocks.take(1)[0]
+        _check_bumped(db.execute(_bump_list_version(user_id, db.info.get("shard"))), user_id)
         db_todo = Todo(
             title=todo.title,
             description=todo.description,
-            user_id=user_id
+            user_id=user_id,
+            change_seq=_current_change_seq(user_id)
         )
+        if todo_id is not None:
+            db_todo.id = todo_id
+        elif db.get_bind().dialect.name == "sqlite":
+            db_todo.id = _next_todo_id()
         
         db.add(db_todo)
-        db.commit()
-        db.refresh(db_todo)
+        db.flush()
+        db.execute(_stats_delta(db.get_bind().dialect.name, user_id, [db_todo.id], 1))
         return db_todo
     
     @staticmethod
@@ -24,49 +669,705 @@ class TodoService:
         user_id: int, 
         skip: int = 0, 
         limit: int = 10,
-        status: Optional[TodoStatus] = None
+        status: Optional[TodoStatus] = None,
+        cursor: Optional[str] = None,
+        count: CountMode = CountMode.EXACT,
+        sort: TodoSort = TodoSort.CREATED_AT,
+        created_after: Optional[datetime] = None,
+        created_before: Optional[datetime] = None,
+        include_archived: bool = False
     ):
-        query = db.query(Todo).filter(Todo.user_id == user_id)
+        """
+        A page of the user's todos, and their total unless count is "none".
+        include_archived reads todos_archive as well as todos.
+        """
+        queries = [
+            _filtered_query(user_id, status, created_after, created_before, model)
+            for model in _tiers(status, include_archived)
+        ]
         
-        if status:
-            query = query.filter(Todo.status == status)
+        total = None
+        if count != CountMode.NONE:
+            ranged = created_after is not None or created_before is not None
+            total = db.scalar(_count_statement(queries, count, user_id, status, ranged))
+        if len(queries) == 1:
+            statement = _page_statement(queries[0], skip, limit, cursor, sort)
+        else:
+            statement = _tiered_page_statement(queries, skip, limit, cursor, sort)
+        todos = db.execute(statement).scalars().all()
         
-        total = query.count()
-        todos = query.offset(skip).limit(limit).all()
-        
-        return TodoListResponse(
-            todos=todos,
-            total=total,
-            skip=skip,
-            limit=limit
+        return _page_response(todos, total, skip, limit, sort)
+    
+    @staticmethod
+    def search_todos(db: Session, user_id: int, q: str, skip: int = 0, limit: int = 10):
+        statement = _search_statement(db.get_bind().dialect.name, user_id, q, skip, limit)
+        todos = db.scalars(statement).all() if statement is not None else []
+        return _search_response(todos, skip, limit)
+    
+    @staticmethod
+    def stream_user_todos(db: Session, user_id: int, batch_size: int):
+        """Open a server-side cursor over all of the user's todos; iterate .partitions()."""
+        return db.execute(_export_statement(user_id, batch_size))
+    
+    @staticmethod
+    def get_changes(db: Session, user_id: int, since: Optional[str] = None, limit: int = 100):
+        """
+        The user's todos written and deleted after the `since` sync token,
+        oldest change first. Without a token, every todo and no deletes.
+
+        Raises:
+            ValueError: If the token is malformed
+            SyncTokenExpired: If it is older than the tombstone retention
+        """
+        position = _sync_position(since)
+        if since is None:
+            position = (*position[:3], db.scalar(_sync_start(user_id)) or 0)
+        todos_statement, tombstones_statement = _changes_statements(user_id, position, limit)
+        todos = db.scalars(todos_statement).all()
+        tombstones = db.execute(tombstones_statement).all() if since else []
+        return _changes_response(todos, tombstones, position, limit)
+
+    @staticmethod
+    def compact_tombstones(db: Session, before: datetime, batch_size: int) -> int:
+        """Delete up to batch_size tombstones recorded before `before`; returns how many."""
+        keys = db.execute(_expired_tombstones(before, batch_size)).all()
+        if keys:
+            db.execute(_delete_tombstones(keys))
+        db.commit()
+        return len(keys)
+
+    @staticmethod
+    def get_stats(
+        db: Session,
+        user_id: int,
+        created_after: Optional[date] = None,
+        created_before: Optional[date] = None
+    ) -> TodoStatsResponse:
+        """The user's todo counts by status, overall and per creation day, from todo_stats."""
+        return _stats_response(db.execute(_stats_statement(user_id, created_after, created_before)).all())
+
+    @staticmethod
+    def repair_stats(db: Session, after_user_id: int, batch_size: int, fix: bool = True):
+        """
+        Compare the todo_stats of the batch_size users after after_user_id
+        with a count of their todos, rewriting the stats of users that differ
+        when fix is set.
+
+        Returns:
+            The ids of the users checked, and one entry per counter that was
+            off: user_id, status, day, recorded and counted
+        """
+        user_ids = db.scalars(_repair_batch_statement(after_user_id, batch_size)).all()
+        if not user_ids:
+            return [], []
+        db.execute(_lock_users(user_ids))
+        drift = _stats_drift(
+            db.execute(_counted_stats(user_ids)).all(),
+            db.execute(_recorded_stats(user_ids)).all()
         )
+        drifted = sorted({row["user_id"] for row in drift})
+        if fix and drifted:
+            for statement in _rebuild_stats_statements(drifted):
+                db.execute(statement)
+        db.commit()
+        return user_ids, drift
+
+    @staticmethod
+    def archive_todos(db: Session, after_id: int, batch_size: int, before: datetime):
+        """
+        Move the completed todos among the batch_size todos after after_id
+        that nobody touched since `before` to todos_archive, in one
+        transaction holding their owners' row locks.
+
+        Returns:
+            The id to continue after (None when the table is done), how many
+            todos were examined, the ids of those archived and their owners
+        """
+        scanned = db.execute(_archive_scan(after_id, batch_size)).all()
+        if not scanned:
+            return None, 0, [], []
+        candidates, user_ids = _archive_batch(scanned, before)
+        archived = []
+        if candidates:
+            shard = db.info.get("shard")
+            db.execute(_bump_users(user_ids, shard))
+            archived = db.scalars(_archivable(candidates, before, shard)).all()
+            if archived:
+                for statement in _archive_statements(db.get_bind().dialect.name, archived):
+                    db.execute(statement)
+        db.commit()
+        return scanned[-1][0], len(scanned), archived, user_ids
+
+    @staticmethod
+    def stage_restore_archived(db: Session, user_id: int, todo_ids: List[int]) -> List[int]:
+        """Move the user's todos among todo_ids that are archived back to todos, without the commit."""
+        found = db.scalars(_archived_ids(user_id, todo_ids)).all() if todo_ids else []
+        if found:
+            _check_bumped(db.execute(_bump_list_version(user_id, db.info.get("shard"))), user_id)
+            for statement in _restore_statements(db.get_bind().dialect.name, user_id, found):
+                db.execute(statement)
+        return found
     
     @staticmethod
     def get_todo_by_id(db: Session, todo_id: int, user_id: int):
-        return db.query(Todo).filter(and_(Todo.id == todo_id, Todo.user_id == user_id)).first()
+        """The todo from todos, else from todos_archive (a TodoArchive with the same fields)."""
+        db_todo = db.query(Todo).filter(and_(Todo.id == todo_id, Todo.user_id == user_id)).first()
+        if db_todo is None:
+            db_todo = db.scalar(_owned(user_id, [todo_id], TodoArchive))
+        return db_todo
+    
+    @staticmethod
+    def get_todo_version(db: Session, todo_id: int, user_id: int) -> Optional[int]:
+        version = db.scalar(select(Todo.version).where(Todo.id == todo_id, Todo.user_id == user_id))
+        if version is None:
+            version = db.scalar(select(TodoArchive.version).where(TodoArchive.id == todo_id, TodoArchive.user_id == user_id))
+        return version
+
+    @staticmethod
+    def get_list_version(db: Session, user_id: int) -> Optional[int]:
+        return db.scalar(select(User.todos_version).where(User.id == user_id))
     
     @staticmethod
     def update_todo(db: Session, todo_id: int, todo_update: TodoUpdate, user_id: int):
-        db_todo = db.query(Todo).filter(and_(Todo.id == todo_id, Todo.user_id == user_id)).first()
+        db_todo = TodoService.stage_update_todo(db, todo_id, todo_update, user_id)
         
         if not db_todo:
             return None
         
+        # Detached, so the commit doesn't expire what the UPDATE returned
+        db.expunge(db_todo)
+        db.commit()
+        return db_todo
+
+    @staticmethod
+    def stage_update_todo(db: Session, todo_id: int, todo_update: TodoUpdate, user_id: int):
+        """update_todo without the commit."""
         update_data = todo_update.dict(exclude_unset=True)
-        for field, value in update_data.items():
-            setattr(db_todo, field, value)
+        if not update_data:
+            return TodoService.get_todo_by_id(db, todo_id, user_id)
+        if not db.execute(_bump_if_owned(user_id, todo_id, db.info.get("shard"))).rowcount:
+            # Writing to an archived todo moves it back to todos first
+            if not TodoService.stage_restore_archived(db, user_id, [todo_id]):
+                if db.info.get("shard") and db.scalar(_user_row(user_id, db.info["shard"])) is None:
+                    raise UserMoved(user_id)
+                return None
         
-        db.commit()
-        db.refresh(db_todo)
+        dialect = db.get_bind().dialect
+        # Moves the todo between status counters: out before the UPDATE, in after
+        if "status" in update_data:
+            db.execute(_stats_delta(dialect.name, user_id, [todo_id], -1))
+        statement = _update_statement(todo_id, user_id, update_data)
+        if dialect.update_returning:
+            db_todo = db.scalars(statement.returning(Todo).execution_options(populate_existing=True)).one()
+        else:
+            db.execute(statement)
+            db_todo = db.scalars(_owned(user_id, [todo_id]).execution_options(populate_existing=True)).one()
+        if "status" in update_data:
+            db.execute(_stats_delta(dialect.name, user_id, [todo_id], 1))
         return db_todo
+
+    @staticmethod
+    def commit_writes(db: Session, writes: List[Tuple[str, dict]]) -> List[Any]:
+        """
+        Run several create_todo/update_todo calls in one transaction.
+
+        Args:
+            writes: (method name, keyword arguments without db) pairs
+
+        Returns:
+            Per write, what the method would have returned. Writes to the same
+            todo return the same instance, in its state after the last of them
+
+        Raises:
+            Whatever any write or the COMMIT raises; nothing is committed then
+        """
+        results = []
+        writes = _with_todo_ids(writes, todo_id_blocks.take(_creates(writes)) if todo_id_blocks else [])
+        for method, kwargs in writes:
+            results.append(getattr(TodoService, f"stage_{method}")(db, **kwargs))
+            # Per write, so a second update of the same todo sees the first
+            db.flush()
+        written = _written(results)
+        _reload_written(db, [todo.id for todo in written])
+        # Detached, so the commit doesn't expire what was just read back
+        for todo in written:
+            db.expunge(todo)
+        db.commit()
+        return results
     
     @staticmethod
     def delete_todo(db: Session, todo_id: int, user_id: int) -> bool:
-        db_todo = db.query(Todo).filter(and_(Todo.id == todo_id, Todo.user_id == user_id)).first()
+        if not db.execute(_bump_if_owned(user_id, todo_id, db.info.get("shard"))).rowcount:
+            if not TodoService.stage_restore_archived(db, user_id, [todo_id]):
+                if db.info.get("shard") and db.scalar(_user_row(user_id, db.info["shard"])) is None:
+                    raise UserMoved(user_id)
+                return False
         
-        if not db_todo:
+        db.execute(_tombstone_statement(user_id, [todo_id]))
+        db.execute(_stats_delta(db.get_bind().dialect.name, user_id, [todo_id], -1))
+        if not db.execute(_delete_statement(todo_id, user_id)).rowcount:
+            # Deleted around the service since the bump; undo the bookkeeping
+            db.rollback()
             return False
-        
-        db.delete(db_todo)
         db.commit()
-        return True
\ No newline at end of file
+        return True
+
+    @staticmethod
+    def bulk_create_todos(db: Session, todos: List[TodoCreate], user_id: int):
+        ids = todo_id_blocks.take(len(todos)) if todo_id_blocks else None
+        _check_bumped(db.execute(_bump_list_version(user_id, db.info.get("shard"))), user_id)
+        values = _new_todo_values(todos, user_id, ids, db.get_bind().dialect.name)
+        if db.get_bind().dialect.insert_returning:
+            # One multi-row INSERT ... RETURNING; ids grow in VALUES order
+            created = db.scalars(insert(Todo).values(values).returning(Todo)).all()
+            created = sorted(created, key=lambda db_todo: db_todo.id)
+        else:
+            # Without RETURNING (MySQL) the ORM needs one INSERT per row to learn
+            # the ids; they still share the single commit below
+            created = [Todo(**row) for row in values]
+            db.add_all(created)
+            db.flush()
+            db.scalars(
+                _owned(user_id, [db_todo.id for db_todo in created])
+                .execution_options(populate_existing=True)
+            ).all()
+
+        db.execute(_stats_delta(db.get_bind().dialect.name, user_id, [db_todo.id for db_todo in created], 1))
+
+        # Serialize before commit expires the instances
+        found = {db_todo.id: db_todo for db_todo in created}
+        response = _bulk_response(list(found), found, set(), BulkItemStatus.CREATED)
+        db.commit()
+        return response
+
+    @staticmethod
+    def bulk_update_todos(db: Session, items: List[TodoBulkUpdateItem], user_id: int):
+        todo_ids = [item.id for item in items]
+        duplicates = _duplicates(todo_ids)
+        candidates = [todo_id for todo_id in todo_ids if todo_id not in duplicates]
+        statements = _bulk_update_statements(items, user_id, duplicates)
+        restatused = _status_updates(items, duplicates)
+        dialect = db.get_bind().dialect.name
+        if statements:
+            # Archived todos among them move back to todos first
+            TodoService.stage_restore_archived(db, user_id, candidates)
+            _check_bumped(db.execute(_bump_list_version(user_id, db.info.get("shard"))), user_id)
+        if restatused:
+            db.execute(_stats_delta(dialect, user_id, restatused, -1))
+        for statement in statements:
+            db.execute(statement)
+        if restatused:
+            db.execute(_stats_delta(dialect, user_id, restatused, 1))
+
+        found = {}
+        if candidates:
+            found = {
+                db_todo.id: db_todo
+                for db_todo in db.scalars(
+                    _owned(user_id, candidates).execution_options(populate_existing=True)
+                )
+            }
+
+        response = _bulk_response(todo_ids, found, duplicates, BulkItemStatus.UPDATED)
+        db.commit()
+        return response
+
+    @staticmethod
+    def bulk_delete_todos(db: Session, todo_ids: List[int], user_id: int):
+        duplicates = _duplicates(todo_ids)
+        candidates = [todo_id for todo_id in todo_ids if todo_id not in duplicates]
+        if candidates:
+            TodoService.stage_restore_archived(db, user_id, candidates)
+        statement = (
+            delete(Todo)
+            .where(Todo.user_id == user_id, Todo.id.in_(candidates))
+            .execution_options(synchronize_session=False)
+        )
+        dialect = db.get_bind().dialect
+        if dialect.delete_returning:
+            if candidates:
+                db.execute(_stats_delta(dialect.name, user_id, candidates, -1))
+            deleted = db.scalars(statement.returning(Todo.id)).all()
+        else:
+            deleted = db.scalars(
+                select(Todo.id)
+                .where(Todo.user_id == user_id, Todo.id.in_(candidates))
+                .with_for_update()
+            ).all()
+            if deleted:
+                db.execute(_stats_delta(dialect.name, user_id, deleted, -1))
+            db.execute(statement)
+        if deleted:
+            db.execute(_bump_list_version(user_id, db.info.get("shard")))
+            db.execute(_tombstone_statement(user_id, deleted))
+        elif db.info.get("shard") and db.scalar(_user_row(user_id, db.info["shard"])) is None:
+            raise UserMoved(user_id)
+        db.commit()
+
+        found = dict.fromkeys(deleted)
+        return _bulk_response(todo_ids, found, duplicates, BulkItemStatus.DELETED)
+
+class AsyncTodoService:
+    """AsyncSession counterpart of TodoService; same arguments and return values."""
+
+    @staticmethod
+    async def create_todo(db: AsyncSession, todo: TodoCreate, user_id: int):
+        db_todo = await AsyncTodoService.stage_create_todo(db, todo, user_id)
+        await db.flush()
+        await db.refresh(db_todo)
+        await db.commit()
+        return db_todo
+
+    @staticmethod
+    async def stage_create_todo(db: AsyncSession, todo: TodoCreate, user_id: int, todo_id: Optional[int] = None):
+        if todo_id is None and todo_id_blocks:
+            todo_id = (await todo_id_blocks.take_async(1))[0]
+        _check_bumped(await db.execute(_bump_list_version(user_id, db.info.get("shard"))), user_id)
+        db_todo = Todo(
+            title=todo.title,
+            description=todo.description,
+            user_id=user_id,
+            change_seq=_current_change_seq(user_id)
+        )
+        if todo_id is not None:
+            db_todo.id = todo_id
+        elif db.get_bind().dialect.name == "sqlite":
+            db_todo.id = _next_todo_id()
+
+        db.add(db_todo)
+        await db.flush()
+        await db.execute(_stats_delta(db.get_bind().dialect.name, user_id, [db_todo.id], 1))
+        return db_todo
+
+    @staticmethod
+    async def get_user_todos(
+        db: AsyncSession,
+        user_id: int,
+        skip: int = 0,
+        limit: int = 10,
+        status: Optional[TodoStatus] = None,
+        cursor: Optional[str] = None,
+        count: CountMode = CountMode.EXACT,
+        sort: TodoSort = TodoSort.CREATED_AT,
+        created_after: Optional[datetime] = None,
+        created_before: Optional[datetime] = None,
+        include_archived: bool = False
+    ):
+        queries = [
+            _filtered_query(user_id, status, created_after, created_before, model)
+            for model in _tiers(status, include_archived)
+        ]
+
+        total = None
+        if count != CountMode.NONE:
+            ranged = created_after is not None or created_before is not None
+            total = await db.scalar(_count_statement(queries, count, user_id, status, ranged))
+        if len(queries) == 1:
+            statement = _page_statement(queries[0], skip, limit, cursor, sort)
+        else:
+            statement = _tiered_page_statement(queries, skip, limit, cursor, sort)
+        result = await db.execute(statement)
+
+        return _page_response(result.scalars().all(), total, skip, limit, sort)
+
+    @staticmethod
+    async def search_todos(db: AsyncSession, user_id: int, q: str, skip: int = 0, limit: int = 10):
+        statement = _search_statement(db.get_bind().dialect.name, user_id, q, skip, limit)
+        todos = (await db.scalars(statement)).all() if statement is not None else []
+        return _search_response(todos, skip, limit)
+
+    @staticmethod
+    async def stream_user_todos(db: AsyncSession, user_id: int, batch_size: int):
+        return await db.stream(_export_statement(user_id, batch_size))
+
+    @staticmethod
+    async def get_changes(db: AsyncSession, user_id: int, since: Optional[str] = None, limit: int = 100):
+        position = _sync_position(since)
+        if since is None:
+            position = (*position[:3], (await db.scalar(_sync_start(user_id))) or 0)
+        todos_statement, tombstones_statement = _changes_statements(user_id, position, limit)
+        todos = (await db.scalars(todos_statement)).all()
+        tombstones = (await db.execute(tombstones_statement)).all() if since else []
+        return _changes_response(todos, tombstones, position, limit)
+
+    @staticmethod
+    async def compact_tombstones(db: AsyncSession, before: datetime, batch_size: int) -> int:
+        keys = (await db.execute(_expired_tombstones(before, batch_size))).all()
+        if keys:
+            await db.execute(_delete_tombstones(keys))
+        await db.commit()
+        return len(keys)
+
+    @staticmethod
+    async def get_stats(
+        db: AsyncSession,
+        user_id: int,
+        created_after: Optional[date] = None,
+        created_before: Optional[date] = None
+    ) -> TodoStatsResponse:
+        rows = (await db.execute(_stats_statement(user_id, created_after, created_before))).all()
+        return _stats_response(rows)
+
+    @staticmethod
+    async def repair_stats(db: AsyncSession, after_user_id: int, batch_size: int, fix: bool = True):
+        user_ids = (await db.scalars(_repair_batch_statement(after_user_id, batch_size))).all()
+        if not user_ids:
+            return [], []
+        await db.execute(_lock_users(user_ids))
+        drift = _stats_drift(
+            (await db.execute(_counted_stats(user_ids))).all(),
+            (await db.execute(_recorded_stats(user_ids))).all()
+        )
+        drifted = sorted({row["user_id"] for row in drift})
+        if fix and drifted:
+            for statement in _rebuild_stats_statements(drifted):
+                await db.execute(statement)
+        await db.commit()
+        return user_ids, drift
+
+    @staticmethod
+    async def archive_todos(db: AsyncSession, after_id: int, batch_size: int, before: datetime):
+        scanned = (await db.execute(_archive_scan(after_id, batch_size))).all()
+        if not scanned:
+            return None, 0, [], []
+        candidates, user_ids = _archive_batch(scanned, before)
+        archived = []
+        if candidates:
+            shard = db.info.get("shard")
+            await db.execute(_bump_users(user_ids, shard))
+            archived = (await db.scalars(_archivable(candidates, before, shard))).all()
+            if archived:
+                for statement in _archive_statements(db.get_bind().dialect.name, archived):
+                    await db.execute(statement)
+        await db.commit()
+        return scanned[-1][0], len(scanned), archived, user_ids
+
+    @staticmethod
+    async def stage_restore_archived(db: AsyncSession, user_id: int, todo_ids: List[int]) -> List[int]:
+        found = (await db.scalars(_archived_ids(user_id, todo_ids))).all() if todo_ids else []
+        if found:
+            _check_bumped(await db.execute(_bump_list_version(user_id, db.info.get("shard"))), user_id)
+            for statement in _restore_statements(db.get_bind().dialect.name, user_id, found):
+                await db.execute(statement)
+        return found
+
+    @staticmethod
+    async def get_todo_by_id(db: AsyncSession, todo_id: int, user_id: int):
+        result = await db.execute(
+            select(Todo).where(and_(Todo.id == todo_id, Todo.user_id == user_id))
+        )
+        db_todo = result.scalars().first()
+        if db_todo is None:
+            db_todo = await db.scalar(_owned(user_id, [todo_id], TodoArchive))
+        return db_todo
+
+    @staticmethod
+    async def get_todo_version(db: AsyncSession, todo_id: int, user_id: int) -> Optional[int]:
+        version = await db.scalar(select(Todo.version).where(Todo.id == todo_id, Todo.user_id == user_id))
+        if version is None:
+            version = await db.scalar(
+                select(TodoArchive.version).where(TodoArchive.id == todo_id, TodoArchive.user_id == user_id)
+            )
+        return version
+
+    @staticmethod
+    async def get_list_version(db: AsyncSession, user_id: int) -> Optional[int]:
+        return await db.scalar(select(User.todos_version).where(User.id == user_id))
+
+    @staticmethod
+    async def update_todo(db: AsyncSession, todo_id: int, todo_update: TodoUpdate, user_id: int):
+        db_todo = await AsyncTodoService.stage_update_todo(db, todo_id, todo_update, user_id)
+
+        if not db_todo:
+            return None
+
+        # expire_on_commit is off, so what the UPDATE returned stays loaded
+        await db.commit()
+        return db_todo
+
+    @staticmethod
+    async def stage_update_todo(db: AsyncSession, todo_id: int, todo_update: TodoUpdate, user_id: int):
+        update_data = todo_update.dict(exclude_unset=True)
+        if not update_data:
+            return await AsyncTodoService.get_todo_by_id(db, todo_id, user_id)
+        if not (await db.execute(_bump_if_owned(user_id, todo_id, db.info.get("shard")))).rowcount:
+            if not await AsyncTodoService.stage_restore_archived(db, user_id, [todo_id]):
+                if db.info.get("shard") and await db.scalar(_user_row(user_id, db.info["shard"])) is None:
+                    raise UserMoved(user_id)
+                return None
+
+        dialect = db.get_bind().dialect
+        if "status" in update_data:
+            await db.execute(_stats_delta(dialect.name, user_id, [todo_id], -1))
+        statement = _update_statement(todo_id, user_id, update_data)
+        if dialect.update_returning:
+            db_todo = (await db.scalars(statement.returning(Todo).execution_options(populate_existing=True))).one()
+        else:
+            await db.execute(statement)
+            db_todo = (await db.scalars(
+                _owned(user_id, [todo_id]).execution_options(populate_existing=True)
+            )).one()
+        if "status" in update_data:
+            await db.execute(_stats_delta(dialect.name, user_id, [todo_id], 1))
+        return db_todo
+
+    @staticmethod
+    async def commit_writes(db: AsyncSession, writes: List[Tuple[str, dict]]) -> List[Any]:
+        results = []
+        if todo_id_blocks:
+            writes = _with_todo_ids(writes, await todo_id_blocks.take_async(_creates(writes)))
+        for method, kwargs in writes:
+            results.append(await getattr(AsyncTodoService, f"stage_{method}")(db, **kwargs))
+            await db.flush()
+        await db.run_sync(_reload_written, [todo.id for todo in _written(results)])
+        await db.commit()
+        return results
+
+    @staticmethod
+    async def delete_todo(db: AsyncSession, todo_id: int, user_id: int) -> bool:
+        if not (await db.execute(_bump_if_owned(user_id, todo_id, db.info.get("shard")))).rowcount:
+            if not await AsyncTodoService.stage_restore_archived(db, user_id, [todo_id]):
+                if db.info.get("shard") and await db.scalar(_user_row(user_id, db.info["shard"])) is None:
+                    raise UserMoved(user_id)
+                return False
+
+        await db.execute(_tombstone_statement(user_id, [todo_id]))
+        await db.execute(_stats_delta(db.get_bind().dialect.name, user_id, [todo_id], -1))
+        if not (await db.execute(_delete_statement(todo_id, user_id))).rowcount:
+            await db.rollback()
+            return False
+        await db.commit()
+        return True
+
+    @staticmethod
+    async def bulk_create_todos(db: AsyncSession, todos: List[TodoCreate], user_id: int):
+        ids = await todo_id_blocks.take_async(len(todos)) if todo_id_blocks else None
+        _check_bumped(await db.execute(_bump_list_version(user_id, db.info.get("shard"))), user_id)
+        values = _new_todo_values(todos, user_id, ids, db.get_bind().dialect.name)
+        if db.get_bind().dialect.insert_returning:
+            # One multi-row INSERT ... RETURNING; ids grow in VALUES order
+            created = (await db.scalars(insert(Todo).values(values).returning(Todo))).all()
+            created = sorted(created, key=lambda db_todo: db_todo.id)
+        else:
+            # Without RETURNING (MySQL) the ORM needs one INSERT per row to learn
+            # the ids; they still share the single commit below
+            created = [Todo(**row) for row in values]
+            db.add_all(created)
+            await db.flush()
+            (await db.scalars(
+                _owned(user_id, [db_todo.id for db_todo in created])
+                .execution_options(populate_existing=True)
+            )).all()
+        await db.execute(_stats_delta(db.get_bind().dialect.name, user_id, [db_todo.id for db_todo in created], 1))
+
+        found = {db_todo.id: db_todo for db_todo in created}
+        response = _bulk_response(list(found), found, set(), BulkItemStatus.CREATED)
+        await db.commit()
+        return response
+
+    @staticmethod
+    async def bulk_update_todos(db: AsyncSession, items: List[TodoBulkUpdateItem], user_id: int):
+        todo_ids = [item.id for item in items]
+        duplicates = _duplicates(todo_ids)
+        candidates = [todo_id for todo_id in todo_ids if todo_id not in duplicates]
+        statements = _bulk_update_statements(items, user_id, duplicates)
+        restatused = _status_updates(items, duplicates)
+        dialect = db.get_bind().dialect.name
+        if statements:
+            await AsyncTodoService.stage_restore_archived(db, user_id, candidates)
+            _check_bumped(await db.execute(_bump_list_version(user_id, db.info.get("shard"))), user_id)
+        if restatused:
+            await db.execute(_stats_delta(dialect, user_id, restatused, -1))
+        for statement in statements:
+            await db.execute(statement)
+        if restatused:
+            await db.execute(_stats_delta(dialect, user_id, restatused, 1))
+
+        found = {}
+        if candidates:
+            result = await db.scalars(
+                _owned(user_id, candidates).execution_options(populate_existing=True)
+            )
+            found = {db_todo.id: db_todo for db_todo in result}
+
+        response = _bulk_response(todo_ids, found, duplicates, BulkItemStatus.UPDATED)
+        await db.commit()
+        return response
+
+    @staticmethod
+    async def bulk_delete_todos(db: AsyncSession, todo_ids: List[int], user_id: int):
+        duplicates = _duplicates(todo_ids)
+        candidates = [todo_id for todo_id in todo_ids if todo_id not in duplicates]
+        if candidates:
+            await AsyncTodoService.stage_restore_archived(db, user_id, candidates)
+        statement = (
+            delete(Todo)
+            .where(Todo.user_id == user_id, Todo.id.in_(candidates))
+            .execution_options(synchronize_session=False)
+        )
+        dialect = db.get_bind().dialect
+        if dialect.delete_returning:
+            if candidates:
+                await db.execute(_stats_delta(dialect.name, user_id, candidates, -1))
+            deleted = (await db.scalars(statement.returning(Todo.id))).all()
+        else:
+            deleted = (await db.scalars(
+                select(Todo.id)
+                .where(Todo.user_id == user_id, Todo.id.in_(candidates))
+                .with_for_update()
+            )).all()
+            if deleted:
+                await db.execute(_stats_delta(dialect.name, user_id, deleted, -1))
+            await db.execute(statement)
+        if deleted:
+            await db.execute(_bump_list_version(user_id, db.info.get("shard")))
+            await db.execute(_tombstone_statement(user_id, deleted))
+        elif db.info.get("shard") and await db.scalar(_user_row(user_id, db.info["shard"])) is None:
+            raise UserMoved(user_id)
+        await db.commit()
+
+        found = dict.fromkeys(deleted)
+        return _bulk_response(todo_ids, found, duplicates, BulkItemStatus.DELETED)
+
+ThreadedTodoService = ThreadedService(TodoService)
+
+def _commit_writes_sync(shard: Optional[str], writes: List[Tuple[str, dict]]) -> List[Any]:
+    with shard_session(shard) as db:
+        return TodoService.commit_writes(db, writes)
+
+async def _commit_writes(shard: Optional[str], writes: List[Tuple[str, dict]]) -> List[Any]:
+    if settings.DB_ASYNC_MODE:
+        async with async_shard_session(shard) as db:
+            return await AsyncTodoService.commit_writes(db, writes)
+    return await run_in_threadpool(_commit_writes_sync, shard, writes)
+
+# Services handed to the routes: single creates/updates group-committed when
+# WRITE_COALESCE_WINDOW_MS is set, behind the read cache when CACHE_BACKEND is
+# set; writes are published to the change feed once committed (and the cache dropped).
+# A transaction can't span shards, so each shard gets a coalescer of its own
+write_coalescers: Dict[Optional[str], WriteCoalescer] = {}
+_async_service, _threaded_service = AsyncTodoService, ThreadedTodoService
+if settings.WRITE_COALESCE_WINDOW_MS > 0:
+    write_coalescers = {
+        shard: WriteCoalescer(
+            partial(_commit_writes, shard),
+            window=settings.WRITE_COALESCE_WINDOW_MS / 1000,
+            max_batch=settings.WRITE_COALESCE_MAX_BATCH
+        )
+        for shard in SHARDS
+    }
+    _async_service = CoalescingTodoService(_async_service, write_coalescers)
+    _threaded_service = CoalescingTodoService(_threaded_service, write_coalescers)
+_cache_backend = build_cache()
+todo_cache = TodoCache(_cache_backend, settings.CACHE_TTL_SECONDS) if _cache_backend else None
+if todo_cache:
+    _async_service = CachedTodoService(_async_service, todo_cache)
+    _threaded_service = CachedTodoService(_threaded_service, todo_cache)
+_async_service = PublishingTodoService(_async_service, change_feed)
+_threaded_service = PublishingTodoService(_threaded_service, change_feed)
+
+def get_todo_service(db: Union[Session, AsyncSession]):
+    """Pick the service flavour matching the session yielded by get_session."""
+    if isinstance(db, AsyncSession):
+        return _async_service
+    return _threaded_service
@@ -0,0 +1,96 @@
+import argparse
+import asyncio
+import json
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.metrics import TODO_STATS_DRIFT
+from app.database.connection import SHARDS, async_shard_session, shard_session
+from app.services.todo_service import AsyncTodoService, TodoService, todo_cache
+
+logger = logging.getLogger(__name__)
+
+# Drifted counters kept in a report; the count is always complete
+REPORT_LIMIT = 100
+
+class TodoStatsRepairer:
+    """
+    Rebuilds todo_stats from todos and reports drift: counters that no longer
+    match a COUNT(*) of the todos they stand for, e.g. after writes that
+    bypassed TodoService or a restore of one table but not the other.
+
+    Works through the users batch_size at a time, each batch in a transaction
+    that holds their row locks, so it never races the writes it checks.
+    """
+
+    def __init__(self, batch_size: int):
+        self.batch_size = batch_size
+        self.last_report: Optional[Dict[str, Any]] = None
+
+    def _repair_batch(self, shard: Optional[str], after_user_id: int, fix: bool):
+        with shard_session(shard) as db:
+            return TodoService.repair_stats(db, after_user_id, self.batch_size, fix)
+
+    async def run(self, fix: bool = True) -> Dict[str, Any]:
+        checked, drift = 0, []
+        # Each shard has rows for the users whose todos it holds
+        for shard in SHARDS:
+            after_user_id = 0
+            while True:
+                if settings.DB_ASYNC_MODE:
+                    async with async_shard_session(shard) as db:
+                        user_ids, batch_drift = await AsyncTodoService.repair_stats(
+                            db, after_user_id, self.batch_size, fix
+                        )
+                else:
+                    user_ids, batch_drift = await run_in_threadpool(self._repair_batch, shard, after_user_id, fix)
+                checked += len(user_ids)
+                drift.extend(batch_drift)
+                if len(user_ids) < self.batch_size:
+                    break
+                after_user_id = user_ids[-1]
+
+        drifted_users = sorted({row["user_id"] for row in drift})
+        if fix and todo_cache:
+            for user_id in drifted_users:
+                await todo_cache.invalidate(user_id)
+        TODO_STATS_DRIFT.inc(len(drift))
+        self.last_report = {
+            "finished_at": datetime.utcnow().isoformat(),
+            "fixed": fix,
+            "users_checked": checked,
+            "users_drifted": len(drifted_users),
+            "counters_drifted": len(drift),
+            "drift": drift[:REPORT_LIMIT],
+        }
+        if drift:
+            logger.warning(
+                "todo_stats drifted from todos",
+                extra={key: value for key, value in self.last_report.items() if key != "drift"}
+            )
+        return self.last_report
+
+    async def poll(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.run()
+            except Exception:
+                logger.exception("Repairing todo stats failed")
+
+todo_stats_repairer = TodoStatsRepairer(batch_size=settings.TODO_STATS_REPAIR_BATCH_SIZE)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Rebuild todo_stats from todos and report drift")
+    parser.add_argument("--dry-run", action="store_true", help="Only report drift, change nothing")
+    args = parser.parse_args(argv)
+    report = asyncio.run(todo_stats_repairer.run(fix=not args.dry_run))
+    print(json.dumps(report, indent=2, default=str))
+    return 1 if report["counters_drifted"] else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
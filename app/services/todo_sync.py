@@ -0,0 +1,66 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.database.connection import SHARDS, async_shard_session, shard_session
+from app.services.todo_service import AsyncTodoService, TodoService
+
+logger = logging.getLogger(__name__)
+
+# Tombstones outlive the sync tokens that may need them by this much, covering
+# replica lag and clock skew between the workers issuing tokens and the database
+COMPACT_MARGIN = timedelta(hours=1)
+
+class TombstoneCompactor:
+    """
+    Deletes todo tombstones older than the retention period, batch_size per
+    transaction so no statement holds locks for long.
+
+    Every worker runs it; the deletes are idempotent, so overlapping runs
+    only repeat a cheap indexed SELECT.
+    """
+
+    def __init__(self, retention: float, batch_size: int):
+        self.retention = retention
+        self.batch_size = batch_size
+        self.compacted = 0
+
+    def _compact_batch(self, shard: Optional[str], before: datetime) -> int:
+        with shard_session(shard) as db:
+            return TodoService.compact_tombstones(db, before, self.batch_size)
+
+    async def run(self) -> int:
+        # deleted_at is stored as naive UTC, like the other server timestamps
+        before = datetime.utcnow() - timedelta(seconds=self.retention) - COMPACT_MARGIN
+        total = 0
+        for shard in SHARDS:
+            while True:
+                if settings.DB_ASYNC_MODE:
+                    async with async_shard_session(shard) as db:
+                        removed = await AsyncTodoService.compact_tombstones(db, before, self.batch_size)
+                else:
+                    removed = await run_in_threadpool(self._compact_batch, shard, before)
+                total += removed
+                if removed < self.batch_size:
+                    break
+        self.compacted += total
+        if total:
+            logger.info("Compacted todo tombstones", extra={"removed": total})
+        return total
+
+    async def poll(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.run()
+            except Exception:
+                logger.exception("Compacting todo tombstones failed")
+
+tombstone_compactor = TombstoneCompactor(
+    retention=settings.SYNC_TOMBSTONE_RETENTION_SECONDS,
+    batch_size=settings.SYNC_COMPACT_BATCH_SIZE
+)
@@ -1,9 +1,68 @@
+import logging
+from datetime import datetime
+from typing import Union
+from sqlalchemy import insert, select, update
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database.connection import engine, shard_bind, shard_engines, shard_of
 from app.database.models import User
-from app.core.security import verify_password, get_password_hash, create_access_token
+from app.core.password_pool import PasswordPoolFull, password_pool
+from app.core.security import create_access_token
+from app.core.token_cache import revocation_list
 from app.schemas.user_schema import UserCreate, Token
+from app.services.threaded import ThreadedService
+
+logger = logging.getLogger(__name__)
+
+def _fallback_hash(user: UserCreate, error: Exception) -> str:
+    logger.error("Password hashing failed, using fallback hash", extra={"email": user.email, "error": str(error)})
+    # If bcrypt fails, use a simple hash as fallback
+    import hashlib
+    hashed_password = hashlib.sha256(user.password.encode()).hexdigest()
+    return hashed_password
+
+def _revocation_time() -> datetime:
+    # Compared with the fractional "iat" of create_access_token, and stored
+    # with microseconds, so tokens minted after this instant stay valid
+    return datetime.utcnow()
+
+def _revoke_statement(user_id: int, valid_after: datetime, disable: bool):
+    values = {"tokens_valid_after": valid_after}
+    if disable:
+        values["is_active"] = False
+    # An account change, even in a session get_current_user routed to a shard
+    return update(User).where(User.id == user_id).values(**values).execution_options(directory=True)
+
+def _shard_copy(db_user: User):
+    """
+    When sharded, the INSERT of a new user's row on their shard, and that
+    shard; None when there's nothing to copy. Todo writes lock and version
+    the user through this row, which has the account fields only because
+    the columns require them.
+    """
+    shard = shard_of(db_user.id)
+    if shard is None or shard_engines[shard] is engine:
+        return None
+    row = insert(User).values(
+        id=db_user.id,
+        name=db_user.name,
+        email=db_user.email,
+        password_hash=db_user.password_hash
+    )
+    return row, shard
 
 class UserService:
+    @staticmethod
+    def hash_password(user: UserCreate) -> str:
+        try:
+            hashed_password = password_pool.hash_sync(user.password)
+            logger.debug("Password hashed", extra={"email": user.email})
+        except PasswordPoolFull:
+            raise
+        except Exception as e:
+            hashed_password = _fallback_hash(user, e)
+        return hashed_password
+
     @staticmethod
     def create_user(db: Session, user: UserCreate):
         # Check if user already exists
@@ -12,15 +71,7 @@ class UserService:
             raise ValueError("Email already registered")
 
         # Hash password
-        try:
-            hashed_password = get_password_hash(user.password)
-            print(f"✅ Password hashed successfully for {user.email}")
-        except Exception as e:
-            print(f"❌ Password hashing error: {e}")
-            # If bcrypt fails, use a simple hash as fallback
-            import hashlib
-            hashed_password = hashlib.sha256(user.password.encode()).hexdigest()
-            print(f"✅ Using fallback hash for {user.email}")
+        hashed_password = UserService.hash_password(user)
 
         # Create new user
         db_user = User(
@@ -31,45 +82,151 @@ class UserService:
 
         try:
             db.add(db_user)
+            db.flush()
+            copy = _shard_copy(db_user)
+            if copy:
+                # One commit() for both: the account's connection began first, so commits first
+                db.execute(copy[0], bind_arguments={"bind": shard_bind(db, copy[1])})
             db.commit()
             db.refresh(db_user)
-            print(f"✅ User {user.email} created successfully with ID {db_user.id}")
+            logger.info("User created", extra={"user_id": db_user.id, "email": user.email})
             return db_user
         except Exception as e:
             db.rollback()
-            print(f"❌ Database error creating user: {e}")
+            logger.warning("Creating user failed", extra={"email": user.email, "error": str(e)})
             raise ValueError(f"Error creating user: {e}")
 
     @staticmethod
     def authenticate_user(db: Session, email: str, password: str):
         try:
-            print(f"🔍 Authenticating user: {email}")
+            logger.debug("Authenticating user", extra={"email": email})
             user = db.query(User).filter(User.email == email).first()
 
             if not user:
-                print(f"❌ User {email} not found in database")
+                logger.info("Login rejected: unknown email", extra={"email": email})
                 return None
 
-            print(f"✅ User {email} found, verifying password")
-            if not verify_password(password, user.password_hash):
-                print(f"❌ Password verification failed for {email}")
+            if not user.is_active:
+                logger.info("Login rejected: user disabled", extra={"email": email})
                 return None
 
-            print(f"✅ Authentication successful for {email}")
+            if not password_pool.verify_sync(password, user.password_hash):
+                logger.info("Login rejected: wrong password", extra={"email": email})
+                return None
+
+            logger.debug("User authenticated", extra={"email": email})
             return user
+        except PasswordPoolFull:
+            raise
         except Exception as e:
-            print(f"❌ Authentication error: {e}")
+            logger.exception("Authentication failed", extra={"email": email})
             return None
 
     @staticmethod
     def create_access_token_for_user(user):
         try:
-            token_data = {"sub": str(user.id)}
+            # The email claim lets get_current_user skip the users lookup
+            token_data = {"sub": str(user.id), "email": user.email}
             access_token = create_access_token(token_data)
-            print(f"✅ JWT token created for user {user.email}")
+            logger.debug("Access token issued", extra={"user_id": user.id})
             return Token(access_token=access_token, token_type="bearer")
         except Exception as e:
-            print(f"❌ Token creation error: {e}")
+            logger.exception("Access token creation failed", extra={"user_id": user.id})
             # Return a simple token if JWT fails
             import secrets
-            return Token(access_token=secrets.token_hex(32), token_type="bearer")
\ No newline at end of file
+            return Token(access_token=secrets.token_hex(32), token_type="bearer")
+
+    @staticmethod
+    def revoke_user_tokens(db: Session, user_id: int, disable: bool = False) -> None:
+        valid_after = _revocation_time()
+        db.execute(_revoke_statement(user_id, valid_after, disable))
+        db.commit()
+        revocation_list.revoke(user_id, valid_after, disable)
+
+class AsyncUserService:
+    """
+    AsyncSession counterpart of UserService. bcrypt is CPU-bound, so hashing
+    and verification are awaited on the dedicated password_pool.
+    """
+
+    @staticmethod
+    async def create_user(db: AsyncSession, user: UserCreate):
+        # Check if user already exists
+        existing_user = await db.scalar(select(User).where(User.email == user.email))
+        if existing_user:
+            raise ValueError("Email already registered")
+
+        try:
+            hashed_password = await password_pool.hash(user.password)
+            logger.debug("Password hashed", extra={"email": user.email})
+        except PasswordPoolFull:
+            raise
+        except Exception as e:
+            hashed_password = _fallback_hash(user, e)
+
+        db_user = User(
+            name=user.name,
+            email=user.email,
+            password_hash=hashed_password
+        )
+
+        try:
+            db.add(db_user)
+            await db.flush()
+            copy = _shard_copy(db_user)
+            if copy:
+                await db.execute(copy[0], bind_arguments={"bind": shard_bind(db, copy[1])})
+            await db.commit()
+            await db.refresh(db_user)
+            logger.info("User created", extra={"user_id": db_user.id, "email": user.email})
+            return db_user
+        except Exception as e:
+            await db.rollback()
+            logger.warning("Creating user failed", extra={"email": user.email, "error": str(e)})
+            raise ValueError(f"Error creating user: {e}")
+
+    @staticmethod
+    async def authenticate_user(db: AsyncSession, email: str, password: str):
+        try:
+            logger.debug("Authenticating user", extra={"email": email})
+            user = await db.scalar(select(User).where(User.email == email))
+
+            if not user:
+                logger.info("Login rejected: unknown email", extra={"email": email})
+                return None
+
+            if not user.is_active:
+                logger.info("Login rejected: user disabled", extra={"email": email})
+                return None
+
+            if not await password_pool.verify(password, user.password_hash):
+                logger.info("Login rejected: wrong password", extra={"email": email})
+                return None
+
+            logger.debug("User authenticated", extra={"email": email})
+            return user
+        except PasswordPoolFull:
+            raise
+        except Exception as e:
+            logger.exception("Authentication failed", extra={"email": email})
+            return None
+
+    @staticmethod
+    async def create_access_token_for_user(user):
+        # Signing is cheap HMAC work, no need to leave the event loop
+        return UserService.create_access_token_for_user(user)
+
+    @staticmethod
+    async def revoke_user_tokens(db: AsyncSession, user_id: int, disable: bool = False) -> None:
+        valid_after = _revocation_time()
+        await db.execute(_revoke_statement(user_id, valid_after, disable))
+        await db.commit()
+        revocation_list.revoke(user_id, valid_after, disable)
+
+ThreadedUserService = ThreadedService(UserService)
+
+def get_user_service(db: Union[Session, AsyncSession]):
+    """Pick the service flavour matching the session yielded by get_session."""
+    if isinstance(db, AsyncSession):
+        return AsyncUserService
+    return ThreadedUserService
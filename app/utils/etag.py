@@ -0,0 +1,60 @@
+import hashlib
+import json
+from typing import Any, Dict, Optional
+from fastapi import Response, status
+
+def todo_etag(todo_id: int, version: int) -> str:
+    """
+    Build the strong ETag of a single todo.
+
+    Args:
+        todo_id: Primary key of the todo
+        version: The row's todos.version, bumped on every update
+
+    Returns:
+        A quoted entity tag
+    """
+    return f'"todo-{todo_id}-v{version}"'
+
+def list_etag(list_version: int, params: Dict[str, Any]) -> str:
+    """
+    Build the strong ETag of one todo list page.
+
+    Args:
+        list_version: The owner's users.todos_version, bumped on every todo write
+        params: Everything that selects the page (user, filters, sort, cursor...)
+
+    Returns:
+        A quoted entity tag; differing params never share a tag
+    """
+    digest = hashlib.sha1(
+        json.dumps(params, sort_keys=True, default=str).encode()
+    ).hexdigest()[:16]
+    return f'"todos-v{list_version}-{digest}"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Evaluate an If-None-Match header against the current ETag.
+
+    Uses the weak comparison RFC 9110 prescribes for If-None-Match, so a
+    W/ prefix added by a proxy still matches.
+
+    Args:
+        if_none_match: Raw header value, possibly a comma separated list or "*"
+        etag: The current strong ETag
+
+    Returns:
+        True if the client's copy is current
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip() for tag in if_none_match.split(","))
+    return etag in (tag[2:] if tag.startswith("W/") else tag for tag in candidates)
+
+def not_modified(etag: str) -> Response:
+    """
+    Create an empty 304 response carrying the ETag.
+    """
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
@@ -57,6 +57,14 @@ class ConflictException(AppException):
             detail=detail,
         )
 
+class GoneException(AppException):
+    """Raised when a resource or token existed but is no longer available."""
+    def __init__(self, detail: str = "Gone") -> None:
+        super().__init__(
+            status_code=status.HTTP_410_GONE,
+            detail=detail,
+        )
+
 class ValidationException(AppException):
     """Raised when data validation fails."""
     def __init__(self, errors: Dict[str, Any], detail: str = "Validation error") -> None:
@@ -66,6 +74,15 @@ class ValidationException(AppException):
         )
         self.errors = errors
 
+class ServiceUnavailableException(AppException):
+    """Raised when the server is temporarily overloaded and the client should retry."""
+    def __init__(self, detail: str = "Service temporarily unavailable", retry_after: int = 1) -> None:
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=detail,
+            headers={"Retry-After": str(retry_after)},
+        )
+
 class InternalServerError(AppException):
     """Raised when an unexpected error occurs."""
     def __init__(self, detail: str = "Internal server error") -> None:
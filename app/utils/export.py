@@ -0,0 +1,80 @@
+import csv
+import io
+from datetime import datetime
+from typing import Any, AnyStr, Callable, Iterable, List, Union
+
+import orjson
+
+from app.schemas.todo_schema import ExportFormat
+from app.utils.serializers import TODO_FIELDS, todo_dicts
+
+MEDIA_TYPES = {
+    ExportFormat.NDJSON: "application/x-ndjson",
+    ExportFormat.CSV: "text/csv",
+}
+
+CSV_COLUMNS = list(TODO_FIELDS)
+
+def ndjson_chunk(rows: List[Any]) -> bytes:
+    """
+    Serialize a batch of todo rows as newline-delimited JSON.
+
+    Args:
+        rows: Todo rows or instances with the TodoResponse fields as attributes
+
+    Returns:
+        One JSON document per line, in the shape of TodoResponse
+    """
+    return b"".join(orjson.dumps(todo, option=orjson.OPT_APPEND_NEWLINE) for todo in todo_dicts(rows))
+
+def csv_chunk(rows: List[Any]) -> str:
+    """
+    Serialize a batch of todo rows as CSV lines (no header).
+
+    Args:
+        rows: Todo rows or instances with the TodoResponse fields as attributes
+
+    Returns:
+        CSV text with columns in CSV_COLUMNS order; timestamps in ISO 8601
+        like TodoResponse
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for todo in todo_dicts(rows):
+        writer.writerow(value.isoformat() if isinstance(value, datetime) else value for value in todo.values())
+    return buffer.getvalue()
+
+def csv_header() -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(CSV_COLUMNS)
+    return buffer.getvalue()
+
+def encode_batches(batches: Union[Iterable, Any], encode: Callable[[List[Any]], AnyStr], head: str = ""):
+    """
+    Turn result partitions into response chunks, one chunk per batch.
+
+    A sync iterable stays sync so StreamingResponse walks it in the
+    threadpool (one hop per batch); an async one stays async.
+
+    Args:
+        batches: Result.partitions() or AsyncResult.partitions()
+        encode: ndjson_chunk or csv_chunk
+        head: Text sent before the first batch (e.g. the CSV header)
+
+    Returns:
+        A generator or async generator of str or bytes chunks
+    """
+    if hasattr(batches, "__aiter__"):
+        async def chunks():
+            if head:
+                yield head
+            async for batch in batches:
+                yield encode(batch)
+        return chunks()
+
+    def chunks():
+        if head:
+            yield head
+        for batch in batches:
+            yield encode(batch)
+    return chunks()
@@ -0,0 +1,95 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+
+def _encode(payload: List[Any]) -> str:
+    data = json.dumps(payload, separators=(",", ":"))
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip("=")
+
+def _decode(token: str) -> Any:
+    padded = token + "=" * (-len(token) % 4)
+    return json.loads(base64.urlsafe_b64decode(padded.encode()))
+
+def encode_cursor(sort: str, key: Any, item_id: int) -> str:
+    """
+    Build an opaque keyset cursor pointing just after the given row.
+
+    Args:
+        sort: The sort order the page was produced with
+        key: Value of the sort column on the last row of the page
+        item_id: Primary key of the last row of the page (tie breaker)
+
+    Returns:
+        A URL-safe string the client passes back unchanged
+    """
+    if isinstance(key, datetime):
+        key = key.isoformat()
+    return _encode([sort, key, item_id])
+
+def decode_cursor(cursor: str, sort: str) -> Tuple[Any, int]:
+    """
+    Decode a cursor produced by encode_cursor.
+
+    Args:
+        cursor: The opaque cursor string
+        sort: The sort order of the current request
+
+    Returns:
+        The (key, id) keyset position; datetimes come back as ISO strings
+
+    Raises:
+        ValueError: If the cursor is malformed or was issued for another sort
+    """
+    try:
+        cursor_sort, key, item_id = _decode(cursor)
+        item_id = int(item_id)
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid pagination cursor") from e
+    if cursor_sort != sort:
+        raise ValueError("Pagination cursor does not match the requested sort")
+    return key, item_id
+
+class SyncTokenExpired(ValueError):
+    """Raised for a sync token older than the tombstone retention; the client must resync."""
+
+def encode_sync_token(
+    change_seq: int, item_id: int, issued_at: float, deleted_after: Optional[int] = None
+) -> str:
+    """
+    Build an opaque GET /todos/changes token pointing just after a change.
+
+    Args:
+        change_seq: Sequence of the last change returned
+        item_id: Todo id of the last change returned (tie breaker)
+        issued_at: Epoch seconds the client was last fully caught up
+        deleted_after: While a full sync is paged, the sequence it started
+            from; deletes at or before it predate the client's copy
+
+    Returns:
+        A URL-safe string the client passes back unchanged
+    """
+    payload = ["changes", change_seq, item_id, int(issued_at)]
+    if deleted_after is not None:
+        payload.append(deleted_after)
+    return _encode(payload)
+
+def decode_sync_token(token: str) -> Tuple[int, int, float, Optional[int]]:
+    """
+    Decode a token produced by encode_sync_token.
+
+    Returns:
+        The (change_seq, id) position, the issue time and deleted_after
+        (None when the token has none)
+
+    Raises:
+        ValueError: If the token is malformed
+    """
+    try:
+        kind, change_seq, item_id, issued_at, *rest = _decode(token)
+        if kind != "changes" or len(rest) > 1:
+            raise ValueError(kind)
+        deleted_after = int(rest[0]) if rest else None
+        return int(change_seq), int(item_id), float(issued_at), deleted_after
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid sync token") from e
@@ -0,0 +1,60 @@
+from operator import attrgetter
+from typing import Any, Dict, Iterable, List
+
+import orjson
+from starlette.responses import Response
+
+from app.schemas.todo_schema import TodoResponse
+
+# TodoResponse field order, resolved once; the getter reads them off ORM rows
+# and cached TodoResponse models alike
+TODO_FIELDS = tuple(TodoResponse.__fields__)
+_todo_values = attrgetter(*TODO_FIELDS)
+
+class JSONBytesResponse(Response):
+    """application/json response whose body was already encoded."""
+
+    media_type = "application/json"
+
+def todo_dict(todo: Any) -> Dict[str, Any]:
+    """
+    Plain dict in the shape of TodoResponse, without pydantic validation.
+
+    Args:
+        todo: Todo instance or TodoResponse
+
+    Returns:
+        Field values as stored; orjson writes the status enum by value and
+        created_at as ISO 8601, matching TodoResponse
+    """
+    return dict(zip(TODO_FIELDS, _todo_values(todo)))
+
+def todo_dicts(todos: Iterable[Any]) -> List[Dict[str, Any]]:
+    return [dict(zip(TODO_FIELDS, _todo_values(todo))) for todo in todos]
+
+def dump_todo(todo: Any) -> bytes:
+    """Encode one todo as a TodoResponse JSON document."""
+    return orjson.dumps(todo_dict(todo))
+
+def dump_todo_page(page: Any) -> bytes:
+    """
+    Encode a TodoListResponse, TodoSearchResponse or TodoChangesResponse,
+    including ones built with construct() around ORM rows, straight to
+    JSON bytes.
+    """
+    body = {name: getattr(page, name) for name in page.__fields__}
+    body["todos"] = todo_dicts(page.todos)
+    return orjson.dumps(body)
+
+def dump_stats(stats: Any) -> bytes:
+    """
+    Encode a TodoStatsResponse straight to JSON bytes.
+
+    by_status is keyed by TodoStatus; orjson writes those keys by value.
+    """
+    body = {
+        "total": stats.total,
+        "by_status": stats.by_status,
+        "days": [{"day": day.day, "total": day.total, "by_status": day.by_status} for day in stats.days],
+    }
+    return orjson.dumps(body, option=orjson.OPT_NON_STR_KEYS)
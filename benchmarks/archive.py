@@ -0,0 +1,147 @@
+"""
+Measure todo list reads before and after archiving, and the archiver's throughput.
+
+Usage:
+    python -m benchmarks.archive --rows 200000 --users 4
+    python -m benchmarks.archive --sleep-factor 1.0 --batch-size 500
+    python -m benchmarks.archive --database-url mysql+pymysql://user:pw@localhost/bench
+
+Seeds --rows todos over --users users, --completed of them completed a
+year ago and the rest pending and recent. Times GET /todos/ reads of one
+user (median of --repeat): the first page with its total, a page deep in
+the list, a count over a created_at range, and the pending todos. Then runs
+the archiver with --batch-size and --sleep-factor, and reports its
+throughput and how busy it kept the database, before timing the same reads
+again both without and with include_archived.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=200000, help="Todos seeded in total")
+    parser.add_argument("--users", type=int, default=4, help="Users the todos are spread over")
+    parser.add_argument("--completed", type=float, default=0.9, help="Fraction of todos old and completed")
+    parser.add_argument("--batch-size", type=int, default=1000, help="ARCHIVE_BATCH_SIZE")
+    parser.add_argument("--sleep-factor", type=float, default=0.0, help="ARCHIVE_SLEEP_FACTOR")
+    parser.add_argument("--repeat", type=int, default=20, help="Runs per read; the median is reported")
+    parser.add_argument(
+        "--database-url",
+        default=None,
+        help="Database to run against (default: a fresh SQLite file)",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.database_url is None:
+        args.database_url = f"sqlite:///{tempfile.mkdtemp()}/bench.db"
+    # The app reads its configuration at import time
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ["DB_ASYNC_MODE"] = "false"
+    os.environ["ARCHIVE_BATCH_SIZE"] = str(args.batch_size)
+    os.environ["ARCHIVE_SLEEP_FACTOR"] = str(args.sleep_factor)
+
+    import asyncio
+
+    from sqlalchemy import insert
+
+    from app.database import models
+    from app.database.connection import SessionLocal, engine
+    from app.database.schema import create_schema
+    from app.schemas.todo_schema import CountMode, TodoSort
+    from app.services.todo_archive import todo_archiver
+    from app.services.todo_service import TodoService
+    from app.services.todo_stats import todo_stats_repairer
+
+    create_schema(engine)
+
+    start = time.perf_counter()
+    now = datetime.utcnow()
+    old = now - timedelta(days=365)
+    cutoff = int(args.rows * args.completed)
+    with engine.begin() as connection:
+        user_ids = [
+            connection.execute(
+                insert(models.User).values(
+                    name="bench", email=f"archive-{time.time_ns()}-{i}@example.com", password_hash="-"
+                )
+            ).inserted_primary_key[0]
+            for i in range(args.users)
+        ]
+        for offset in range(0, args.rows, 10000):
+            rows = []
+            for i in range(offset, min(offset + 10000, args.rows)):
+                # Completed todos are the older ones, as they would be in use
+                archived = i < cutoff
+                created_at = (old if archived else now) - timedelta(seconds=args.rows - i)
+                rows.append({
+                    "title": f"todo {i}",
+                    "user_id": user_ids[i % args.users],
+                    "status": models.TodoStatus.COMPLETED if archived else models.TodoStatus.PENDING,
+                    "created_at": created_at,
+                    "updated_at": created_at,
+                })
+            connection.execute(insert(models.Todo), rows)
+    # Seeded behind TodoService's back, so the repair job builds the counters
+    asyncio.run(todo_stats_repairer.run())
+    print(f"seeded {args.rows} todos in {time.perf_counter() - start:.1f}s against {engine.url.render_as_string()}\n")
+
+    user_id = user_ids[0]
+    deep = cutoff // args.users // 2
+    reads = [
+        ("first page, total", {"count": CountMode.EXACT}),
+        (f"page at skip={deep}", {"skip": deep, "count": CountMode.NONE}),
+        ("newest first", {"sort": TodoSort.CREATED_AT_DESC, "count": CountMode.NONE}),
+        ("count over last 400 days", {"created_after": now - timedelta(days=400), "count": CountMode.EXACT}),
+        ("pending, total", {"status": models.TodoStatus.PENDING, "count": CountMode.EXACT}),
+    ]
+
+    def median_ms(params):
+        timings = []
+        with SessionLocal() as db:
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                page = TodoService.get_user_todos(db, user_id, limit=20, **params)
+                timings.append(time.perf_counter() - start)
+        return statistics.median(timings) * 1000, page.total
+
+    def time_reads(include_archived=None):
+        extra = {} if include_archived is None else {"include_archived": include_archived}
+        return {name: median_ms({**params, **extra}) for name, params in reads}
+
+    single = time_reads()
+
+    # Everything completed before a day ago is old enough
+    todo_archiver.after = 24 * 3600
+    report = asyncio.run(todo_archiver.run())
+    busy_share = report["busy_seconds"] / report["elapsed_seconds"] if report["elapsed_seconds"] else 0
+    print(
+        f"archiver: {report['archived']} of {report['examined']} todos archived in {report['batches']} "
+        f"batches of {args.batch_size}, {report['elapsed_seconds']:.1f}s "
+        f"({report['archived_per_second']} archived/s while busy, database busy {busy_share:.0%} "
+        f"of the run at sleep factor {args.sleep_factor})"
+    )
+    for shard, tables in report["tables"].items():
+        print(f"  {shard}: {tables['hot']} rows left in todos, {tables['archive']} in todos_archive")
+
+    hot = time_reads(include_archived=False)
+    both = time_reads(include_archived=True)
+    print(f"\n{'read of user ' + str(user_id):<28} {'one table':>12} {'hot tier':>12} {'both tiers':>12}   totals")
+    for name, _ in reads:
+        print(
+            f"{name:<28} {single[name][0]:9.3f} ms {hot[name][0]:9.3f} ms {both[name][0]:9.3f} ms   "
+            f"{single[name][1]} / {hot[name][1]} / {both[name][1]}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
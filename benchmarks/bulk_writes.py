@@ -0,0 +1,126 @@
+"""
+Compare the per-item todo write endpoints with the /todos/bulk endpoints.
+
+Usage:
+    python -m benchmarks.bulk_writes --items 1000
+    python -m benchmarks.bulk_writes --database-url mysql+pymysql://user:pw@localhost/bench
+
+Each phase creates, updates and deletes the same number of todos through
+the HTTP API (in-process TestClient) and reports wall time, items per
+second, SQL statements and commits issued.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--items", type=int, default=1000, help="Todos written per phase")
+    parser.add_argument(
+        "--database-url",
+        default=None,
+        help="Database to run against (default: a fresh SQLite file)",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.database_url is None:
+        args.database_url = f"sqlite:///{tempfile.mkdtemp()}/bench.db"
+    # The app reads its configuration at import time
+    os.environ["DATABASE_URL"] = args.database_url
+
+    from fastapi.testclient import TestClient
+    from sqlalchemy import create_engine, event
+
+    from app.core.config import settings
+    from app.database.schema import create_schema
+    from app.database.connection import async_engine, engine
+    from app.main import app
+
+    create_schema(create_engine(args.database_url))
+
+    counters = {"statements": 0, "commits": 0}
+
+    def counter(key):
+        def listener(*args):
+            counters[key] += 1
+        return listener
+
+    for sync_engine in (engine, async_engine.sync_engine):
+        sync_engine.echo = False
+        event.listen(sync_engine, "before_cursor_execute", counter("statements"))
+        event.listen(sync_engine, "commit", counter("commits"))
+
+    def chunks(values):
+        for start in range(0, len(values), settings.BULK_MAX_ITEMS):
+            yield values[start:start + settings.BULK_MAX_ITEMS]
+
+    def measure(label, run):
+        counters.update(statements=0, commits=0)
+        start = time.perf_counter()
+        result = run()
+        elapsed = time.perf_counter() - start
+        print(
+            f"{label:<22} {elapsed:8.3f}s {args.items / elapsed:10.1f} items/s "
+            f"{counters['statements']:7d} statements {counters['commits']:6d} commits"
+        )
+        return result, elapsed
+
+    with TestClient(app) as client:
+        credentials = {"name": "bench", "email": f"bench-{time.time_ns()}@example.com", "password": "bench"}
+        client.post("/auth/signup", json=credentials)
+        token = client.post(
+            "/auth/login", data={"username": credentials["email"], "password": credentials["password"]}
+        ).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        titles = [f"todo {i}" for i in range(args.items)]
+
+        def create_each():
+            return [client.post("/todos/", json={"title": t}, headers=headers).json()["id"] for t in titles]
+
+        def update_each(ids):
+            for todo_id in ids:
+                client.put(f"/todos/{todo_id}", json={"status": "completed"}, headers=headers)
+
+        def delete_each(ids):
+            for todo_id in ids:
+                client.delete(f"/todos/{todo_id}", headers=headers)
+
+        def create_bulk():
+            ids = []
+            for chunk in chunks(titles):
+                response = client.post("/todos/bulk", json={"items": [{"title": t} for t in chunk]}, headers=headers)
+                ids.extend(result["id"] for result in response.json()["results"])
+            return ids
+
+        def update_bulk(ids):
+            for chunk in chunks(ids):
+                items = [{"id": todo_id, "status": "completed"} for todo_id in chunk]
+                client.patch("/todos/bulk", json={"items": items}, headers=headers)
+
+        def delete_bulk(ids):
+            for chunk in chunks(ids):
+                client.request("DELETE", "/todos/bulk", json={"ids": chunk}, headers=headers)
+
+        print(f"{args.items} items against {engine.url.render_as_string()}\n")
+        totals = {}
+        for mode, create, update, remove in (
+            ("per-item", create_each, update_each, delete_each),
+            ("bulk", create_bulk, update_bulk, delete_bulk),
+        ):
+            ids, create_time = measure(f"{mode} create", create)
+            _, update_time = measure(f"{mode} update", lambda: update(ids))
+            _, delete_time = measure(f"{mode} delete", lambda: remove(ids))
+            totals[mode] = create_time + update_time + delete_time
+
+        print(f"\nbulk speedup: {totals['per-item'] / totals['bulk']:.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
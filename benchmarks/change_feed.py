@@ -0,0 +1,147 @@
+"""
+Hold many idle GET /todos/stream connections and time a fan-out to them.
+
+Usage:
+    python -m benchmarks.change_feed --streams 10000
+    python -m benchmarks.change_feed --streams 10000 --users 100 --writes 20
+
+Boots app.main:app under uvicorn against a fresh SQLite file and opens
+--streams change feed connections spread over --users accounts (raw
+sockets, so the client side stays small). Reports the worker's resident
+memory per open stream, then creates a todo for every user --writes times
+and reports how long it took until each stream had received the event.
+Needs a file descriptor limit above --streams (`ulimit -n`).
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from urllib.parse import urlsplit
+
+import httpx
+
+from benchmarks.endpoints import percentile, start_server
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--streams", type=int, default=10000, help="Open change feed connections")
+    parser.add_argument("--users", type=int, default=10, help="Accounts the streams are spread over")
+    parser.add_argument("--writes", type=int, default=5, help="Fan-outs timed per user")
+    parser.add_argument("--connect-batch", type=int, default=500, help="Streams opened concurrently")
+    return parser.parse_args()
+
+
+def rss_mb(pid):
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return float("nan")
+
+
+class Stream:
+    """One raw HTTP/1.1 connection reading SSE frames."""
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+    @classmethod
+    async def open(cls, host, port, token):
+        reader, writer = await asyncio.open_connection(host, port)
+        writer.write(
+            f"GET /todos/stream HTTP/1.1\r\nHost: {host}\r\nAuthorization: Bearer {token}\r\n"
+            f"Accept: text/event-stream\r\n\r\n".encode()
+        )
+        stream = cls(reader, writer)
+        await stream.wait_for(b"event: ready")
+        return stream
+
+    async def wait_for(self, marker):
+        # Chunk-size lines are left in: an SSE frame is never split across HTTP chunks
+        buffer = b""
+        while marker not in buffer:
+            data = await self.reader.read(65536)
+            if not data:
+                raise ConnectionError("stream closed")
+            buffer = buffer[-len(marker):] + data
+        return time.perf_counter()
+
+
+async def run(args, base_url, server_pid):
+    url = urlsplit(base_url)
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+        tokens = []
+        for i in range(args.users):
+            credentials = {"name": "bench", "email": f"bench-{i}@example.com", "password": "bench-password"}
+            await client.post("/auth/signup", json=credentials)
+            response = await client.post(
+                "/auth/login", data={"username": credentials["email"], "password": credentials["password"]}
+            )
+            tokens.append(response.json()["access_token"])
+
+        idle_rss = rss_mb(server_pid)
+        start = time.perf_counter()
+        streams = []
+        for offset in range(0, args.streams, args.connect_batch):
+            batch = range(offset, min(offset + args.connect_batch, args.streams))
+            streams += await asyncio.gather(
+                *(Stream.open(url.hostname, url.port, tokens[i % args.users]) for i in batch)
+            )
+        connect_seconds = time.perf_counter() - start
+        open_rss = rss_mb(server_pid)
+
+        latencies = []
+        for n in range(args.writes):
+            for i, token in enumerate(tokens):
+                marker = f'"title":"fanout {n}-{i}"'.encode()
+                waiting = [
+                    asyncio.create_task(stream.wait_for(marker)) for stream in streams[i::args.users]
+                ]
+                sent = time.perf_counter()
+                await client.post(
+                    "/todos/", json={"title": f"fanout {n}-{i}"}, headers={"Authorization": f"Bearer {token}"}
+                )
+                latencies.append(max(await asyncio.gather(*waiting)) - sent)
+
+        stats = (await client.get("/debug/feed")).json()
+        for stream in streams:
+            stream.writer.close()
+        return idle_rss, open_rss, connect_seconds, sorted(latencies), stats
+
+
+def main():
+    args = parse_args()
+    database_url = f"sqlite:///{tempfile.mkdtemp()}/bench.db"
+    os.environ["DATABASE_URL"] = database_url
+
+    from sqlalchemy import create_engine
+
+    from app.database.schema import create_schema
+
+    create_schema(create_engine(database_url))
+    server, base_url = start_server(database_url, env={"FEED_MAX_SUBSCRIBERS": str(args.streams + 100), "DEBUG_ENDPOINTS": "true"})
+    try:
+        idle_rss, open_rss, connect_seconds, latencies, stats = asyncio.run(run(args, base_url, server.pid))
+    finally:
+        server.terminate()
+        server.wait()
+
+    per_user = args.streams // args.users
+    print(f"{args.streams} streams over {args.users} users, {args.writes * args.users} fan-outs of ~{per_user}\n")
+    print(f"worker RSS before   {idle_rss:8.1f} MB")
+    print(f"worker RSS open     {open_rss:8.1f} MB  ({(open_rss - idle_rss) * 1024 / args.streams:.1f} KB per stream)")
+    print(f"opened in           {connect_seconds:8.2f} s")
+    print(
+        f"fan-out to last     p50 {percentile(latencies, 0.5) * 1000:.1f} ms, "
+        f"p99 {percentile(latencies, 0.99) * 1000:.1f} ms, max {latencies[-1] * 1000:.1f} ms"
+    )
+    print(f"dropped streams     {stats['dropped']:8d}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
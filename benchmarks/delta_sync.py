@@ -0,0 +1,118 @@
+"""
+Compare reconciling a todo list by delta sync with re-downloading it.
+
+Usage:
+    python -m benchmarks.delta_sync --rows 100000 --changes 50
+    python -m benchmarks.delta_sync --database-url mysql+pymysql://user:pw@localhost/bench
+
+Seeds --rows todos for one user (and as many for a second user),
+takes a sync token, then updates and deletes --changes of them. Times
+TodoService.get_changes from that token against paging through the whole
+list with get_user_todos (keyset cursors, no COUNT), 100 rows a page, the
+way a client without delta sync reconciles.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=100000, help="Todos of the syncing user")
+    parser.add_argument("--changes", type=int, default=50, help="Writes since the client's last sync")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per method; the median is reported")
+    parser.add_argument(
+        "--database-url",
+        default=None,
+        help="Database to run against (default: a fresh SQLite file)",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.database_url is None:
+        args.database_url = f"sqlite:///{tempfile.mkdtemp()}/bench.db"
+    # The app reads its configuration at import time
+    os.environ["DATABASE_URL"] = args.database_url
+
+    from sqlalchemy import insert, update
+
+    from app.database import models
+    from app.database.connection import SessionLocal, engine
+    from app.database.schema import create_schema
+    from app.schemas.todo_schema import CountMode, TodoUpdate
+    from app.services.todo_service import TodoService
+
+    create_schema(engine)
+
+    start = time.perf_counter()
+    with engine.begin() as connection:
+        user_ids = [
+            connection.execute(
+                insert(models.User).values(
+                    name="bench", email=f"sync-{time.time_ns()}-{i}@example.com", password_hash="-"
+                )
+            ).inserted_primary_key[0]
+            for i in range(2)
+        ]
+        # Interleaved, so the syncing user's rows are spread through the table
+        for offset in range(0, args.rows * 2, 10000):
+            connection.execute(
+                insert(models.Todo),
+                [
+                    {"title": f"todo {i}", "user_id": user_ids[i % 2], "change_seq": i // 2 + 1}
+                    for i in range(offset, min(offset + 10000, args.rows * 2))
+                ],
+            )
+        connection.execute(update(models.User).values(todos_version=args.rows))
+    print(f"seeded {args.rows * 2} todos in {time.perf_counter() - start:.1f}s against {engine.url.render_as_string()}\n")
+
+    user_id = user_ids[0]
+    with SessionLocal() as db:
+        # The client's initial full sync, in one page
+        token = TodoService.get_changes(db, user_id, limit=args.rows).next_token
+
+        todos = TodoService.get_user_todos(db, user_id, limit=args.rows, count=CountMode.NONE).todos
+        for todo in random.Random(0).sample(todos, args.changes):
+            if todo.id % 2:
+                TodoService.delete_todo(db, todo.id, user_id)
+            else:
+                TodoService.update_todo(db, todo.id, TodoUpdate(status="completed"), user_id)
+
+    def delta(db):
+        result = TodoService.get_changes(db, user_id, since=token, limit=1000)
+        return len(result.todos) + len(result.deleted), 1
+
+    def full(db):
+        rows, pages, cursor = 0, 0, None
+        while True:
+            page = TodoService.get_user_todos(db, user_id, limit=100, cursor=cursor, count=CountMode.NONE)
+            rows, pages, cursor = rows + len(page.todos), pages + 1, page.next_cursor
+            if cursor is None:
+                return rows, pages
+
+    def median_ms(run):
+        timings = []
+        with SessionLocal() as db:
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                rows, pages = run(db)
+                timings.append(time.perf_counter() - start)
+        return statistics.median(timings) * 1000, rows, pages
+
+    print(f"{'method':<20} {'median':>12} {'rows':>8} {'requests':>9}")
+    delta_ms, delta_rows, delta_pages = median_ms(delta)
+    full_ms, full_rows, full_pages = median_ms(full)
+    print(f"{'GET /todos/changes':<20} {delta_ms:9.2f} ms {delta_rows:8} {delta_pages:9}")
+    print(f"{'GET /todos/ pages':<20} {full_ms:9.2f} ms {full_rows:8} {full_pages:9}")
+    print(f"\ndelta sync {full_ms / delta_ms:.0f}x faster for {args.changes} changes in {args.rows} todos")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
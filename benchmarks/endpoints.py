@@ -0,0 +1,294 @@
+"""
+Load-test every todo API route and compare against a stored baseline.
+
+Usage:
+    python -m benchmarks.endpoints
+    python -m benchmarks.endpoints --write-baseline benchmarks/baselines/sqlite.json
+    python -m benchmarks.endpoints --baseline benchmarks/baselines/sqlite.json --threshold 0.25
+    python -m benchmarks.endpoints --database-url mysql+pymysql://user:pw@localhost/bench
+
+Boots app.main:app under uvicorn in a subprocess against a fresh SQLite file
+(or --database-url), seeds --users accounts with --seed-todos todos each, then
+drives signup, login, create, list, get, update and delete one route at a
+time at a fixed concurrency. Reports requests per second and latency
+percentiles per route. With --baseline, exits 1 when a route's throughput
+drops or its p50/p99 grows by more than --threshold, or when any request
+fails.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from itertools import count
+
+import httpx
+
+ROUTES = ("signup", "login", "create", "list", "get", "update", "delete")
+
+# Settings a baseline is only comparable under
+COMPARABLE = ("concurrency", "requests", "auth_requests", "users", "seed_todos", "database")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--concurrency", type=int, default=16, help="Requests in flight per route")
+    parser.add_argument("--requests", type=int, default=1000, help="Requests per todo route")
+    parser.add_argument(
+        "--auth-requests", type=int, default=100, help="Requests for signup and login (bcrypt bound)"
+    )
+    parser.add_argument("--users", type=int, default=16, help="Accounts the todo routes spread over")
+    parser.add_argument("--seed-todos", type=int, default=1000, help="Todos seeded per account")
+    parser.add_argument(
+        "--database-url",
+        default=None,
+        help="Database to run against (default: a fresh SQLite file)",
+    )
+    parser.add_argument("--baseline", default=None, help="Baseline JSON to compare against")
+    parser.add_argument(
+        "--threshold", type=float, default=0.2, help="Allowed relative regression (0.2 = 20%%)"
+    )
+    parser.add_argument("--write-baseline", default=None, help="Save this run as a baseline JSON")
+    return parser.parse_args()
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def machine():
+    return {"arch": platform.machine(), "cpus": os.cpu_count(), "python": platform.python_version()}
+
+
+def percentile(ordered, fraction):
+    # Nearest-rank on an already sorted list
+    index = min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(latencies, errors, elapsed):
+    ordered = sorted(latencies)
+    return {
+        "requests": len(ordered),
+        "errors": errors,
+        "rps": round(len(ordered) / elapsed, 1),
+        "p50_ms": round(percentile(ordered, 0.50) * 1000, 2),
+        "p90_ms": round(percentile(ordered, 0.90) * 1000, 2),
+        "p99_ms": round(percentile(ordered, 0.99) * 1000, 2),
+        "max_ms": round(ordered[-1] * 1000, 2),
+    }
+
+
+async def drive(client, total, concurrency, make_request, expected):
+    """Send `total` requests, `concurrency` at a time; make_request(i) returns a coroutine."""
+    latencies = []
+    errors = 0
+    counter = count()
+
+    async def worker():
+        nonlocal errors
+        while True:
+            i = next(counter)
+            if i >= total:
+                return
+            start = time.perf_counter()
+            try:
+                response = await make_request(i)
+                if response.status_code != expected:
+                    errors += 1
+            except httpx.TransportError:
+                # e.g. the server dropping the connection on an unhandled error
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - start)
+
+
+async def run(args, base_url):
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        run_id = time.time_ns()
+        password = "bench-password"
+        results = {}
+
+        def signup(i):
+            return client.post(
+                "/auth/signup",
+                json={"name": "bench", "email": f"bench-{run_id}-{i}@example.com", "password": password},
+            )
+
+        def login(i):
+            email = f"bench-{run_id}-{i % args.users}@example.com"
+            return client.post("/auth/login", data={"username": email, "password": password})
+
+        # Signup is measured over auth_requests accounts; the first `users` serve the todo routes
+        results["signup"] = await drive(
+            client, max(args.auth_requests, args.users), args.concurrency, signup, 201
+        )
+        results["login"] = await drive(client, args.auth_requests, args.concurrency, login, 200)
+
+        headers = []
+        for i in range(args.users):
+            token = (await login(i)).json()["access_token"]
+            headers.append({"Authorization": f"Bearer {token}"})
+
+        for user_headers in headers:
+            for offset in range(0, args.seed_todos, 500):
+                items = [{"title": f"seed {n}", "description": "seeded"} for n in range(offset, min(offset + 500, args.seed_todos))]
+                await client.post("/todos/bulk", json={"items": items}, headers=user_headers)
+
+        created = [None] * args.requests
+
+        async def create(i):
+            response = await client.post(
+                "/todos/", json={"title": f"todo {i}", "description": "benchmark"}, headers=headers[i % args.users]
+            )
+            if response.status_code == 201:
+                created[i] = response.json()["id"]
+            return response
+
+        def list_todos(i):
+            return client.get("/todos/", params={"limit": 20}, headers=headers[i % args.users])
+
+        def get(i):
+            return client.get(f"/todos/{created[i]}", headers=headers[i % args.users])
+
+        def update(i):
+            return client.put(f"/todos/{created[i]}", json={"status": "completed"}, headers=headers[i % args.users])
+
+        def delete(i):
+            return client.delete(f"/todos/{created[i]}", headers=headers[i % args.users])
+
+        results["create"] = await drive(client, args.requests, args.concurrency, create, 201)
+        results["list"] = await drive(client, args.requests, args.concurrency, list_todos, 200)
+        results["get"] = await drive(client, args.requests, args.concurrency, get, 200)
+        results["update"] = await drive(client, args.requests, args.concurrency, update, 200)
+        results["delete"] = await drive(client, args.requests, args.concurrency, delete, 204)
+        return results
+
+
+def start_server(database_url, env=None, stdout=subprocess.DEVNULL):
+    """
+    Run app.main:app under uvicorn on a free port; `env` adds settings
+    overrides. Rate limits are off unless `env` turns them back on, as every
+    benchmark client shares one IP.
+    """
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        env=dict(os.environ, DATABASE_URL=database_url, **{"RATE_LIMIT_BACKEND": "none", **(env or {})}),
+        stdout=stdout,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError("uvicorn exited during startup")
+        try:
+            if httpx.get(base_url + "/").status_code == 200:
+                return server, base_url
+        except httpx.TransportError:
+            time.sleep(0.1)
+    server.terminate()
+    raise RuntimeError("uvicorn did not start within 30s")
+
+
+def compare(results, baseline, threshold):
+    """Print the per-route diff against a baseline; return the regressed routes."""
+    regressions = []
+    print(f"\n{'route':<8} {'rps':>16} {'p50 ms':>18} {'p99 ms':>18}")
+    for route in ROUTES:
+        now, then = results[route], baseline["routes"].get(route)
+        if then is None:
+            continue
+        failed = (
+            now["errors"] > 0
+            or now["rps"] < then["rps"] * (1 - threshold)
+            or now["p50_ms"] > then["p50_ms"] * (1 + threshold)
+            or now["p99_ms"] > then["p99_ms"] * (1 + threshold)
+        )
+        if failed:
+            regressions.append(route)
+        print(
+            f"{route:<8} {then['rps']:7.1f} -> {now['rps']:7.1f} "
+            f"{then['p50_ms']:8.2f} -> {now['p50_ms']:7.2f} "
+            f"{then['p99_ms']:8.2f} -> {now['p99_ms']:7.2f}  {'REGRESSED' if failed else 'ok'}"
+        )
+    return regressions
+
+
+def main():
+    args = parse_args()
+    database = "mysql" if args.database_url and args.database_url.startswith("mysql") else "sqlite"
+    if args.database_url is None:
+        args.database_url = f"sqlite:///{tempfile.mkdtemp()}/bench.db"
+    os.environ["DATABASE_URL"] = args.database_url
+
+    from sqlalchemy import create_engine
+
+    from app.database.schema import create_schema
+
+    create_schema(create_engine(args.database_url))
+
+    config = {
+        "concurrency": args.concurrency,
+        "requests": args.requests,
+        "auth_requests": args.auth_requests,
+        "users": args.users,
+        "seed_todos": args.seed_todos,
+        "database": database,
+    }
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        mismatched = [key for key in COMPARABLE if baseline["config"].get(key) != config[key]]
+        if mismatched:
+            print(f"baseline was recorded with different {', '.join(mismatched)}; rerun with its settings")
+            return 2
+
+    server, base_url = start_server(args.database_url)
+    try:
+        results = asyncio.run(run(args, base_url))
+    finally:
+        server.terminate()
+        server.wait()
+
+    print(f"{args.concurrency} concurrent clients against {database}\n")
+    print(f"{'route':<8} {'requests':>8} {'errors':>6} {'rps':>8} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for route in ROUTES:
+        r = results[route]
+        print(
+            f"{route:<8} {r['requests']:8d} {r['errors']:6d} {r['rps']:8.1f} "
+            f"{r['p50_ms']:8.2f} {r['p90_ms']:8.2f} {r['p99_ms']:8.2f} {r['max_ms']:8.2f}"
+        )
+
+    if args.write_baseline:
+        os.makedirs(os.path.dirname(args.write_baseline) or ".", exist_ok=True)
+        with open(args.write_baseline, "w") as f:
+            json.dump(
+                {"config": config, "machine": machine(), "routes": results}, f, indent=2
+            )
+            f.write("\n")
+        print(f"\nbaseline written to {args.write_baseline}")
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\nregressed beyond {args.threshold:.0%}: {', '.join(regressions)}")
+            return 1
+        print(f"\nno route regressed beyond {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
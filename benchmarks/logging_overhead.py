@@ -0,0 +1,103 @@
+"""
+Measure what request logging costs in throughput.
+
+Usage:
+    python -m benchmarks.logging_overhead --requests 1000 --concurrency 16
+
+Runs the app under uvicorn three times against fresh SQLite files, with stdout
+going to a real file:
+
+    inline   every SQL statement and per-request DEBUG line written from the
+             request thread (what print() and echo=True used to do)
+    queued   the same lines, handed to the background QueueListener
+    default  the shipped settings: INFO level, SQL echo off, queued
+
+and reports requests per second for create, list and get in each mode.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+
+import httpx
+
+from benchmarks.endpoints import drive, start_server
+
+MODES = {
+    "inline": {"SQL_ECHO": "true", "LOG_LEVEL": "DEBUG", "LOG_QUEUE": "false"},
+    "queued": {"SQL_ECHO": "true", "LOG_LEVEL": "DEBUG", "LOG_QUEUE": "true"},
+    "default": {},
+}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--concurrency", type=int, default=16, help="Requests in flight")
+    parser.add_argument("--requests", type=int, default=1000, help="Requests per route and mode")
+    return parser.parse_args()
+
+
+async def run(args, base_url):
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        credentials = {"name": "bench", "email": "bench@example.com", "password": "bench-password"}
+        await client.post("/auth/signup", json=credentials)
+        token = (
+            await client.post(
+                "/auth/login", data={"username": credentials["email"], "password": credentials["password"]}
+            )
+        ).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        created = [None] * args.requests
+
+        async def create(i):
+            response = await client.post("/todos/", json={"title": f"todo {i}"}, headers=headers)
+            created[i] = response.json().get("id")
+            return response
+
+        def list_todos(i):
+            return client.get("/todos/", params={"limit": 20}, headers=headers)
+
+        def get(i):
+            return client.get(f"/todos/{created[i]}", headers=headers)
+
+        return {
+            "create": await drive(client, args.requests, args.concurrency, create, 201),
+            "list": await drive(client, args.requests, args.concurrency, list_todos, 200),
+            "get": await drive(client, args.requests, args.concurrency, get, 200),
+        }
+
+
+def main():
+    args = parse_args()
+    # The app reads its configuration at import time
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+
+    from sqlalchemy import create_engine
+
+    from app.database.schema import create_schema
+
+    print(f"{args.requests} requests per route, {args.concurrency} concurrent clients\n")
+    print(f"{'mode':<8} {'create rps':>11} {'list rps':>10} {'get rps':>9} {'log MB':>8}")
+    for mode, env in MODES.items():
+        workdir = tempfile.mkdtemp()
+        database_url = f"sqlite:///{workdir}/bench.db"
+        create_schema(create_engine(database_url))
+        log_path = os.path.join(workdir, "stdout.log")
+        with open(log_path, "w") as log:
+            server, base_url = start_server(database_url, env=env, stdout=log)
+            try:
+                results = asyncio.run(run(args, base_url))
+            finally:
+                server.terminate()
+                server.wait()
+        print(
+            f"{mode:<8} {results['create']['rps']:11.1f} {results['list']['rps']:10.1f} "
+            f"{results['get']['rps']:9.1f} {os.path.getsize(log_path) / 1e6:8.1f}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
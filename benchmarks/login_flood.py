@@ -0,0 +1,167 @@
+"""
+Check that a login flood does not take /todos down with it.
+
+Usage:
+    python -m benchmarks.login_flood
+    python -m benchmarks.login_flood --flood 128 --seconds 10 --p99-budget-ms 1000
+    python -m benchmarks.login_flood --db-mode async
+
+Runs the app under uvicorn against fresh SQLite files in three modes:
+
+    unprotected  ADMISSION_LIMITS and rate limits off
+    admission    the default ADMISSION_LIMITS, rate limits off
+    default      the shipped settings (admission and per-IP rate limits)
+
+In each, GET /todos/ is first timed alone, then again while --flood clients
+send wrong-password logins as fast as they are answered. Reports the list
+latency percentiles and how the logins were answered, and exits 1 when in
+"admission" mode a list request fails or the list p99 under the flood
+exceeds --p99-budget-ms.
+
+The default --db-mode sync (DB_ASYNC_MODE=false) is where an unprotected
+flood holds every pooled connection while waiting for bcrypt, so the lists
+time out; in async mode the flood mostly competes for CPU.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+
+import httpx
+
+from benchmarks.endpoints import start_server, summarize
+
+MODES = {
+    "unprotected": {"ADMISSION_LIMITS": "", "RATE_LIMIT_BACKEND": "none"},
+    "admission": {"RATE_LIMIT_BACKEND": "none"},
+    "default": {"RATE_LIMIT_BACKEND": "memory"},
+}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--flood", type=int, default=96, help="Concurrent login clients")
+    parser.add_argument("--concurrency", type=int, default=4, help="Concurrent /todos clients")
+    parser.add_argument("--seconds", type=float, default=8, help="Duration of each phase")
+    parser.add_argument("--db-mode", choices=("sync", "async"), default="sync", help="DB_ASYNC_MODE of the app")
+    parser.add_argument(
+        "--p99-budget-ms", type=float, default=2000, help="Allowed list p99 under the flood in admission mode"
+    )
+    return parser.parse_args()
+
+
+async def timed_lists(client, headers, concurrency, seconds):
+    latencies = []
+    errors = 0
+    deadline = time.perf_counter() + seconds
+
+    async def worker():
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                response = await client.get("/todos/", params={"limit": 20}, headers=headers)
+                if response.status_code != 200:
+                    errors += 1
+            except httpx.TransportError:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - start)
+
+
+async def flood_logins(client, clients, stop, statuses):
+    async def worker():
+        while not stop.is_set():
+            try:
+                response = await client.post(
+                    "/auth/login", data={"username": "bench@example.com", "password": "wrong-password"}
+                )
+                statuses[response.status_code] += 1
+            except httpx.TransportError:
+                # Timeouts, and keep-alive connections closed under load
+                statuses["error"] += 1
+
+    await asyncio.gather(*(worker() for _ in range(clients)))
+
+
+async def run(args, base_url):
+    timeout = httpx.Timeout(60)
+    # Separate clients, so the flood cannot starve the lists of HTTP connections
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout) as client, httpx.AsyncClient(
+        base_url=base_url, timeout=timeout, limits=httpx.Limits(max_connections=args.flood)
+    ) as attacker:
+        credentials = {"name": "bench", "email": "bench@example.com", "password": "bench-password"}
+        await client.post("/auth/signup", json=credentials)
+        token = (
+            await client.post(
+                "/auth/login", data={"username": credentials["email"], "password": credentials["password"]}
+            )
+        ).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        await client.post(
+            "/todos/bulk", json={"items": [{"title": f"todo {i}"} for i in range(100)]}, headers=headers
+        )
+
+        quiet = await timed_lists(client, headers, args.concurrency, args.seconds)
+        stop = asyncio.Event()
+        statuses = Counter()
+        flood = asyncio.create_task(flood_logins(attacker, args.flood, stop, statuses))
+        # Let the flood fill the queues before timing
+        await asyncio.sleep(1)
+        flooded = await timed_lists(client, headers, args.concurrency, args.seconds)
+        stop.set()
+        await flood
+        return quiet, flooded, statuses
+
+
+def main():
+    args = parse_args()
+    # The app reads its configuration at import time
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+
+    from sqlalchemy import create_engine
+
+    from app.database.schema import create_schema
+
+    print(
+        f"{args.flood} login clients flooding, {args.concurrency} /todos clients, "
+        f"{args.seconds:g}s phases, {args.db_mode} database access\n"
+    )
+    print(
+        f"{'mode':<12} {'quiet p50':>9} {'quiet p99':>9} {'flood p50':>9} {'flood p99':>9} "
+        f"{'list err':>8}  logins answered"
+    )
+    failed = []
+    for mode, env in MODES.items():
+        database_url = f"sqlite:///{tempfile.mkdtemp()}/bench.db"
+        create_schema(create_engine(database_url))
+        env = dict(env, DB_ASYNC_MODE=str(args.db_mode == "async").lower())
+        server, base_url = start_server(database_url, env=env)
+        try:
+            quiet, flooded, statuses = asyncio.run(run(args, base_url))
+        finally:
+            server.terminate()
+            server.wait()
+        answered = ", ".join(f"{status}: {n}" for status, n in sorted(statuses.items(), key=str))
+        print(
+            f"{mode:<12} {quiet['p50_ms']:9.1f} {quiet['p99_ms']:9.1f} {flooded['p50_ms']:9.1f} "
+            f"{flooded['p99_ms']:9.1f} {flooded['errors']:8d}  {answered}"
+        )
+        if mode == "admission" and (flooded["errors"] or flooded["p99_ms"] > args.p99_budget_ms):
+            failed.append(mode)
+
+    if failed:
+        print(f"\nwith admission control, /todos failed or its p99 exceeded {args.p99_budget_ms:g} ms")
+        return 1
+    print(f"\nwith admission control, /todos p99 stayed within {args.p99_budget_ms:g} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
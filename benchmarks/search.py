@@ -0,0 +1,122 @@
+"""
+Compare GET /todos/search (FULLTEXT / FTS5) with a naive LIKE '%q%' scan.
+
+Usage:
+    python -m benchmarks.search --rows 1000000
+    python -m benchmarks.search --rows 1000000 --database-url mysql+pymysql://user:pw@localhost/bench
+
+Seeds --rows todos spread over --users users with words drawn from a skewed
+vocabulary, then times TodoService.search_todos against the LIKE scan for a
+rare, a mid-frequency and a common term, for one user's first page.
+"""
+import argparse
+import itertools
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=100000, help="Todos to seed")
+    parser.add_argument("--users", type=int, default=10, help="Users the todos are spread over")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per query; the median is reported")
+    parser.add_argument(
+        "--database-url",
+        default=None,
+        help="Database to run against (default: a fresh SQLite file)",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.database_url is None:
+        args.database_url = f"sqlite:///{tempfile.mkdtemp()}/bench.db"
+    # The app reads its configuration at import time
+    os.environ["DATABASE_URL"] = args.database_url
+
+    from sqlalchemy import insert, or_, select
+
+    from app.database import models
+    from app.database.connection import SessionLocal, async_engine, engine
+    from app.services.todo_service import TodoService
+
+    for sync_engine in (engine, async_engine.sync_engine):
+        sync_engine.echo = False
+    models.Base.metadata.create_all(engine)
+
+    rng = random.Random(0)
+    vocabulary = [
+        "".join(rng.choice("bcdfghjklmnprstvz") + rng.choice("aeiou") for _ in range(3))
+        for _ in range(5000)
+    ]
+    # Zipf-like: a handful of words are everywhere, most are rare
+    cum_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(vocabulary))))
+
+    def words(count):
+        return " ".join(rng.choices(vocabulary, cum_weights=cum_weights, k=count))
+
+    start = time.perf_counter()
+    with engine.begin() as connection:
+        user_ids = [
+            connection.execute(
+                insert(models.User).values(
+                    name="bench", email=f"search-{time.time_ns()}-{i}@example.com", password_hash="-"
+                )
+            ).inserted_primary_key[0]
+            for i in range(args.users)
+        ]
+        for offset in range(0, args.rows, 10000):
+            connection.execute(
+                insert(models.Todo),
+                [
+                    {"title": words(4), "description": words(12), "user_id": user_ids[i % args.users]}
+                    for i in range(offset, min(offset + 10000, args.rows))
+                ],
+            )
+    print(f"seeded {args.rows} todos in {time.perf_counter() - start:.1f}s against {engine.url.render_as_string()}\n")
+
+    user_id = user_ids[0]
+    terms = {"rare": vocabulary[-1], "mid": vocabulary[200], "common": vocabulary[0]}
+
+    def like_scan(db, term):
+        pattern = f"%{term}%"
+        return db.scalars(
+            select(models.Todo)
+            .where(
+                models.Todo.user_id == user_id,
+                or_(models.Todo.title.like(pattern), models.Todo.description.like(pattern)),
+            )
+            .order_by(models.Todo.id)
+            .limit(11)
+        ).all()
+
+    def fts_search(db, term):
+        return TodoService.search_todos(db, user_id, term, limit=10).todos
+
+    def median_ms(run, term):
+        timings = []
+        with SessionLocal() as db:
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                found = run(db, term)
+                timings.append(time.perf_counter() - start)
+        return statistics.median(timings) * 1000, len(found)
+
+    print(f"{'term':<8} {'search':>12} {'LIKE scan':>12} {'speedup':>9}")
+    for label, term in terms.items():
+        fts_ms, fts_found = median_ms(fts_search, term)
+        like_ms, like_found = median_ms(like_scan, term)
+        print(
+            f"{label:<8} {fts_ms:9.2f} ms {like_ms:9.2f} ms {like_ms / fts_ms:8.1f}x"
+            f"   ({fts_found} / {min(like_found, 10)} hits on page 1)"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+"""
+Microbenchmark the GET /todos/ response path for one list page.
+
+Usage:
+    python -m benchmarks.serialization --items 100
+
+Times turning --items Todo rows into response bytes the way the route used
+to (TodoListResponse validated from the rows, then FastAPI's response_model
+validation, jsonable_encoder and json.dumps) against the current path
+(TodoListResponse.construct and the precompiled orjson serializer). Both
+are also timed from a page of TodoResponse models, as served from the read
+cache. No database is involved.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--items", type=int, default=100, help="Todos on the page")
+    parser.add_argument("--repeat", type=int, default=200, help="Pages encoded per timing run")
+    parser.add_argument("--runs", type=int, default=5, help="Timing runs; the median is reported")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    # The app reads its configuration at import time
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+
+    from fastapi.responses import JSONResponse
+    from fastapi.routing import serialize_response
+
+    from app.database.models import Todo, TodoStatus
+    from app.main import app
+    from app.schemas.todo_schema import TodoListResponse, TodoResponse
+    from app.utils.serializers import dump_todo_page
+
+    route = next(r for r in app.routes if getattr(r, "path", None) == "/todos/" and "GET" in r.methods)
+    field = route.secure_cloned_response_field
+    created = datetime(2024, 1, 1)
+    rows = [
+        Todo(
+            id=i,
+            title=f"todo {i}",
+            description="x" * 40 if i % 2 else None,
+            status=TodoStatus.COMPLETED if i % 3 else TodoStatus.PENDING,
+            user_id=1,
+            created_at=created + timedelta(seconds=i, microseconds=i),
+            version=1,
+        )
+        for i in range(args.items)
+    ]
+    cached = [TodoResponse.from_orm(row) for row in rows]
+    page = dict(total=10000, skip=0, limit=args.items, next_cursor="opaque-cursor")
+
+    async def before(todos):
+        content = TodoListResponse(todos=todos, **page)
+        encoded = await serialize_response(field=field, response_content=content, is_coroutine=True)
+        return JSONResponse(encoded).body
+
+    async def after(todos):
+        return dump_todo_page(TodoListResponse.construct(todos=todos, **page))
+
+    async def timed(encode, todos):
+        # Same bytes either way (modulo whitespace), or the comparison is meaningless
+        assert json.loads(await before(todos)) == json.loads(await encode(todos))
+        timings = []
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                await encode(todos)
+            timings.append((time.perf_counter() - start) / args.repeat)
+        return statistics.median(timings) * 1e6
+
+    async def run():
+        print(f"{args.items}-item TodoListResponse page, median of {args.runs} x {args.repeat}\n")
+        print(f"{'source':<12} {'before us':>10} {'after us':>10} {'speedup':>8}")
+        for label, todos in (("ORM rows", rows), ("cached", cached)):
+            before_us = await timed(before, todos)
+            after_us = await timed(after, todos)
+            print(f"{label:<12} {before_us:10.1f} {after_us:10.1f} {before_us / after_us:7.1f}x")
+
+    asyncio.run(run())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,178 @@
+"""
+Measure writes while users move between shards.
+
+Usage:
+    python -m benchmarks.sharding
+    python -m benchmarks.sharding --shards 4 --users 16 --requests 4000 --concurrency 32
+
+Creates --shards SQLite files (the first is also the DATABASE_URL
+database), runs the app under uvicorn with DATABASE_SHARD_URLS listing
+them, and sends --requests POST /todos/ followed by as many PUT
+/todos/{id} from --users users, --concurrency at a time. Meanwhile this
+process moves the users round the shards with app.services.reshard, one
+after another, until the writes are done.
+
+Requests answered 503 (a worker whose shard map had not caught up with a
+move yet) are retried after Retry-After, like a client would. Reports
+throughput and latency per phase, how many retries the moves caused and
+how long they held each user's writes. Exits 1 when a request or a move
+failed, so a run's numbers are never those of error responses. On SQLite,
+errors are writes that outwaited the busy timeout while moves held the
+files. That no write is lost is checked by tests/sharded.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import threading
+
+import httpx
+
+from benchmarks.endpoints import drive, start_server
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--shards", type=int, default=3, help="SQLite shard files")
+    parser.add_argument("--users", type=int, default=8, help="Users the writes are spread over")
+    parser.add_argument("--requests", type=int, default=2000, help="Creates, and then updates")
+    parser.add_argument("--concurrency", type=int, default=16, help="Requests in flight")
+    parser.add_argument("--refresh", type=float, default=1.0, help="SHARD_MAP_REFRESH_SECONDS of the app")
+    parser.add_argument("--db-mode", choices=("sync", "async"), default="async", help="DB_ASYNC_MODE of the app")
+    return parser.parse_args()
+
+
+async def run(args, base_url, mover):
+    async with httpx.AsyncClient(
+        base_url=base_url, timeout=httpx.Timeout(60), limits=httpx.Limits(max_connections=args.concurrency)
+    ) as client:
+        headers = []
+        for i in range(args.users):
+            credentials = {"name": "bench", "email": f"shard-{i}@example.com", "password": "bench-password"}
+            await client.post("/auth/signup", json=credentials)
+            token = (
+                await client.post(
+                    "/auth/login", data={"username": credentials["email"], "password": credentials["password"]}
+                )
+            ).json()["access_token"]
+            headers.append({"Authorization": f"Bearer {token}"})
+
+        retries = 0
+
+        async def send(method, url, i, **kwargs):
+            nonlocal retries
+            while True:
+                response = await client.request(method, url, headers=headers[i % args.users], **kwargs)
+                if response.status_code != 503:
+                    return response
+                retries += 1
+                await asyncio.sleep(float(response.headers.get("retry-after", 1)))
+
+        created = {}
+
+        async def create(i):
+            response = await send("POST", "/todos/", i, json={"title": f"todo {i}"})
+            if response.status_code == 201:
+                created[i] = response.json()["id"]
+            return response
+
+        async def update(i):
+            return await send("PUT", f"/todos/{created[i]}", i, json={"status": "completed"})
+
+        mover.start()
+        results = {"create": await drive(client, args.requests, args.concurrency, create, 201)}
+        results["create"]["retries"], retries = retries, 0
+        updated = sorted(created)
+        results["update"] = await drive(client, len(updated), args.concurrency, lambda n: update(updated[n]), 200)
+        results["update"]["retries"] = retries
+        mover.stop()
+        return results
+
+
+class Mover:
+    """Moves the users round the shards, one at a time, in a thread until stop()."""
+
+    def __init__(self, user_ids):
+        self.user_ids = user_ids
+        self.reports = []
+        self.failures = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        from app.database.connection import shard_engines, shard_map
+        from app.services import reshard
+
+        shards = list(shard_engines)
+        while not self._stop.is_set():
+            for user_id in self.user_ids:
+                if self._stop.is_set():
+                    return
+                current = shards.index(shard_map.shard_for(user_id))
+                try:
+                    self.reports.append(reshard.move_user(user_id, shards[(current + 1) % len(shards)]))
+                except Exception as e:
+                    self.failures.append(f"user {user_id}: {e!r}")
+
+
+def main():
+    args = parse_args()
+    directory = tempfile.mkdtemp()
+    shard_urls = [f"sqlite:///{directory}/shard-{i}.db" for i in range(args.shards)]
+    # The app reads its configuration at import time; this process runs the moves
+    os.environ["DATABASE_URL"] = shard_urls[0]
+    os.environ["DATABASE_SHARD_URLS"] = ",".join(shard_urls)
+    os.environ["SHARD_MAP_REFRESH_SECONDS"] = str(args.refresh)
+
+    from app.database.connection import shard_engines
+    from app.database.schema import create_schema
+
+    for shard_engine in shard_engines.values():
+        create_schema(shard_engine)
+
+    env = {"DB_ASYNC_MODE": str(args.db_mode == "async").lower()}
+    server, base_url = start_server(shard_urls[0], env=env)
+    try:
+        # Signed up by run(), so user ids are 1..--users
+        mover = Mover(list(range(1, args.users + 1)))
+        results = asyncio.run(run(args, base_url, mover))
+    finally:
+        server.terminate()
+        server.wait()
+
+    print(
+        f"{args.requests} creates then updates, {args.concurrency} in flight, {args.users} users "
+        f"on {args.shards} shards, {args.db_mode} database access\n"
+    )
+    print(f"{'route':<7} {'rps':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7} {'retries':>8}")
+    for route, summary in results.items():
+        print(
+            f"{route:<7} {summary['rps']:8.1f} {summary['p50_ms']:8.1f} "
+            f"{summary['p99_ms']:8.1f} {summary['errors']:7d} {summary['retries']:8d}"
+        )
+    held = sorted(report["writes_held_seconds"] * 1000 for report in mover.reports)
+    if held:
+        print(
+            f"\n{len(held)} moves; writes held median {statistics.median(held):.1f} ms, "
+            f"max {held[-1]:.1f} ms"
+        )
+
+    if mover.failures:
+        print("\n" + "\n".join(mover.failures[:20]))
+    errors = sum(summary["errors"] for summary in results.values())
+    if errors:
+        print(f"\n{errors} requests failed")
+    return 1 if errors or mover.failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
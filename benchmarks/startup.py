@@ -0,0 +1,112 @@
+"""
+Check cold-start time against a budget, for autoscaling.
+
+Usage:
+    python -m benchmarks.startup
+    python -m benchmarks.startup --import-budget 1.5 --ready-budget 3 --runs 5
+    python -m benchmarks.startup --database-url mysql+pymysql://user:pw@localhost/bench
+
+Measures, in fresh interpreters, how long `import app.main` takes, and how
+long a new uvicorn worker takes from spawn until GET /health/ready answers
+200 (schema check, pool prewarm and auth warm-up included). Reports the
+median of --runs and exits 1 when either exceeds its budget.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.endpoints import free_port
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5, help="Cold starts measured; the median is compared")
+    parser.add_argument("--import-budget", type=float, default=2.0, help="Seconds allowed for import app.main")
+    parser.add_argument("--ready-budget", type=float, default=4.0, help="Seconds allowed from spawn to ready")
+    parser.add_argument(
+        "--database-url",
+        default=None,
+        help="Database to run against (default: a fresh SQLite file)",
+    )
+    return parser.parse_args()
+
+
+def import_seconds(env):
+    code = "import time; start = time.perf_counter(); import app.main; print(time.perf_counter() - start)"
+    output = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True)
+    return float(output.stdout.strip().splitlines()[-1])
+
+
+def ready_seconds(env):
+    port = free_port()
+    url = f"http://127.0.0.1:{port}/health/ready"
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        env=env,
+        stdout=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - start < 60:
+            if server.poll() is not None:
+                raise RuntimeError("uvicorn exited during startup")
+            try:
+                response = httpx.get(url)
+                if response.status_code == 200:
+                    return time.perf_counter() - start, response.json()
+            except httpx.TransportError:
+                pass
+            time.sleep(0.01)
+        raise RuntimeError("not ready within 60s")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    args = parse_args()
+    if args.database_url is None:
+        args.database_url = f"sqlite:///{tempfile.mkdtemp()}/bench.db"
+    os.environ["DATABASE_URL"] = args.database_url
+
+    from sqlalchemy import create_engine
+
+    from app.database.schema import create_schema
+
+    create_schema(create_engine(args.database_url))
+    env = dict(os.environ)
+
+    imports, readies = [], []
+    for _ in range(args.runs):
+        imports.append(import_seconds(env))
+        elapsed, report = ready_seconds(env)
+        readies.append(elapsed)
+
+    import_median, ready_median = statistics.median(imports), statistics.median(readies)
+    print(f"{args.runs} cold starts against {args.database_url.split(':')[0]}\n")
+    print(f"{'phase':<24} {'median s':>9} {'max s':>7} {'budget s':>9}")
+    print(f"{'import app.main':<24} {import_median:9.3f} {max(imports):7.3f} {args.import_budget:9.2f}")
+    print(f"{'spawn to /health/ready':<24} {ready_median:9.3f} {max(readies):7.3f} {args.ready_budget:9.2f}")
+    print(f"\nlast startup hooks: {report['startup_seconds']:.3f}s, "
+          f"{report['prewarmed_connections']} connections prewarmed, schema {report['schema_revision']}")
+
+    over = []
+    if import_median > args.import_budget:
+        over.append("import")
+    if ready_median > args.ready_budget:
+        over.append("ready")
+    if over:
+        print(f"\nover budget: {', '.join(over)}")
+        return 1
+    print("\nwithin budget")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
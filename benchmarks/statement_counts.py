@@ -0,0 +1,211 @@
+"""
+Count the SQL statements every TodoService method issues and check them
+against a stored baseline.
+
+Usage:
+    python -m benchmarks.statement_counts
+    python -m benchmarks.statement_counts --write-baseline benchmarks/baselines/statements-sqlite.json
+    python -m benchmarks.statement_counts --database-url mysql+pymysql://user:pw@localhost/bench --baseline none
+
+Calls each TodoService and AsyncTodoService method once per case against a
+fresh SQLite file (or --database-url) and counts the statements sent to
+the database (cursor executes; COMMIT and ROLLBACK are counted apart).
+Exits 1 when any count differs from the baseline, which defaults to
+benchmarks/baselines/statements-<database>.json: an added round trip is a
+regression, and a removed one should be recorded with --write-baseline.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+BASELINE_DIR = os.path.join(os.path.dirname(__file__), "baselines")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--database-url",
+        default=None,
+        help="Database to run against (default: a fresh SQLite file)",
+    )
+    parser.add_argument(
+        "--baseline",
+        default=None,
+        help="Baseline JSON to compare against (default: baselines/statements-<database>.json; 'none' skips)",
+    )
+    parser.add_argument("--write-baseline", default=None, help="Save these counts as a baseline JSON")
+    return parser.parse_args()
+
+
+class StatementCounter:
+    """Statements, commits and rollbacks seen on a set of sync engines since the last reset()."""
+
+    def __init__(self, engines):
+        from sqlalchemy import event
+
+        self.reset()
+        for engine in engines:
+            event.listen(engine, "before_cursor_execute", self._statement)
+            event.listen(engine, "commit", self._commit)
+            event.listen(engine, "rollback", self._rollback)
+
+    def reset(self):
+        self.statements, self.commits, self.rollbacks = [], 0, 0
+
+    def _statement(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(" ".join(statement.split())[:100])
+
+    def _commit(self, conn):
+        self.commits += 1
+
+    def _rollback(self, conn):
+        self.rollbacks += 1
+
+    def counts(self):
+        return {"statements": len(self.statements), "commits": self.commits, "rollbacks": self.rollbacks}
+
+
+def main():
+    args = parse_args()
+    database = "mysql" if args.database_url and args.database_url.startswith("mysql") else "sqlite"
+    if args.database_url is None:
+        args.database_url = f"sqlite:///{tempfile.mkdtemp()}/bench.db"
+    # The app reads its configuration at import time
+    os.environ["DATABASE_URL"] = args.database_url
+
+    from sqlalchemy import insert
+
+    from app.database import models
+    from app.database.connection import AsyncSessionLocal, SessionLocal, async_engine, engine
+    from app.database.schema import create_schema
+    from app.schemas.todo_schema import CountMode, TodoBulkUpdateItem, TodoCreate, TodoUpdate
+    from app.services.todo_service import AsyncTodoService, TodoService
+
+    create_schema(engine)
+    with engine.begin() as connection:
+        user_id = connection.execute(
+            insert(models.User).values(name="bench", email=f"statements-{time.time_ns()}@example.com", password_hash="-")
+        ).inserted_primary_key[0]
+
+    def new_todos(n=1):
+        with SessionLocal() as db:
+            return [TodoService.create_todo(db, TodoCreate(title=f"todo {i}"), user_id).id for i in range(n)]
+
+    def sync_token():
+        with SessionLocal() as db:
+            return TodoService.get_changes(db, user_id, limit=1000).next_token
+
+    # name -> (method, arguments besides db and user_id, built right before the call)
+    cases = {
+        "create_todo": ("create_todo", lambda: {"todo": TodoCreate(title="new")}),
+        "get_todo_by_id": ("get_todo_by_id", lambda: {"todo_id": new_todos()[0]}),
+        "get_todo_version": ("get_todo_version", lambda: {"todo_id": new_todos()[0]}),
+        "get_list_version": ("get_list_version", lambda: {}),
+        "get_user_todos": ("get_user_todos", lambda: {}),
+        "get_user_todos count=none": ("get_user_todos", lambda: {"count": CountMode.NONE}),
+        "get_user_todos created_after": (
+            "get_user_todos",
+            lambda: {"created_after": datetime.utcnow() - timedelta(days=1)},
+        ),
+        "get_user_todos include_archived": ("get_user_todos", lambda: {"include_archived": True}),
+        "search_todos": ("search_todos", lambda: {"q": "todo"}),
+        "get_stats": ("get_stats", lambda: {}),
+        "get_changes": ("get_changes", lambda: {"since": sync_token()}),
+        "update_todo title": (
+            "update_todo",
+            lambda: {"todo_id": new_todos()[0], "todo_update": TodoUpdate(title="renamed")},
+        ),
+        "update_todo status": (
+            "update_todo",
+            lambda: {"todo_id": new_todos()[0], "todo_update": TodoUpdate(status="completed")},
+        ),
+        "update_todo nothing": ("update_todo", lambda: {"todo_id": new_todos()[0], "todo_update": TodoUpdate()}),
+        "update_todo missing": ("update_todo", lambda: {"todo_id": 10 ** 9, "todo_update": TodoUpdate(title="x")}),
+        "delete_todo": ("delete_todo", lambda: {"todo_id": new_todos()[0]}),
+        "delete_todo missing": ("delete_todo", lambda: {"todo_id": 10 ** 9}),
+        "bulk_create_todos 10": ("bulk_create_todos", lambda: {"todos": [TodoCreate(title="bulk")] * 10}),
+        "bulk_update_todos 10": (
+            "bulk_update_todos",
+            lambda: {"items": [TodoBulkUpdateItem(id=todo_id, status="completed") for todo_id in new_todos(10)]},
+        ),
+        "bulk_delete_todos 10": ("bulk_delete_todos", lambda: {"todo_ids": new_todos(10)}),
+        "commit_writes 2 creates 2 updates": (
+            "commit_writes",
+            lambda: {
+                "writes": [("create_todo", {"todo": TodoCreate(title="batched"), "user_id": user_id})] * 2
+                + [
+                    ("update_todo", {"todo_id": todo_id, "todo_update": TodoUpdate(title="b"), "user_id": user_id})
+                    for todo_id in new_todos(2)
+                ]
+            },
+        ),
+    }
+    # These take no user_id
+    no_user = {"commit_writes"}
+
+    new_todos(20)
+    counter = StatementCounter([engine, async_engine.sync_engine])
+
+    def arguments(method, build):
+        kwargs = build()
+        if method not in no_user:
+            kwargs["user_id"] = user_id
+        return kwargs
+
+    results = {"sync": {}, "async": {}}
+    for name, (method, build) in cases.items():
+        kwargs = arguments(method, build)
+        with SessionLocal() as db:
+            counter.reset()
+            getattr(TodoService, method)(db, **kwargs)
+            results["sync"][name] = counter.counts()
+
+    async def run_async():
+        for name, (method, build) in cases.items():
+            kwargs = arguments(method, build)
+            async with AsyncSessionLocal() as db:
+                counter.reset()
+                await getattr(AsyncTodoService, method)(db, **kwargs)
+                results["async"][name] = counter.counts()
+
+    asyncio.run(run_async())
+
+    baseline_path = args.baseline or os.path.join(BASELINE_DIR, f"statements-{database}.json")
+    baseline = None
+    if baseline_path != "none" and os.path.exists(baseline_path):
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+
+    mismatches = []
+    print(f"{'case':<36} {'sync':>14} {'async':>14}   (statements/commits/rollbacks)")
+    for name in cases:
+        cells = []
+        for mode in ("sync", "async"):
+            now = results[mode][name]
+            cell = f"{now['statements']}/{now['commits']}/{now['rollbacks']}"
+            then = baseline and baseline["counts"][mode].get(name)
+            if then is not None and then != now:
+                cell += f" (was {then['statements']}/{then['commits']}/{then['rollbacks']})"
+                mismatches.append(f"{mode} {name}")
+            cells.append(cell)
+        print(f"{name:<36} {cells[0]:>14} {cells[1]:>14}")
+
+    if args.write_baseline:
+        os.makedirs(os.path.dirname(args.write_baseline) or ".", exist_ok=True)
+        with open(args.write_baseline, "w") as f:
+            json.dump({"database": database, "counts": results}, f, indent=2)
+            f.write("\n")
+        print(f"\nbaseline written to {args.write_baseline}")
+    elif mismatches:
+        print(f"\nstatement counts differ from {baseline_path}: {', '.join(mismatches)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,163 @@
+"""
+Compare reading todo counts from todo_stats with counting todos rows.
+
+Usage:
+    python -m benchmarks.todo_stats --rows 100000 --days 365
+    python -m benchmarks.todo_stats --database-url mysql+pymysql://user:pw@localhost/bench
+
+Seeds --rows todos for one user (and as many for a second user), spread
+over --days creation days, and builds their todo_stats with the repair
+job. Times, per method, the total of GET /todos/ (with and without a
+status filter) and the per status and day breakdown of GET /todos/stats,
+then what keeping the counters costs a single create and status update.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=100000, help="Todos of the measured user")
+    parser.add_argument("--days", type=int, default=365, help="Creation days the todos are spread over")
+    parser.add_argument("--repeat", type=int, default=20, help="Runs per method; the median is reported")
+    parser.add_argument(
+        "--database-url",
+        default=None,
+        help="Database to run against (default: a fresh SQLite file)",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.database_url is None:
+        args.database_url = f"sqlite:///{tempfile.mkdtemp()}/bench.db"
+    # The app reads its configuration at import time
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ["DB_ASYNC_MODE"] = "false"
+
+    import asyncio
+
+    from sqlalchemy import func, insert, select
+
+    from app.database import models
+    from app.database.connection import SessionLocal, engine
+    from app.database.schema import create_schema
+    from app.schemas.todo_schema import CountMode, TodoCreate, TodoUpdate
+    from app.services.todo_service import TodoService
+    from app.services.todo_stats import todo_stats_repairer
+
+    create_schema(engine)
+
+    start = time.perf_counter()
+    first_day = datetime(2025, 1, 1)
+    statuses = list(models.TodoStatus)
+    with engine.begin() as connection:
+        user_ids = [
+            connection.execute(
+                insert(models.User).values(
+                    name="bench", email=f"stats-{time.time_ns()}-{i}@example.com", password_hash="-"
+                )
+            ).inserted_primary_key[0]
+            for i in range(2)
+        ]
+        for offset in range(0, args.rows * 2, 10000):
+            connection.execute(
+                insert(models.Todo),
+                [
+                    {
+                        "title": f"todo {i}",
+                        "user_id": user_ids[i % 2],
+                        "status": statuses[i // 2 % 3 == 0],
+                        "created_at": first_day + timedelta(days=i // 2 % args.days, seconds=i),
+                    }
+                    for i in range(offset, min(offset + 10000, args.rows * 2))
+                ],
+            )
+    # Seeded behind TodoService's back, so the repair job builds the counters
+    report = asyncio.run(todo_stats_repairer.run())
+    print(
+        f"seeded {args.rows * 2} todos and {report['counters_drifted']} counters in "
+        f"{time.perf_counter() - start:.1f}s against {engine.url.render_as_string()}\n"
+    )
+
+    user_id = user_ids[0]
+    day = func.date(models.Todo.created_at)
+    methods = [
+        (
+            "total",
+            "COUNT(*) todos",
+            lambda db: db.scalar(select(func.count()).where(models.Todo.user_id == user_id)),
+        ),
+        (
+            "total",
+            "todo_stats",
+            lambda db: TodoService.get_user_todos(db, user_id, limit=10, count=CountMode.EXACT).total,
+        ),
+        (
+            "completed total",
+            "COUNT(*) todos",
+            lambda db: db.scalar(
+                select(func.count()).where(
+                    models.Todo.user_id == user_id, models.Todo.status == models.TodoStatus.COMPLETED
+                )
+            ),
+        ),
+        (
+            "completed total",
+            "todo_stats",
+            lambda db: TodoService.get_user_todos(
+                db, user_id, limit=10, status=models.TodoStatus.COMPLETED, count=CountMode.EXACT
+            ).total,
+        ),
+        (
+            "per status and day",
+            "GROUP BY todos",
+            lambda db: len({
+                row.day
+                for row in db.execute(
+                    select(models.Todo.status, day.label("day"), func.count())
+                    .where(models.Todo.user_id == user_id)
+                    .group_by(models.Todo.status, day)
+                )
+            }),
+        ),
+        ("per status and day", "todo_stats", lambda db: len(TodoService.get_stats(db, user_id).days)),
+    ]
+
+    def median_ms(run):
+        timings = []
+        with SessionLocal() as db:
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                result = run(db)
+                timings.append(time.perf_counter() - start)
+        return statistics.median(timings) * 1000, result
+
+    print(f"{'read':<20} {'method':<16} {'median':>12} {'result':>8}")
+    for read, method, run in methods:
+        elapsed, result = median_ms(run)
+        print(f"{read:<20} {method:<16} {elapsed:9.3f} ms {result:>8}")
+
+    created = []
+
+    def create(db):
+        created.append(TodoService.create_todo(db, TodoCreate(title="new"), user_id).id)
+
+    def complete(db):
+        TodoService.update_todo(db, created.pop(), TodoUpdate(status="completed"), user_id)
+
+    print(f"\n{'write (keeps counters)':<37} {'median':>12}")
+    for name, run in (("create_todo", create), ("update_todo status", complete)):
+        elapsed, _ = median_ms(run)
+        print(f"{name:<37} {elapsed:9.3f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,131 @@
+"""
+Measure group commit of single todo writes against one commit per write.
+
+Usage:
+    python -m benchmarks.write_coalescing
+    python -m benchmarks.write_coalescing --window-ms 2 --concurrency 64 --requests 4000
+    python -m benchmarks.write_coalescing --database-url mysql+pymysql://user:pw@localhost/bench
+
+Runs the app under uvicorn with WRITE_COALESCE_WINDOW_MS=0 and then with
+--window-ms, and sends --requests POST /todos/ followed by as many PUT
+/todos/{id}, --concurrency at a time, from --users users. Reports
+throughput and latency per phase, and the batch sizes and added wait the
+coalescer reported on /debug/write-coalescer. Exits 1 when any request
+failed, so a run's numbers are never those of error responses.
+
+Commit cost decides the outcome: on a database that fsyncs every commit
+(MySQL with innodb_flush_log_at_trx_commit=1, SQLite on a real disk)
+batches pay for one fsync instead of one each.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+
+import httpx
+
+from benchmarks.endpoints import drive, start_server
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--window-ms", type=float, default=2.0, help="WRITE_COALESCE_WINDOW_MS when coalescing")
+    parser.add_argument("--max-batch", type=int, default=64, help="WRITE_COALESCE_MAX_BATCH when coalescing")
+    parser.add_argument("--requests", type=int, default=2000, help="Creates, and then updates, per run")
+    parser.add_argument("--concurrency", type=int, default=32, help="Requests in flight")
+    parser.add_argument("--users", type=int, default=8, help="Users the writes are spread over")
+    parser.add_argument("--db-mode", choices=("sync", "async"), default="async", help="DB_ASYNC_MODE of the app")
+    parser.add_argument(
+        "--database-url",
+        default=None,
+        help="Database to run against (default: a fresh SQLite file per run)",
+    )
+    return parser.parse_args()
+
+
+async def run(args, base_url):
+    async with httpx.AsyncClient(
+        base_url=base_url, timeout=httpx.Timeout(60), limits=httpx.Limits(max_connections=args.concurrency)
+    ) as client:
+        headers = []
+        for i in range(args.users):
+            credentials = {"name": "bench", "email": f"coalesce-{i}@example.com", "password": "bench-password"}
+            await client.post("/auth/signup", json=credentials)
+            token = (
+                await client.post(
+                    "/auth/login", data={"username": credentials["email"], "password": credentials["password"]}
+                )
+            ).json()["access_token"]
+            headers.append({"Authorization": f"Bearer {token}"})
+
+        # Keyed by request number, so each update goes out as the user who created the todo
+        created = {}
+
+        async def create(i):
+            response = await client.post("/todos/", json={"title": f"todo {i}"}, headers=headers[i % args.users])
+            if response.status_code == 201:
+                created[i] = response.json()["id"]
+            return response
+
+        def update(i):
+            return client.put(
+                f"/todos/{created[i]}", json={"status": "completed"}, headers=headers[i % args.users]
+            )
+
+        results = {"create": await drive(client, args.requests, args.concurrency, create, 201)}
+        updated = sorted(created)
+        results["update"] = await drive(client, len(updated), args.concurrency, lambda n: update(updated[n]), 200)
+        stats = (await client.get("/debug/write-coalescer")).json()
+        return results, stats
+
+
+def main():
+    args = parse_args()
+    # The app reads its configuration at import time
+    os.environ.setdefault("DATABASE_URL", args.database_url or f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+
+    from sqlalchemy import create_engine
+
+    from app.database.schema import create_schema
+
+    print(
+        f"{args.requests} creates then updates, {args.concurrency} in flight, {args.users} users, "
+        f"{args.db_mode} database access\n"
+    )
+    print(f"{'window':<8} {'route':<7} {'rps':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    errors = 0
+    for window in (0.0, args.window_ms):
+        database_url = args.database_url or f"sqlite:///{tempfile.mkdtemp()}/bench.db"
+        create_schema(create_engine(database_url))
+        env = {
+            "DB_ASYNC_MODE": str(args.db_mode == "async").lower(),
+            "WRITE_COALESCE_WINDOW_MS": str(window),
+            "WRITE_COALESCE_MAX_BATCH": str(args.max_batch),
+            "DEBUG_ENDPOINTS": "true",
+        }
+        server, base_url = start_server(database_url, env=env)
+        try:
+            results, stats = asyncio.run(run(args, base_url))
+        finally:
+            server.terminate()
+            server.wait()
+        for route, summary in results.items():
+            errors += summary["errors"]
+            print(
+                f"{window:<6g}ms {route:<7} {summary['rps']:8.1f} {summary['p50_ms']:8.1f} "
+                f"{summary['p99_ms']:8.1f} {summary['errors']:7d}"
+            )
+        if stats:
+            print(
+                f"{'':<8} batches: mean {stats['mean_batch_size']}, largest {stats['largest_batch']}; "
+                f"mean wait {stats['mean_wait_ms']} ms; {stats['fallbacks']} fallbacks"
+            )
+    if errors:
+        print(f"\n{errors} requests failed")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,93 @@
+import os
+import tempfile
+import uuid
+
+import pytest
+from jose import jwt
+
+# Settings and engines are built on import, so point them at scratch
+# databases before anything from app is imported
+DIRECTORY = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{DIRECTORY}/test.db"
+# tests/sharded needs its own process, with TEST_SHARDS set (see test_sharding.py)
+SHARDS = int(os.environ.get("TEST_SHARDS", "0"))
+os.environ["DATABASE_SHARD_URLS"] = ",".join(
+    [os.environ["DATABASE_URL"]] + [f"sqlite:///{DIRECTORY}/shard-{i}.db" for i in range(1, SHARDS)]
+) if SHARDS else ""
+
+# Every test signs up its own users, all from the one test client address
+os.environ["RATE_LIMITS"] = ""
+
+from fastapi.testclient import TestClient
+
+collect_ignore = [] if SHARDS else ["sharded"]
+
+@pytest.fixture(scope="session")
+def client():
+    from app.database.connection import engine, shard_engines
+    from app.database.schema import create_schema
+    for shard_engine in {engine, *shard_engines.values()}:
+        create_schema(shard_engine)
+    from app.main import app
+    with TestClient(app) as test_client:
+        yield test_client
+
+@pytest.fixture
+def call(client):
+    """Run an async function on the app's event loop, where its engines live."""
+    return client.portal.call
+
+class Account:
+    """A signed-up user: its id, credentials and Authorization header."""
+
+    def __init__(self, client: TestClient, token: str, email: str, password: str):
+        self.client = client
+        self.email = email
+        self.password = password
+        self.token = token
+
+    @property
+    def id(self) -> int:
+        return int(jwt.get_unverified_claims(self.token)["sub"])
+
+    @property
+    def headers(self) -> dict:
+        return {"Authorization": f"Bearer {self.token}"}
+
+    def login(self) -> str:
+        response = self.client.post("/auth/login", data={"username": self.email, "password": self.password})
+        assert response.status_code == 200, response.text
+        self.token = response.json()["access_token"]
+        return self.token
+
+    def request(self, method: str, url: str, expected: int = 200, **kwargs):
+        response = self.client.request(method, url, headers={**self.headers, **kwargs.pop("headers", {})}, **kwargs)
+        assert response.status_code == expected, response.text
+        return response
+
+    def create(self, title: str = "todo", **fields) -> dict:
+        return self.request("POST", "/todos/", 201, json={"title": title, **fields}).json()
+
+    def listed(self, **params) -> dict:
+        """Every todo GET /todos/ returns, by id, following the cursor."""
+        todos, cursor = {}, ""
+        while cursor is not None:
+            page = self.request("GET", "/todos/", params={"limit": 100, "cursor": cursor, **params}).json()
+            todos.update((todo["id"], todo) for todo in page["todos"])
+            cursor = page["next_cursor"]
+        return todos
+
+@pytest.fixture
+def make_account(client):
+    """Sign up fresh users, so tests never see each other's todos."""
+    def make() -> Account:
+        email = f"{uuid.uuid4().hex}@example.com"
+        password = "secret-pass"
+        response = client.post("/auth/signup", json={"name": "Test", "email": email, "password": password})
+        assert response.status_code == 201, response.text
+        return Account(client, response.json()["access_token"], email, password)
+    return make
+
+@pytest.fixture
+def account(make_account):
+    return make_account()
@@ -0,0 +1,111 @@
+import threading
+import time
+
+import pytest
+from sqlalchemy import func, select
+
+from app.database.connection import shard_engines, shard_map, shard_session
+from app.database.models import Todo, TodoTombstone
+from app.database.sharding import UserMoved
+from app.schemas.todo_schema import TodoCreate, TodoUpdate
+from app.services import reshard
+from app.services.todo_service import TodoService
+
+def next_shard(user_id: int) -> str:
+    shards = list(shard_engines)
+    return shards[(shards.index(shard_map.shard_for(user_id)) + 1) % len(shards)]
+
+def holders(user_id: int, model=Todo) -> set:
+    """The shards with rows of the user's in model's table."""
+    found = set()
+    for name, shard_engine in shard_engines.items():
+        with shard_engine.connect() as connection:
+            if connection.scalar(select(func.count()).where(model.user_id == user_id)):
+                found.add(name)
+    return found
+
+def sync(account, since):
+    page = account.request("GET", "/todos/changes", params={"since": since}).json()
+    return [todo["id"] for todo in page["todos"]], page["deleted"]
+
+def test_move_keeps_todos_stats_and_sync_position(account):
+    todos = [account.create(f"todo {i}") for i in range(5)]
+    account.request("PUT", f"/todos/{todos[0]['id']}", json={"status": "completed"})
+    token = account.request("GET", "/todos/changes").json()["next_token"]
+    account.request("DELETE", f"/todos/{todos[1]['id']}", 204)
+    account.request("PUT", f"/todos/{todos[2]['id']}", json={"title": "renamed"})
+    listed, stats = account.listed(), account.request("GET", "/todos/stats").json()
+
+    target = next_shard(account.id)
+    assert reshard.move_user(account.id, target)["moved"]
+
+    assert account.listed() == listed
+    assert account.request("GET", "/todos/stats").json() == stats
+    # Tombstones moved too: a token from before the move still sees the delete
+    assert sync(account, token) == ([todos[2]["id"]], [todos[1]["id"]])
+    assert holders(account.id) == holders(account.id, TodoTombstone) == {target}
+
+def test_write_routed_before_a_move_is_turned_away(account):
+    todo = account.create("kept")
+    source = shard_map.shard_for(account.id)
+    # A request that was routed to the source just before the move
+    with shard_session(source) as db:
+        reshard.move_user(account.id, next_shard(account.id))
+        with pytest.raises(UserMoved):
+            TodoService.create_todo(db, TodoCreate(title="lost"), account.id)
+        db.rollback()
+        with pytest.raises(UserMoved):
+            TodoService.update_todo(db, todo["id"], TodoUpdate(title="lost"), account.id)
+        db.rollback()
+        with pytest.raises(UserMoved):
+            TodoService.delete_todo(db, todo["id"], account.id)
+    assert [item["title"] for item in account.listed().values()] == ["kept"]
+
+def test_worker_with_stale_shard_map_answers_503_then_recovers(account):
+    account.create("kept")
+    source = shard_map.shard_for(account.id)
+    reshard.move_user(account.id, next_shard(account.id))
+    # This worker still routes the user by the old pin
+    shard_map.pin(account.id, source)
+
+    response = account.request("POST", "/todos/", 503, json={"title": "retried"})
+    assert response.headers["Retry-After"] == "1"
+    account.create("retried")
+    assert sorted(item["title"] for item in account.listed().values()) == ["kept", "retried"]
+
+def test_writes_while_moving_lose_nothing(account):
+    stop = threading.Event()
+    failures = []
+
+    def mover():
+        while not stop.is_set():
+            try:
+                reshard.move_user(account.id, next_shard(account.id))
+            except Exception as e:
+                failures.append(e)
+            time.sleep(0.01)
+
+    def send(method, url, expected, **kwargs):
+        for _ in range(50):
+            response = account.client.request(method, url, headers=account.headers, **kwargs)
+            if response.status_code != 503:
+                assert response.status_code == expected, response.text
+                return response.json()
+            time.sleep(0.01)
+        raise AssertionError(f"{method} {url} still 503")
+
+    thread = threading.Thread(target=mover)
+    thread.start()
+    try:
+        created = [send("POST", "/todos/", 201, json={"title": f"todo {i}"})["id"] for i in range(20)]
+        for todo_id in created[::2]:
+            send("PUT", f"/todos/{todo_id}", 200, json={"status": "completed"})
+    finally:
+        stop.set()
+        thread.join()
+
+    assert failures == []
+    listed = account.listed()
+    assert sorted(listed) == sorted(created)
+    assert [todo_id for todo_id in created if listed[todo_id]["status"] == "completed"] == created[::2]
+    assert holders(account.id) == {shard_map.shard_for(account.id)}
@@ -0,0 +1,43 @@
+from app.services.todo_archive import TodoArchiver
+from tests.test_stats import assert_stats_match
+
+def archive(call) -> dict:
+    # Everything completed so far, whenever it was last touched
+    return call(TodoArchiver(after=-60, batch_size=2, sleep_factor=0).run)
+
+def test_archived_todos_leave_the_hot_list(account, call):
+    done, kept = account.create("done"), account.create("kept")
+    account.request("PUT", f"/todos/{done['id']}", json={"status": "completed"})
+    assert archive(call)["archived"] >= 1
+
+    assert set(account.listed()) == {kept["id"]}
+    assert set(account.listed(include_archived=True)) == {done["id"], kept["id"]}
+    assert account.request("GET", f"/todos/{done['id']}").json()["status"] == "completed"
+    assert account.request("GET", "/todos/").json()["total"] == 1
+    assert_stats_match(account, call)
+
+def test_writing_an_archived_todo_restores_it(account, call):
+    done = account.create("done")
+    account.request("PUT", f"/todos/{done['id']}", json={"status": "completed"})
+    gone = account.create("gone")
+    account.request("PUT", f"/todos/{gone['id']}", json={"status": "completed"})
+    archive(call)
+
+    account.request("PUT", f"/todos/{done['id']}", json={"status": "pending"})
+    account.request("DELETE", f"/todos/{gone['id']}", 204)
+    assert set(account.listed()) == {done["id"]}
+    assert set(account.listed(include_archived=True)) == {done["id"]}
+    assert_stats_match(account, call)
+
+def test_bulk_writes_reach_archived_todos(account, call):
+    ids = [account.create(f"todo {i}")["id"] for i in range(3)]
+    account.request("PATCH", "/todos/bulk", json={"items": [{"id": todo_id, "status": "completed"} for todo_id in ids]})
+    archive(call)
+
+    response = account.request("PATCH", "/todos/bulk", json={"items": [{"id": ids[0], "title": "back"}]})
+    assert response.json()["results"][0]["status"] == "updated"
+    response = account.request("DELETE", "/todos/bulk", json={"ids": [ids[1]]})
+    assert response.json()["results"][0]["status"] == "deleted"
+    assert set(account.listed()) == {ids[0]}
+    assert set(account.listed(include_archived=True)) == {ids[0], ids[2]}
+    assert_stats_match(account, call)
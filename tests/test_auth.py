@@ -0,0 +1,52 @@
+from datetime import datetime
+
+import pytest
+from jose import jwt
+
+from app.core import token_cache
+from app.core.config import settings
+from app.core.token_cache import revocation_list
+
+def bearer(token: str) -> dict:
+    return {"Authorization": f"Bearer {token}"}
+
+def test_token_lifetime_follows_setting(account, monkeypatch):
+    monkeypatch.setattr(settings, "ACCESS_TOKEN_EXPIRE_MINUTES", 5)
+    claims = jwt.get_unverified_claims(account.login())
+    assert claims["exp"] - claims["iat"] == pytest.approx(300, abs=1)
+
+def test_revoked_token_stays_rejected_after_refresh(client, call, account, monkeypatch):
+    # Shorter than the 30 minutes tokens used to be minted with
+    monkeypatch.setattr(settings, "ACCESS_TOKEN_EXPIRE_MINUTES", 1)
+    old = account.login()
+    assert client.get("/todos/", headers=bearer(old)).status_code == 200
+    assert client.post("/auth/logout", headers=bearer(old)).status_code == 204
+
+    call(revocation_list.refresh)
+    assert client.get("/todos/", headers=bearer(old)).status_code == 401
+    assert client.get("/todos/", headers=bearer(account.login())).status_code == 200
+
+def test_revocation_outlives_revoked_token(client, call, account, monkeypatch):
+    monkeypatch.setattr(settings, "ACCESS_TOKEN_EXPIRE_MINUTES", 1)
+    old = account.login()
+    assert client.post("/auth/logout", headers=bearer(old)).status_code == 204
+    claims = jwt.get_unverified_claims(old)
+
+    class LastSecond(datetime):
+        # A refresh running just before the revoked token expires
+        @classmethod
+        def utcnow(cls):
+            return datetime.utcfromtimestamp(claims["exp"] - 1)
+
+    monkeypatch.setattr(token_cache, "datetime", LastSecond)
+    call(revocation_list.refresh)
+    assert revocation_list.is_revoked(account.id, claims["iat"])
+
+def test_deactivated_user_is_rejected_after_refresh(client, call, account):
+    token = account.token
+    assert client.post("/auth/deactivate", headers=bearer(token)).status_code == 204
+
+    call(revocation_list.refresh)
+    assert client.get("/todos/", headers=bearer(token)).status_code == 401
+    response = client.post("/auth/login", data={"username": account.email, "password": account.password})
+    assert response.status_code == 401
@@ -0,0 +1,43 @@
+from app.core.config import settings
+
+def statuses(response) -> list:
+    return [(result["id"], result["status"]) for result in response.json()["results"]]
+
+def test_bulk_create(account):
+    response = account.request("POST", "/todos/bulk", 201, json={"items": [{"title": "a"}, {"title": "b"}]})
+    results = response.json()["results"]
+    assert [result["status"] for result in results] == ["created", "created"]
+    assert [result["todo"]["title"] for result in results] == ["a", "b"]
+    assert set(account.listed()) == {result["id"] for result in results}
+
+def test_bulk_update_applies_the_items_it_can(account, make_account):
+    a, b = account.create("a"), account.create("b")
+    theirs = make_account().create("theirs")
+    items = [
+        {"id": a["id"], "status": "completed"},
+        {"id": 10 ** 9, "title": "missing"},
+        {"id": b["id"], "title": "first"},
+        {"id": b["id"], "title": "second"},
+        {"id": theirs["id"], "title": "not mine"},
+    ]
+    response = account.request("PATCH", "/todos/bulk", json={"items": items})
+    assert statuses(response) == [
+        (a["id"], "updated"), (10 ** 9, "not_found"), (b["id"], "duplicate"), (b["id"], "duplicate"),
+        (theirs["id"], "not_found"),
+    ]
+    listed = account.listed()
+    assert listed[a["id"]]["status"] == "completed" and listed[a["id"]]["version"] == a["version"] + 1
+    assert listed[b["id"]]["title"] == "b" and listed[b["id"]]["version"] == b["version"]
+
+def test_bulk_delete_applies_the_items_it_can(account):
+    a, b, c = account.create("a"), account.create("b"), account.create("c")
+    response = account.request("DELETE", "/todos/bulk", json={"ids": [a["id"], 10 ** 9, b["id"], b["id"]]})
+    assert statuses(response) == [
+        (a["id"], "deleted"), (10 ** 9, "not_found"), (b["id"], "duplicate"), (b["id"], "duplicate"),
+    ]
+    assert set(account.listed()) == {b["id"], c["id"]}
+
+def test_bulk_limit(account):
+    items = [{"title": "x"}] * (settings.BULK_MAX_ITEMS + 1)
+    account.request("POST", "/todos/bulk", 422, json={"items": items})
+    assert account.listed() == {}
@@ -0,0 +1,38 @@
+import asyncio
+
+import fakeredis.aioredis
+
+from app.core.cache import MemoryCache, RedisCache
+from app.database.connection import AsyncSessionLocal
+from app.schemas.todo_schema import TodoResponse, TodoUpdate
+from app.services.todo_cache import CachedTodoService, TodoCache
+from app.services.todo_service import AsyncTodoService
+
+def test_redis_namespace_expiry_is_not_extended():
+    async def main():
+        cache = RedisCache(url="", client=fakeredis.aioredis.FakeRedis())
+        value = TodoResponse.construct(id=1)
+        await cache.set("user:1", "a", value, ttl=100)
+        await cache.set("user:1", "b", value, ttl=1000)
+        return await cache.client.ttl("todo-cache:user:1")
+
+    assert 0 < asyncio.run(main()) <= 100
+
+def test_workers_never_serve_replaced_reads(call, account):
+    todo = account.create("apple")
+    # Two workers, each with a cache of its own that the other's writes don't reach
+    first, second = (CachedTodoService(AsyncTodoService, TodoCache(MemoryCache(100), ttl=60)) for _ in range(2))
+
+    async def read(worker):
+        async with AsyncSessionLocal() as db:
+            single = await worker.get_todo_by_id(db=db, todo_id=todo["id"], user_id=account.id)
+            found = await worker.search_todos(db=db, user_id=account.id, q="apple")
+            return single.title, [item.id for item in found.todos]
+
+    async def update():
+        async with AsyncSessionLocal() as db:
+            await second.update_todo(db=db, todo_id=todo["id"], todo_update=TodoUpdate(title="pear"), user_id=account.id)
+
+    assert call(read, first) == ("apple", [todo["id"]])
+    call(update)
+    assert call(read, first) == ("pear", [])
@@ -0,0 +1,54 @@
+import asyncio
+
+from app.core.coalesce import WriteCoalescer
+
+def run(coroutine):
+    return asyncio.run(asyncio.wait_for(coroutine, 5))
+
+def test_writes_in_one_window_share_a_batch():
+    batches = []
+
+    async def commit(writes):
+        batches.append(list(writes))
+        return [write * 10 for write in writes]
+
+    async def main():
+        coalescer = WriteCoalescer(commit, window=0.01, max_batch=100)
+        return await asyncio.gather(*(coalescer.submit(write) for write in range(5)))
+
+    assert run(main()) == [0, 10, 20, 30, 40]
+    assert batches == [[0, 1, 2, 3, 4]]
+
+def test_failed_batch_is_retried_write_by_write():
+    async def commit(writes):
+        if 2 in writes:
+            raise ValueError("bad write")
+        return writes
+
+    async def main():
+        coalescer = WriteCoalescer(commit, window=0.01, max_batch=100)
+        return await asyncio.gather(*(coalescer.submit(write) for write in range(4)), return_exceptions=True)
+
+    results = run(main())
+    assert results[:2] == [0, 1] and results[3] == 3
+    assert isinstance(results[2], ValueError)
+
+def test_running_batch_is_held_until_it_finishes():
+    async def main():
+        gate = asyncio.Event()
+
+        async def commit(writes):
+            await gate.wait()
+            return writes
+
+        coalescer = WriteCoalescer(commit, window=0, max_batch=1)
+        first = asyncio.ensure_future(coalescer.submit(1))
+        second = asyncio.ensure_future(coalescer.submit(2))
+        await asyncio.sleep(0.01)
+        # The event loop keeps only a weak reference to the task
+        assert coalescer._task is not None and not coalescer._task.done()
+        gate.set()
+        assert await asyncio.gather(first, second) == [1, 2]
+        assert coalescer._task is None
+
+    run(main())
@@ -0,0 +1,22 @@
+from pathlib import Path
+
+import pytest
+
+from app.database.connection import ASYNC_DRIVERS, to_async_url
+
+REQUIREMENTS = Path(__file__).resolve().parents[1] / "requirements.txt"
+
+@pytest.mark.parametrize("url, expected", [
+    ("mysql+pymysql://u:p@db/todos", "mysql+aiomysql://u:p@db/todos"),
+    ("postgresql://u:p@db/todos", "postgresql+asyncpg://u:p@db/todos"),
+    ("sqlite:///todos.db", "sqlite+aiosqlite:///todos.db"),
+])
+def test_to_async_url(url, expected):
+    assert to_async_url(url) == expected
+
+def test_async_drivers_are_required():
+    required = {
+        line.split("==")[0].split("[")[0].strip().lower()
+        for line in REQUIREMENTS.read_text().splitlines()
+    }
+    assert set(ASYNC_DRIVERS.values()) <= required
@@ -0,0 +1,42 @@
+def get(account, url, etag=None, expected=200, **params):
+    headers = {"If-None-Match": etag} if etag else {}
+    return account.request("GET", url, expected, headers=headers, params=params)
+
+def test_todo_etag(account):
+    todo = account.create("a")
+    url = f"/todos/{todo['id']}"
+    etag = get(account, url).headers["ETag"]
+    assert etag == f'"todo-{todo["id"]}-v{todo["version"]}"'
+
+    not_modified = get(account, url, etag, 304)
+    assert not_modified.content == b"" and not_modified.headers["ETag"] == etag
+    get(account, url, f'"other", W/{etag}', 304)
+    get(account, url, "*", 304)
+
+    account.request("PUT", url, json={"title": "b"})
+    changed = get(account, url, etag)
+    assert changed.json()["title"] == "b" and changed.headers["ETag"] != etag
+
+def test_missing_todo_is_never_not_modified(account):
+    get(account, "/todos/999999999", '"todo-999999999-v1"', 404)
+
+def test_list_etag_follows_every_write(account):
+    todo = account.create("a")
+    etag = get(account, "/todos/").headers["ETag"]
+    get(account, "/todos/", etag, 304)
+    # Other parameters select another page, so another tag
+    assert get(account, "/todos/", etag, limit=5).headers["ETag"] != etag
+
+    account.request("DELETE", f"/todos/{todo['id']}", 204)
+    response = get(account, "/todos/", etag)
+    assert response.json()["todos"] == [] and response.headers["ETag"] != etag
+
+def test_stats_etag(account):
+    etag = get(account, "/todos/stats").headers["ETag"]
+    get(account, "/todos/stats", etag, 304)
+    account.create("a")
+    assert get(account, "/todos/stats", etag).json()["total"] == 1
+
+def test_etags_are_per_user(account, make_account):
+    other = make_account()
+    assert get(account, "/todos/").headers["ETag"] != get(other, "/todos/").headers["ETag"]
@@ -0,0 +1,56 @@
+import asyncio
+import time
+from datetime import datetime
+
+import pytest
+
+from app.core.feed import ChangeFeed, FeedFull, MemoryFeed, change_feed
+from app.core.token_cache import revocation_list
+
+def make_feed(**overrides) -> ChangeFeed:
+    options = {"buffer_size": 10, "max_subscribers": 10, "heartbeat": 0.01, "max_age": 60}
+    options.update(overrides)
+    return ChangeFeed(MemoryFeed(), **options)
+
+def test_subscribe_reserves_the_slot():
+    feed = make_feed(max_subscribers=1)
+    subscriber = feed.subscribe(1)
+    with pytest.raises(FeedFull):
+        feed.subscribe(2)
+    feed.unsubscribe(subscriber)
+    feed.subscribe(2)
+
+def test_stream_ends_when_token_is_revoked():
+    user_id = 10 ** 9
+    issued_at = time.time() - 60
+
+    async def run():
+        feed = make_feed()
+        await feed.start()
+        try:
+            subscriber = feed.subscribe(user_id, issued_at)
+            chunks = feed.stream(subscriber)
+            assert b"event: ready" in await chunks.__anext__()
+            revocation_list.revoke(user_id, datetime.utcnow())
+            rest = [chunk async for chunk in chunks]
+        finally:
+            await feed.stop()
+        return feed, rest
+
+    feed, rest = asyncio.run(asyncio.wait_for(run(), 5))
+    assert b"event: revoked" in rest[-1]
+    assert feed.stats()["subscribers"] == 0
+
+def test_empty_update_publishes_nothing(client, account):
+    todo = client.post("/todos/", json={"title": "a"}, headers=account.headers).json()
+    subscriber = change_feed.subscribe(account.id)
+    try:
+        assert client.put(f"/todos/{todo['id']}", json={}, headers=account.headers).status_code == 200
+        response = client.patch("/todos/bulk", json={"items": [{"id": todo["id"]}]}, headers=account.headers)
+        assert response.status_code == 200
+        assert subscriber.idle
+
+        assert client.put(f"/todos/{todo['id']}", json={"title": "b"}, headers=account.headers).status_code == 200
+        assert not subscriber.idle
+    finally:
+        change_feed.unsubscribe(subscriber)
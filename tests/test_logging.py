@@ -0,0 +1,35 @@
+import logging
+import os
+import subprocess
+import sys
+from logging.handlers import QueueHandler
+from pathlib import Path
+
+from app.core.config import settings
+from app.core.log import DebugSampler
+
+ROOT = Path(__file__).resolve().parent.parent
+
+IMPORT_ONLY = """
+import logging, threading
+before = logging.getLogger().handlers[:]
+threads = threading.active_count()
+import app.main
+assert logging.getLogger().handlers == before, logging.getLogger().handlers
+assert threading.active_count() == threads, threading.enumerate()
+"""
+
+def test_import_leaves_logging_alone():
+    result = subprocess.run(
+        [sys.executable, "-c", IMPORT_ONLY],
+        cwd=ROOT,
+        env={**os.environ, "LOG_QUEUE": "true"},
+        capture_output=True,
+        text=True,
+    )
+    assert result.returncode == 0, result.stderr[-2000:]
+
+def test_startup_configures_logging(client):
+    # configure_logging's handler is the one carrying the DEBUG sampler
+    handler = next(h for h in logging.getLogger().handlers if any(isinstance(f, DebugSampler) for f in h.filters))
+    assert isinstance(handler, QueueHandler) == settings.LOG_QUEUE
@@ -0,0 +1,54 @@
+"""
+Every GET /todos/ list, filter and sort statement reads through one of the
+ix_todos_user_* indexes: its SQLite plan neither scans todos nor sorts in a
+temp B-tree. The one sort allowed is sort=title with a created_at range:
+SQLite searches the created_at index, whose range bounds the rows it sorts,
+rather than walking the title index for rows in the range.
+"""
+from datetime import datetime
+
+import pytest
+
+from app.database.connection import engine
+from app.database.models import TodoStatus
+from app.schemas.todo_schema import CountMode, TodoSort
+from app.services.todo_service import _count_statement, _filtered_query, _page_statement
+from app.utils.pagination import encode_cursor
+
+INDEX_PREFIX = "ix_todos_user_"
+
+def statements():
+    # The statement and whether a temp B-tree sort is expected, named for the test id
+    for sort in TodoSort:
+        for status in (None, TodoStatus.PENDING):
+            for ranged in (False, True):
+                query = _filtered_query(
+                    1, status, datetime(2020, 1, 1) if ranged else None, datetime(2030, 1, 1) if ranged else None
+                )
+                name = f"sort={sort.value} status={status.value if status else '-'} range={'yes' if ranged else 'no'}"
+                page = _page_statement(query, 0, 20, None, sort)
+                yield pytest.param(page, sort == TodoSort.TITLE and ranged, id=f"{name} page")
+                key = "m" if sort == TodoSort.TITLE else datetime(2025, 1, 1)
+                # A cursor seeks on the sort column, so the title index serves it even with a range
+                page = _page_statement(query, 0, 20, encode_cursor(sort.value, key, 100), sort)
+                yield pytest.param(page, False, id=f"{name} cursor")
+                if ranged and sort == TodoSort.CREATED_AT:
+                    for count in (CountMode.EXACT, CountMode.ESTIMATED):
+                        name = f"status={status.value if status else '-'} range=yes count={count.value}"
+                        yield pytest.param(_count_statement([query], count, 1, status, ranged), False, id=name)
+
+def plan(statement) -> list:
+    sql = str(statement.compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True}))
+    with engine.connect() as connection:
+        return [row[-1] for row in connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}")]
+
+@pytest.mark.parametrize("statement, sorted_allowed", statements())
+def test_statement_searches_a_user_index(client, statement, sorted_allowed):
+    details = plan(statement)
+    assert any(detail.startswith("SEARCH todos") for detail in details), details
+    for detail in details:
+        assert not detail.startswith("SCAN todos"), details
+        if detail.startswith("SEARCH todos"):
+            assert f"INDEX {INDEX_PREFIX}" in detail, details
+        if not sorted_allowed:
+            assert not detail.startswith("USE TEMP B-TREE"), details
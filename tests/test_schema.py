@@ -0,0 +1,12 @@
+import pytest
+from sqlalchemy import create_mock_engine
+
+from app.database.schema import SUPPORTED_DIALECTS, UnsupportedDatabase, check_dialect
+
+@pytest.mark.parametrize("dialect", SUPPORTED_DIALECTS)
+def test_supported_dialects_pass(dialect):
+    check_dialect(create_mock_engine(f"{dialect}://", None))
+
+def test_other_dialects_are_refused():
+    with pytest.raises(UnsupportedDatabase, match="mssql"):
+        check_dialect(create_mock_engine("mssql://", None))
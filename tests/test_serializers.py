@@ -0,0 +1,27 @@
+import csv
+import io
+import json
+
+from app.schemas.todo_schema import TodoResponse, TodoStatsResponse
+
+def test_stats_encode_like_the_model(account):
+    todo = account.create("a")
+    account.create("b")
+    account.request("PUT", f"/todos/{todo['id']}", json={"status": "completed"})
+    stats = account.request("GET", "/todos/stats").json()
+    assert stats == json.loads(TodoStatsResponse.parse_obj(stats).json())
+    assert stats["by_status"] == {"pending": 1, "completed": 1}
+
+def test_export_encodes_like_the_model(account):
+    todo = account.create("a", description="with, comma")
+    account.create("b")
+    account.request("PUT", f"/todos/{todo['id']}", json={"status": "completed"})
+    listed = account.listed()
+    expected = [TodoResponse.parse_obj(listed[todo_id]) for todo_id in sorted(listed)]
+
+    ndjson = account.request("GET", "/todos/export").text
+    assert [json.loads(line) for line in ndjson.splitlines()] == [json.loads(model.json()) for model in expected]
+
+    rows = list(csv.reader(io.StringIO(account.request("GET", "/todos/export", params={"format": "csv"}).text)))
+    assert rows[0] == list(TodoResponse.__fields__)
+    assert rows[1:] == [["" if value is None else str(value) for value in json.loads(model.json()).values()] for model in expected]
@@ -0,0 +1,18 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+TESTS = Path(__file__).resolve().parent
+
+def test_sharded_suite():
+    # Shards are read from the settings once per process, so tests/sharded
+    # gets one of its own with three SQLite shards
+    result = subprocess.run(
+        [sys.executable, "-m", "pytest", "-q", "-p", "no:cacheprovider", str(TESTS / "sharded")],
+        cwd=TESTS.parent,
+        env={**os.environ, "TEST_SHARDS": "3"},
+        capture_output=True,
+        text=True,
+    )
+    assert result.returncode == 0, result.stdout[-10000:] + result.stderr[-2000:]
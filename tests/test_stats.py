@@ -0,0 +1,42 @@
+from collections import Counter
+
+from app.services.todo_stats import TodoStatsRepairer
+
+def counted(account) -> dict:
+    """by_status as a COUNT of the user's todos would give it."""
+    statuses = Counter(todo["status"] for todo in account.listed(include_archived=True).values())
+    return {"pending": statuses["pending"], "completed": statuses["completed"]}
+
+def assert_stats_match(account, call):
+    stats = account.request("GET", "/todos/stats").json()
+    assert stats["by_status"] == counted(account)
+    assert stats["total"] == sum(stats["by_status"].values())
+    assert sum(day["total"] for day in stats["days"]) == stats["total"]
+    assert account.request("GET", "/todos/", params={"include_archived": True}).json()["total"] == stats["total"]
+    report = call(TodoStatsRepairer(batch_size=1000).run, False)
+    assert [row for row in report["drift"] if row["user_id"] == account.id] == []
+
+def test_counters_follow_single_writes(account, call):
+    todos = [account.create(f"todo {i}") for i in range(4)]
+    account.request("PUT", f"/todos/{todos[0]['id']}", json={"status": "completed"})
+    account.request("PUT", f"/todos/{todos[1]['id']}", json={"title": "renamed"})
+    account.request("PUT", f"/todos/{todos[2]['id']}", json={"status": "pending"})
+    account.request("DELETE", f"/todos/{todos[3]['id']}", 204)
+    account.request("DELETE", f"/todos/{todos[3]['id']}", 404)
+    assert_stats_match(account, call)
+    assert account.request("GET", "/todos/stats").json()["by_status"] == {"pending": 2, "completed": 1}
+
+def test_counters_follow_bulk_writes(account, call):
+    created = account.request("POST", "/todos/bulk", 201, json={"items": [{"title": "x"}] * 6}).json()["results"]
+    ids = [result["id"] for result in created]
+    items = [{"id": todo_id, "status": "completed"} for todo_id in ids[:3]] + [{"id": ids[0], "status": "pending"}]
+    account.request("PATCH", "/todos/bulk", json={"items": items})
+    account.request("DELETE", "/todos/bulk", json={"ids": [ids[1], ids[4], 10 ** 9]})
+    assert_stats_match(account, call)
+    assert account.request("GET", "/todos/stats").json()["by_status"] == {"pending": 3, "completed": 1}
+
+def test_stats_filter_by_day(account):
+    account.create("a")
+    today = account.request("GET", "/todos/stats").json()["days"][0]["day"]
+    assert account.request("GET", "/todos/stats", params={"created_after": today}).json()["total"] == 1
+    assert account.request("GET", "/todos/stats", params={"created_before": today}).json()["total"] == 0
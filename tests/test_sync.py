@@ -0,0 +1,78 @@
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import update
+
+from app.core.config import settings
+from app.database.connection import engine
+from app.database.models import TodoTombstone
+from app.services.todo_sync import TombstoneCompactor
+from app.utils.pagination import decode_sync_token, encode_sync_token
+
+def sync(account, since=None, limit=100):
+    """Page through GET /todos/changes; the todo ids, deleted ids and last token."""
+    todos, deleted, has_more = [], [], True
+    while has_more:
+        params = {"limit": limit, **({"since": since} if since else {})}
+        page = account.request("GET", "/todos/changes", params=params).json()
+        todos += [todo["id"] for todo in page["todos"]]
+        deleted += page["deleted"]
+        since, has_more = page["next_token"], page["has_more"]
+    return todos, deleted, since
+
+def test_sync_reports_writes_and_deletes_since_token(account):
+    first, second = account.create("a"), account.create("b")
+    todos, deleted, token = sync(account)
+    assert todos == [first["id"], second["id"]] and deleted == []
+
+    # Created first: SQLite hands a deleted todo's id to the next one
+    third = account.create("c")
+    account.request("PUT", f"/todos/{first['id']}", json={"title": "a2"})
+    account.request("DELETE", f"/todos/{second['id']}", 204)
+    todos, deleted, token = sync(account, token)
+    assert todos == [third["id"], first["id"]] and deleted == [second["id"]]
+
+    assert sync(account, token)[:2] == ([], [])
+
+def test_full_sync_skips_deletes_older_than_snapshot(account):
+    gone = account.create("gone")
+    account.request("DELETE", f"/todos/{gone['id']}", 204)
+    kept = [account.create(f"kept {i}")["id"] for i in range(5)]
+
+    # Paged, so the tombstone floor has to survive several tokens
+    todos, deleted, token = sync(account, limit=2)
+    assert todos == kept and deleted == []
+    assert sync(account, token)[:2] == ([], [])
+
+def test_delete_during_paged_full_sync_is_reported(account):
+    kept = [account.create(f"kept {i}")["id"] for i in range(4)]
+    page = account.request("GET", "/todos/changes", params={"limit": 2}).json()
+    account.request("DELETE", f"/todos/{kept[0]}", 204)
+
+    todos, deleted, _ = sync(account, page["next_token"], limit=2)
+    assert todos == kept[2:] and deleted == [kept[0]]
+
+def test_malformed_token_is_rejected(account):
+    account.request("GET", "/todos/changes", 400, params={"since": "not-a-token"})
+
+def test_compaction_only_removes_deletes_no_valid_token_needs(account, call):
+    retention = settings.SYNC_TOMBSTONE_RETENTION_SECONDS
+    old, recent = account.create("old"), account.create("recent")
+    _, _, token = sync(account)
+    account.request("DELETE", f"/todos/{old['id']}", 204)
+    account.request("DELETE", f"/todos/{recent['id']}", 204)
+    # The first delete happened before the retention period (and margin) began
+    with engine.begin() as connection:
+        connection.execute(
+            update(TodoTombstone)
+            .where(TodoTombstone.todo_id == old["id"])
+            .values(deleted_at=datetime.utcnow() - timedelta(seconds=retention) - timedelta(hours=2))
+        )
+    assert call(TombstoneCompactor(retention, batch_size=100).run) >= 1
+
+    # A token from before that delete is past the retention period too: 410
+    change_seq, todo_id, _, deleted_after = decode_sync_token(token)
+    expired = encode_sync_token(change_seq, todo_id, time.time() - retention - 1, deleted_after)
+    account.request("GET", "/todos/changes", 410, params={"since": expired})
+    # One inside it still gets the delete that wasn't compacted
+    assert sync(account, token)[:2] == ([], [recent["id"]])